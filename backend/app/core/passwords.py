@@ -0,0 +1,90 @@
+"""
+Password hashing
+
+Passwords are stored as bcrypt hashes (passlib CryptContext). bcrypt is deliberately slow, so
+the async helpers run it in a small process pool: a login storm then costs CPU on the worker
+processes instead of blocking the event loop or exhausting the request threadpool. At most
+PASSWORD_HASH_QUEUE jobs wait for a worker; further callers wait on the event loop.
+
+Rows created before hashing was introduced hold plaintext. verify_password still accepts them
+and returns a fresh hash so the caller can upgrade the row; the same happens when
+BCRYPT_ROUNDS changes.
+"""
+
+import asyncio
+import hmac
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# 0 runs hashing in threads instead of processes (for platforms where forking is a problem)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", str(max(PASSWORD_HASH_WORKERS, 1) * 8)))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+_pool = None
+_slots = None
+
+
+def hash_password(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def is_hashed(stored: str) -> bool:
+    return pwd_context.identify(stored, required=False) is not None
+
+
+def verify_password(password: str, stored: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """(matches, new_hash). new_hash is set when the stored value should be replaced."""
+    if not stored:
+        pwd_context.dummy_verify()  # same cost as a real check, so unknown users are not faster
+        return False, None
+    if not is_hashed(stored):
+        ok = hmac.compare_digest(password.encode(), stored.encode())
+        return ok, hash_password(password) if ok else None
+    return pwd_context.verify_and_update(password, stored)
+
+
+def _executor():
+    global _pool
+    if _pool is None and PASSWORD_HASH_WORKERS > 0:
+        _pool = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+    return _pool
+
+
+async def _offload(fn, *args):
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(PASSWORD_HASH_QUEUE)
+    async with _slots:
+        pool = _executor()
+        if pool is None:
+            return await asyncio.to_thread(fn, *args)
+        return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _offload(hash_password, password)
+
+
+async def verify_password_async(password: str, stored: Optional[str]) -> Tuple[bool, Optional[str]]:
+    return await _offload(verify_password, password, stored)
+
+
+def hash_many(passwords):
+    """Hash a batch of passwords on the worker processes (used by bulk import); returns a list"""
+    pool = _executor()
+    if pool is None:
+        return [hash_password(p) for p in passwords]
+    return list(pool.map(hash_password, passwords))
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -4,7 +4,9 @@ from jose import JWTError,jwt
 from datetime import datetime, timezone, timedelta
 from typing import Optional
 from app.models.models import UserReqRes, Token, LoginRequest
-from app.crud.users_crud import get_user_by_id
+from app.crud.users_crud import get_user_by_id, replace_password_hash
+from app.core.passwords import verify_password, verify_password_async
+from starlette.concurrency import run_in_threadpool
 from dotenv import load_dotenv
 import os
 load_dotenv()
@@ -26,13 +28,30 @@ def create_access_token(subject: str, expires_delta: Optional[timedelta] = None)
 
 
 def authenticate_user(e_id: int, password: str) -> Optional[UserReqRes]:
+    """Blocking check for scripts and sync code; request handlers use authenticate_user_async"""
     try:
         user = get_user_by_id(e_id)
     except Exception:
+        user = None
+    ok, new_hash = verify_password(password, user.password if user else None)
+    if not ok:
         return None
-    # users_crud returns UserReqRes with password field
-    if not user or user.password != password:
+    if new_hash:
+        replace_password_hash(user.e_id, user.password, new_hash)
+    return user
+
+
+async def authenticate_user_async(e_id: int, password: str) -> Optional[UserReqRes]:
+    """Verify on the password-hashing pool; legacy plaintext (or outdated cost) rows are rehashed"""
+    try:
+        user = await run_in_threadpool(get_user_by_id, e_id)
+    except Exception:
+        user = None
+    ok, new_hash = await verify_password_async(password, user.password if user else None)
+    if not ok:
         return None
+    if new_hash:
+        await run_in_threadpool(replace_password_hash, user.e_id, user.password, new_hash)
     return user
 
 
@@ -0,0 +1,108 @@
+"""
+Read-through employee directory cache
+
+Boards resolve assignee, reviewer and manager names for hundreds of cards. Employee rows are
+small and rarely change, so each worker keeps them in memory: /Employee/get and
+/Employee/getmany are served from here and only misses go to MySQL (one IN query per call).
+
+employee_crud invalidates entries on add/update/delete and bulk import. Other workers pick up
+changes within EMPLOYEE_CACHE_TTL_SECONDS. Unknown ids are cached as misses too, so a board
+that references a deleted employee does not query for it on every load.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import select
+
+from app.schemas.schemas import EmployeeSchema
+from app.utils.orm_serializer import column_names, rows_to_dicts
+
+EMPLOYEE_CACHE_TTL_SECONDS = float(os.getenv("EMPLOYEE_CACHE_TTL_SECONDS", "300"))
+EMPLOYEE_CACHE_SIZE = int(os.getenv("EMPLOYEE_CACHE_SIZE", "20000"))
+EMPLOYEE_COLUMNS = column_names(EmployeeSchema)
+
+_MISSING = object()
+
+
+class EmployeeDirectoryCache:
+    """LRU of e_id -> employee dict (or a cached miss) with a TTL"""
+
+    def __init__(self, ttl=EMPLOYEE_CACHE_TTL_SECONDS, size=EMPLOYEE_CACHE_SIZE):
+        self.ttl = ttl
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # bumped on every invalidation; fills that started before it are dropped
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def lookup(self, ids):
+        """(found, missing): found maps e_id -> dict or None (known not to exist)"""
+        now = time.monotonic()
+        found, missing = {}, []
+        with self._lock:
+            for e_id in ids:
+                entry = self._entries.get(e_id)
+                if entry is not None and entry[1] > now:
+                    self._entries.move_to_end(e_id)
+                    found[e_id] = None if entry[0] is _MISSING else dict(entry[0])
+                else:
+                    missing.append(e_id)
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def fill(self, rows, requested, generation):
+        """Store fetched rows (and misses for requested ids not among them)"""
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            if generation != self._generation:
+                return
+            by_id = {r["e_id"]: r for r in rows}
+            for e_id in requested:
+                self._entries[e_id] = (dict(by_id[e_id]) if e_id in by_id else _MISSING, expires)
+                self._entries.move_to_end(e_id)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *ids):
+        """Drop the given ids, or everything when called without arguments"""
+        with self._lock:
+            self._generation += 1
+            if not ids:
+                self._entries.clear()
+            for e_id in ids:
+                self._entries.pop(e_id, None)
+
+    def stats(self):
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+employee_cache = EmployeeDirectoryCache()
+
+
+def get_employees_cached(session, ids):
+    """e_id -> employee dict for the ids that exist, in the order requested"""
+    found, missing = employee_cache.lookup(ids)
+    if missing:
+        generation = employee_cache.generation
+        rows = rows_to_dicts(
+            session.execute(
+                select(*[getattr(EmployeeSchema, c) for c in EMPLOYEE_COLUMNS])
+                .where(EmployeeSchema.e_id.in_(missing))
+            ).all(),
+            EMPLOYEE_COLUMNS,
+        )
+        employee_cache.fill(rows, missing, generation)
+        by_id = {r["e_id"]: r for r in rows}
+        for e_id in missing:
+            found[e_id] = by_id.get(e_id)
+    return {e_id: found[e_id] for e_id in ids if found.get(e_id) is not None}
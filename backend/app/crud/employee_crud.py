@@ -1,10 +1,22 @@
-from app.database.mysql_connection import get_connection
+from app.database.mysql_connection import get_connection, get_read_connection, reads_from_primary
 from app.models.models import EmployeeReqRes  # Pydantic Model
 from app.schemas.schemas import EmployeeSchema
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 from fastapi import HTTPException
 from app.models.models import UserReqRes
 from app.crud.users_crud import add_user
+from app.utils.orm_serializer import column_names, rows_to_dicts, resolve_fields
+from app.crud.employee_cache import employee_cache, get_employees_cached
+from app.utils.single_flight import read_coalescer
+from sqlalchemy import select
+
+EMPLOYEE_COLUMNS = column_names(EmployeeSchema)
+
+# Named column sets for /Employee/getall?fields=...
+EMPLOYEE_PROJECTIONS = {
+    "directory": ["e_id", "name", "designation", "mgr_id"],
+    "full": EMPLOYEE_COLUMNS,
+}
 
 def add_employee(new_emp: EmployeeReqRes, role: str, user):
     session = None
@@ -28,6 +40,7 @@ def add_employee(new_emp: EmployeeReqRes, role: str, user):
             status="active"
         )
         add_user(user_data)
+        employee_cache.invalidate(new_employee.e_id)  # may be cached as a miss
         return EmployeeReqRes.model_validate(new_employee)  # Convert to Pydantic model
     except IntegrityError as e:
         # Duplicate key (email) or other integrity constraints
@@ -44,25 +57,34 @@ def add_employee(new_emp: EmployeeReqRes, role: str, user):
             session.close()
 
 
-def get_all_employees(role: str, user):
+def get_all_employees(role: str, user, fields: str = "full"):
+    columns = resolve_fields(fields, EMPLOYEE_PROJECTIONS, EMPLOYEE_COLUMNS, "e_id")
+    # If Manager, show only employees who report to them
+    if role == "Manager":
+        if "Manager" not in user.roles:
+            raise HTTPException(status_code=403, detail="Only managers can access their team members.")
+        scope = ("team", user.e_id)
+    elif role == "Admin":
+        if "Admin" not in user.roles:
+            raise HTTPException(status_code=403, detail="Only Admin can access all employees.")
+        scope = ("all",)
+    else:
+        raise HTTPException(status_code=403, detail="Unauthorized access.")
+
+    # Authorized above; identical concurrent queries for the same scope share one execution
+    key = ("employees", tuple(columns), scope, reads_from_primary())
+    return list(read_coalescer.do(key, lambda: _query_employees(columns, scope)))
+
+
+def _query_employees(columns, scope):
     session = None
     try:
-        session = get_connection()
-        
-        # If Manager, show only employees who report to them
-        if role == "Manager":
-            if "Manager" not in user.roles:
-                raise HTTPException(status_code=403, detail="Only managers can access their team members.")
-            employees = session.query(EmployeeSchema).filter(EmployeeSchema.mgr_id == user.e_id).all()
-        elif role == "Admin":
-            if "Admin" not in user.roles:
-                raise HTTPException(status_code=403, detail="Only Admin can access all employees.")
-            employees = session.query(EmployeeSchema).all()
-        else:
-            raise HTTPException(status_code=403, detail="Unauthorized access.")
-        
-        # employees = session.query(EmployeeSchema).all()
-        return [EmployeeReqRes.model_validate(emp) for emp in employees]  # Convert to list of Pydantic models
+        stmt = select(*[getattr(EmployeeSchema, c) for c in columns])
+        if scope[0] == "team":
+            stmt = stmt.where(EmployeeSchema.mgr_id == scope[1])
+        session = get_read_connection()
+        employees = session.execute(stmt).all()
+        return rows_to_dicts(employees, columns)  # Rows come from our table, no need to re-run the field regexes
     except SQLAlchemyError as e:
         if session:
             session.rollback()
@@ -75,8 +97,9 @@ def get_all_employees(role: str, user):
 def get_by_employee_id(id: int, role: str, user):
     session = None
     try:
+        # primary, not a replica: misses fill the directory cache, which must not keep a lagging copy
         session = get_connection()
-        emp = session.query(EmployeeSchema).filter(EmployeeSchema.e_id == id).first()
+        emp = get_employees_cached(session, [id]).get(id)
         if not emp:
             raise HTTPException(status_code=404, detail="Employee Not Found")
               
@@ -95,6 +118,31 @@ def get_by_employee_id(id: int, role: str, user):
             session.close()
 
 
+MAX_BULK_IDS = 500
+
+
+def get_many_employees(ids, role: str, user):
+    """Employees for a list of ids: cache hits plus one IN query for the rest.
+
+    Same visibility as /Employee/get. Ids that do not exist are returned under "missing".
+    """
+    session = None
+    try:
+        ids = list(dict.fromkeys(ids))
+        if len(ids) > MAX_BULK_IDS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_IDS} ids per request")
+        session = get_connection()
+        found = get_employees_cached(session, ids)
+        return {"employees": list(found.values()), "missing": [i for i in ids if i not in found]}
+    except SQLAlchemyError as e:
+        if session:
+            session.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    finally:
+        if session:
+            session.close()
+
+
 def update_employee(id: int, updated: dict, role: str, user):
     session = None
     try:
@@ -108,6 +156,7 @@ def update_employee(id: int, updated: dict, role: str, user):
         for key, value in updated.items():
             setattr(emp, key, value)
         session.commit()
+        employee_cache.invalidate(id)
         session.refresh(emp)
         return EmployeeReqRes.model_validate(emp)  # Convert to Pydantic model
     except SQLAlchemyError as e:
@@ -131,6 +180,7 @@ def delete_employee(id: int, role: str, user):
             raise HTTPException(status_code=404, detail="Employee Not Found")
         session.delete(emp)
         session.commit()
+        employee_cache.invalidate(id)
         return {"detail": "Employee Deleted Successfully"}
     except SQLAlchemyError as e:
         if session:
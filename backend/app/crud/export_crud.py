@@ -0,0 +1,163 @@
+"""
+Streaming exports of tasks and remarks
+
+Rows are read through server-side cursors (yield_per/stream_results on MySQL, batched cursors
+on Mongo) and encoded chunk by chunk, so memory stays flat however many rows are exported.
+Tasks go through the same visibility predicate as /Task/getall; remarks are exported only for
+tasks the caller can see.
+"""
+
+import csv
+import io
+import zlib
+from datetime import datetime
+from enum import Enum
+
+import orjson
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.database.mysql_connection import get_read_connection
+from app.database.mongodb_connection import remarks_collection
+from app.crud.task_visibility import visible_tasks
+from app.crud.task_workflow import parse_status
+from app.schemas.schemas import TaskSchema, TaskPriority
+from app.utils.orm_serializer import column_names, row_to_dict
+
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+TASK_EXPORT_COLUMNS = column_names(TaskSchema)
+REMARK_EXPORT_FIELDS = [
+    "_id", "task_id", "comment", "created_by", "role", "file_id", "file_name", "created_at", "updated_at",
+]
+BATCH_SIZE = 1000
+CHUNK_BYTES = 64 * 1024
+
+
+def task_filters(stmt, status=None, priority=None, assigned_to=None, reviewer=None,
+                 created_by=None, expected_from=None, expected_to=None):
+    """Apply the optional task field filters shared by the export endpoints"""
+    if status is not None:
+        value = parse_status(status)
+        if value is None:
+            raise HTTPException(status_code=400, detail=f"Unknown status {status}")
+        stmt = stmt.where(TaskSchema.status == value)
+    if priority is not None:
+        try:
+            stmt = stmt.where(TaskSchema.priority == TaskPriority[priority.upper()])
+        except KeyError:
+            raise HTTPException(status_code=400, detail=f"Unknown priority {priority}")
+    if assigned_to is not None:
+        stmt = stmt.where(TaskSchema.assigned_to == assigned_to)
+    if reviewer is not None:
+        stmt = stmt.where(TaskSchema.reviewer == reviewer)
+    if created_by is not None:
+        stmt = stmt.where(TaskSchema.created_by == created_by)
+    if expected_from is not None:
+        stmt = stmt.where(TaskSchema.expected_closure >= expected_from)
+    if expected_to is not None:
+        stmt = stmt.where(TaskSchema.expected_closure < expected_to)
+    return stmt
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _encode(records, fields, fmt):
+    """Yield encoded byte chunks of about CHUNK_BYTES from an iterator of dicts"""
+    buf = io.StringIO() if fmt == "csv" else None
+    writer = csv.writer(buf) if buf is not None else None
+    pending = []
+    size = 0
+    if writer:
+        writer.writerow(fields)
+    for record in records:
+        if writer:
+            writer.writerow([_csv_value(record.get(f)) for f in fields])
+            if buf.tell() >= CHUNK_BYTES:
+                yield buf.getvalue().encode()
+                buf.seek(0)
+                buf.truncate()
+        else:
+            line = orjson.dumps(record, default=str) + b"\n"
+            pending.append(line)
+            size += len(line)
+            if size >= CHUNK_BYTES:
+                yield b"".join(pending)
+                pending, size = [], 0
+    if writer:
+        if buf.tell():
+            yield buf.getvalue().encode()
+    elif pending:
+        yield b"".join(pending)
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def _stream_rows(stmt):
+    """Rows from a server-side cursor, fetched BATCH_SIZE at a time"""
+    session = get_read_connection()
+    try:
+        result = session.execute(stmt.execution_options(yield_per=BATCH_SIZE, stream_results=True))
+        for row in result:
+            yield row
+    finally:
+        session.close()
+
+
+def export_tasks(role, user, fmt="ndjson", gzip=False, **filters):
+    """Byte iterator of the caller's visible tasks. Authorization and filters are checked eagerly."""
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {sorted(FORMATS)}")
+    columns = [getattr(TaskSchema, c) for c in TASK_EXPORT_COLUMNS]
+    stmt = task_filters(visible_tasks(role, user, *columns), **filters).order_by(TaskSchema.t_id)
+
+    records = (row_to_dict(r, TASK_EXPORT_COLUMNS) for r in _stream_rows(stmt))
+    chunks = _encode(records, TASK_EXPORT_COLUMNS, fmt)
+    return _gzip(chunks) if gzip else chunks
+
+
+def _remark_record(doc):
+    doc["_id"] = str(doc["_id"])
+    return {f: doc.get(f) for f in REMARK_EXPORT_FIELDS}
+
+
+def _remarks_for_visible_tasks(stmt):
+    """Remarks of the tasks selected by `stmt`, one $in query per batch of task ids"""
+    ids = []
+    for row in _stream_rows(stmt):
+        ids.append(row.t_id)
+        if len(ids) >= BATCH_SIZE:
+            yield from remarks_collection.find({"task_id": {"$in": ids}}).batch_size(BATCH_SIZE)
+            ids = []
+    if ids:
+        yield from remarks_collection.find({"task_id": {"$in": ids}}).batch_size(BATCH_SIZE)
+
+
+def export_remarks(role, user, fmt="ndjson", gzip=False, **filters):
+    """Byte iterator of remarks on the tasks the caller can see (optionally filtered by task fields)"""
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {sorted(FORMATS)}")
+    stmt = task_filters(visible_tasks(role, user, TaskSchema.t_id), **filters).order_by(TaskSchema.t_id)
+
+    if role == "Admin" and not any(v is not None for v in filters.values()):
+        # every task is visible: scan the collection directly
+        docs = remarks_collection.find({}).batch_size(BATCH_SIZE)
+    else:
+        docs = _remarks_for_visible_tasks(stmt)
+
+    chunks = _encode((_remark_record(d) for d in docs), REMARK_EXPORT_FIELDS, fmt)
+    return _gzip(chunks) if gzip else chunks
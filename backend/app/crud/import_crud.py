@@ -0,0 +1,210 @@
+"""
+Bulk import of employees and their user accounts from CSV or JSONL
+
+The upload is parsed incrementally and handled in chunks. Per chunk: validate every row with
+EmployeeReqRes, find email conflicts with one IN query, insert the employees and then their
+UserSchema rows as multi-row INSERTs, and commit once. Every input row gets a result entry.
+Passwords given in the file are hashed on the hashing process pool; the default is hashed once.
+
+CSV columns: name, email, designation, mgr_id and optionally password, roles (separated by
+";" or ","), status. JSONL lines carry the same keys. A row may only grant roles the importing
+Admin holds (Developer, the default, always). A chunk that fails in the database is reported
+row by row; the chunks committed before it stay.
+"""
+
+import csv
+import io
+import json
+from functools import lru_cache
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import select, insert
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+
+from app.database.mysql_connection import get_connection
+from app.models.models import EmployeeReqRes, UserReqRes
+from app.schemas.schemas import EmployeeSchema, UserSchema, UserStatus
+from app.crud.users_crud import _ensure_roles_list
+from app.core.passwords import hash_password, hash_many
+from app.crud.employee_cache import employee_cache
+
+FORMATS = ("csv", "jsonl")
+DEFAULT_PASSWORD = "password123"
+DEFAULT_ROLES = ["Developer"]
+
+
+def read_records(fileobj, fmt):
+    """Yield (line_number, dict) from a binary file object without reading it all at once"""
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, {k.strip(): (v.strip() if isinstance(v, str) else v)
+                                    for k, v in row.items() if k}
+    else:
+        for number, line in enumerate(text, start=1):
+            if line.strip():
+                try:
+                    yield number, json.loads(line)
+                except ValueError as e:
+                    yield number, e
+
+
+def _validate(record, grantable):
+    """(EmployeeReqRes, UserReqRes) for a raw record, raising ValueError/ValidationError"""
+    if isinstance(record, Exception):
+        raise ValueError(f"Invalid JSON: {record}")
+    if not isinstance(record, dict):
+        raise ValueError("Expected an object")
+    employee = EmployeeReqRes(
+        name=record.get("name"),
+        email=record.get("email"),
+        designation=record.get("designation"),
+        mgr_id=record.get("mgr_id"),
+    )
+    roles = record.get("roles") or DEFAULT_ROLES
+    if isinstance(roles, str):
+        roles = [r for r in roles.replace(";", ",").split(",") if r.strip()]
+    roles = _ensure_roles_list(roles)
+    not_held = [r for r in roles if r not in grantable]
+    if not_held:
+        raise ValueError(f"Cannot grant roles you do not hold: {', '.join(not_held)}")
+    account = UserReqRes(
+        password=record.get("password") or DEFAULT_PASSWORD,
+        roles=roles,
+        status=record.get("status") or "active",
+    )
+    return employee, account
+
+
+def _error(message):
+    if isinstance(message, ValidationError):
+        return "; ".join(f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in message.errors())
+    return str(message)
+
+
+@lru_cache(maxsize=1)
+def _default_password_hash():
+    # hashed once and shared: rows without a password all get the same well-known default anyway
+    return hash_password(DEFAULT_PASSWORD)
+
+
+def _hash_passwords(rows):
+    """Replace each account's plaintext password with its hash, using the hashing process pool"""
+    explicit = [a for _, _, a in rows if a.password != DEFAULT_PASSWORD]
+    for account, hashed in zip(explicit, hash_many([a.password for a in explicit])):
+        account.password = hashed
+    for _, _, account in rows:
+        if account.password == DEFAULT_PASSWORD:
+            account.password = _default_password_hash()
+
+
+def _user_row(e_id, account):
+    return {
+        "e_id": e_id,
+        "password": account.password,
+        "roles": _ensure_roles_list(account.roles),
+        "status": UserStatus(account.status.value),
+    }
+
+
+def _insert_rows_individually(session, rows, results):
+    """Fallback when a batch hits a constraint (e.g. a concurrent insert): one savepoint per person"""
+    for row_no, employee, account in rows:
+        try:
+            with session.begin_nested():
+                emp = EmployeeSchema(**employee.model_dump(exclude={"e_id"}))
+                session.add(emp)
+                session.flush()
+                session.execute(insert(UserSchema), [_user_row(emp.e_id, account)])
+            results.append({"row": row_no, "email": employee.email, "status": "created", "e_id": emp.e_id})
+        except IntegrityError:
+            results.append({"row": row_no, "email": employee.email, "status": "error",
+                            "error": "Employee with this email already exists"})
+
+
+def _import_chunk(chunk, results, grantable):
+    valid = []
+    seen = set()
+    for row_no, record in chunk:
+        try:
+            employee, account = _validate(record, grantable)
+        except (ValidationError, ValueError, TypeError) as e:
+            email = record.get("email") if isinstance(record, dict) else None
+            results.append({"row": row_no, "email": email, "status": "error", "error": _error(e)})
+            continue
+        if employee.email in seen:
+            results.append({"row": row_no, "email": employee.email, "status": "error",
+                            "error": "Duplicate email in upload"})
+            continue
+        seen.add(employee.email)
+        valid.append((row_no, employee, account))
+    if not valid:
+        return
+
+    session = get_connection()
+    outcome = []  # added to results once the chunk is committed
+    try:
+        emails = [e.email for _, e, _ in valid]
+        existing = set(session.execute(
+            select(EmployeeSchema.email).where(EmployeeSchema.email.in_(emails))
+        ).scalars())
+        rows = []
+        for row_no, employee, account in valid:
+            if employee.email in existing:
+                outcome.append({"row": row_no, "email": employee.email, "status": "error",
+                                "error": "Employee with this email already exists"})
+            else:
+                rows.append((row_no, employee, account))
+        if rows:
+            _hash_passwords(rows)
+            try:
+                with session.begin_nested():
+                    session.execute(insert(EmployeeSchema), [e.model_dump(exclude={"e_id"}) for _, e, _ in rows])
+                    ids = dict(session.execute(
+                        select(EmployeeSchema.email, EmployeeSchema.e_id)
+                        .where(EmployeeSchema.email.in_([e.email for _, e, _ in rows]))
+                    ).all())
+                    session.execute(insert(UserSchema), [_user_row(ids[e.email], a) for _, e, a in rows])
+                for row_no, employee, _ in rows:
+                    outcome.append({"row": row_no, "email": employee.email, "status": "created",
+                                    "e_id": ids[employee.email]})
+            except IntegrityError:
+                _insert_rows_individually(session, rows, outcome)
+            session.commit()
+        results.extend(outcome)
+    except SQLAlchemyError as e:
+        session.rollback()
+        # nothing of this chunk was stored; earlier chunks are committed, so report per row
+        results.extend({"row": row_no, "email": employee.email, "status": "error",
+                        "error": f"Database error: {str(e)}"} for row_no, employee, _ in valid)
+    finally:
+        session.close()
+
+
+def import_employees(fileobj, fmt: str, role: str, user=None, chunk_size: int = 500):
+    """Import employees (and default user accounts) from a CSV/JSONL stream.
+
+    Returns {"created": n, "failed": n, "results": [...]} with one result per input row.
+    """
+    if role != "Admin" or user is None or "Admin" not in user.roles:
+        raise HTTPException(status_code=403, detail="Only Admin can import employees.")
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {list(FORMATS)}")
+
+    grantable = set(user.roles) | set(DEFAULT_ROLES)
+    results = []
+    chunk = []
+    for record in read_records(fileobj, fmt):
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            _import_chunk(chunk, results, grantable)
+            chunk = []
+    if chunk:
+        _import_chunk(chunk, results, grantable)
+
+    employee_cache.invalidate(*[r["e_id"] for r in results if r["status"] == "created"])
+    results.sort(key=lambda r: r["row"])
+    created = sum(1 for r in results if r["status"] == "created")
+    return {"created": created, "failed": len(results) - created, "results": results}
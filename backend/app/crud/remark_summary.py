@@ -0,0 +1,171 @@
+"""
+Per-task remark summaries
+
+Kanban cards need comment counts, not comments. `remark_summaries` holds one document per
+task:
+
+    {_id: task_id, count, attachment_count, last_remark_at, last_author, last_remark_id}
+
+remarks_crud keeps it current with $inc/$set as remarks are added, updated and deleted, so
+reading summaries for a whole board is one indexed $in query. The first start after
+summaries were introduced recomputes them once from the remarks (one worker, claimed in
+remark_summary_state); a remark added on another worker at that moment can still be missed.
+If the collection ever drifts (e.g. remarks edited by hand), rebuild it from the backend
+directory, with the API stopped, with
+
+    python -m app.crud.remark_summary
+"""
+
+import logging
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError
+
+from app.database.mongodb_connection import (
+    remarks_collection,
+    remark_summaries_collection,
+    remark_summary_state_collection,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_SUMMARY_IDS = 1000
+
+
+def _empty(task_id):
+    return {
+        "task_id": task_id,
+        "count": 0,
+        "attachment_count": 0,
+        "last_remark_at": None,
+        "last_author": None,
+        "last_remark_id": None,
+    }
+
+
+def ensure_remark_indexes():
+    # serves getbytask and finding the newest remark of a task after a delete
+    remarks_collection.create_index([("task_id", ASCENDING), ("created_at", DESCENDING)])
+    backfill_remark_summaries()
+
+
+def backfill_remark_summaries():
+    """Recompute summaries from existing remarks, once, on the worker that claims it. Returns how many."""
+    try:
+        remark_summary_state_collection.insert_one({"_id": "backfill"})
+    except DuplicateKeyError:
+        return 0  # another worker has it (or had it)
+    try:
+        # Other workers may already be serving and counting new remarks into summaries, so
+        # summaries are overwritten ($set) from their remarks rather than skipped. Each task is
+        # aggregated just before its write, which keeps the window in which a concurrent remark
+        # is lost to a single task's round trip.
+        task_ids = remarks_collection.distinct("task_id")
+        for task_id in task_ids:
+            for doc in _aggregate({"task_id": task_id}):
+                remark_summaries_collection.update_one({"_id": doc.pop("_id")}, {"$set": doc}, upsert=True)
+    except BaseException:
+        remark_summary_state_collection.delete_one({"_id": "backfill"})  # the next start retries
+        raise
+    if task_ids:
+        logger.info(f"Backfilled remark summaries for {len(task_ids)} tasks")
+    return len(task_ids)
+
+
+def _set_latest_if_newer(remark):
+    remark_summaries_collection.update_one(
+        {
+            "_id": remark["task_id"],
+            "$or": [{"last_remark_at": None}, {"last_remark_at": {"$lte": remark["created_at"]}}],
+        },
+        {"$set": {
+            "last_remark_at": remark["created_at"],
+            "last_author": remark.get("created_by"),
+            "last_remark_id": str(remark["_id"]),
+        }},
+    )
+
+
+def on_remark_added(remark):
+    remark_summaries_collection.update_one(
+        {"_id": remark["task_id"]},
+        {
+            "$inc": {"count": 1, "attachment_count": 1 if remark.get("file_id") else 0},
+            "$setOnInsert": {"last_remark_at": None},
+        },
+        upsert=True,
+    )
+    _set_latest_if_newer(remark)
+
+
+def on_attachment_changed(task_id, had_file: bool, has_file: bool):
+    if had_file != has_file:
+        remark_summaries_collection.update_one(
+            {"_id": task_id}, {"$inc": {"attachment_count": 1 if has_file else -1}}
+        )
+
+
+def on_remark_deleted(remark):
+    remark_summaries_collection.update_one(
+        {"_id": remark["task_id"]},
+        {"$inc": {"count": -1, "attachment_count": -1 if remark.get("file_id") else 0}},
+    )
+    summary = remark_summaries_collection.find_one({"_id": remark["task_id"]})
+    if summary and summary.get("last_remark_id") == str(remark["_id"]):
+        # the newest remark went away: take the next one from the (task_id, created_at) index
+        latest = remarks_collection.find_one({"task_id": remark["task_id"]}, sort=[("created_at", DESCENDING)])
+        remark_summaries_collection.update_one(
+            {"_id": remark["task_id"]},
+            {"$set": {
+                "last_remark_at": latest["created_at"] if latest else None,
+                "last_author": latest.get("created_by") if latest else None,
+                "last_remark_id": str(latest["_id"]) if latest else None,
+            }},
+        )
+
+
+def get_remark_summaries(task_ids):
+    """task_id -> summary for every requested id (tasks without remarks get zero counts)"""
+    summaries = {t: _empty(t) for t in task_ids}
+    if task_ids:
+        for doc in remark_summaries_collection.find({"_id": {"$in": list(summaries)}}):
+            summary = summaries[doc["_id"]]
+            for key in ("count", "attachment_count", "last_remark_at", "last_author", "last_remark_id"):
+                summary[key] = doc.get(key, summary[key])
+    return summaries
+
+
+def with_remark_summaries(tasks):
+    """Copies of task dicts with a "remark_summary" key; the input dicts are left untouched"""
+    summaries = get_remark_summaries([t["t_id"] for t in tasks])
+    return [{**t, "remark_summary": summaries[t["t_id"]]} for t in tasks]
+
+
+def _aggregate(match=None):
+    pipeline = [
+        {"$match": match or {}},
+        {"$sort": {"task_id": 1, "created_at": -1}},
+        {"$group": {
+            "_id": "$task_id",
+            "count": {"$sum": 1},
+            "attachment_count": {"$sum": {"$cond": [{"$ifNull": ["$file_id", False]}, 1, 0]}},
+            "last_remark_at": {"$first": "$created_at"},
+            "last_author": {"$first": "$created_by"},
+            "last_remark_id": {"$first": {"$toString": "$_id"}},
+        }},
+    ]
+    return list(remarks_collection.aggregate(pipeline, allowDiskUse=True))
+
+
+def rebuild_remark_summaries():
+    """Recompute every summary from the remarks collection (replaces them all)"""
+    docs = _aggregate()
+    remark_summaries_collection.delete_many({})
+    if docs:
+        remark_summaries_collection.insert_many(docs)
+    return len(docs)
+
+
+if __name__ == "__main__":
+    remarks_collection.create_index([("task_id", ASCENDING), ("created_at", DESCENDING)])
+    print(f"Rebuilt remark summaries for {rebuild_remark_summaries()} tasks")
@@ -5,8 +5,10 @@ from app.database.mysql_connection import get_connection
 from app.database.mongodb_connection import remarks_collection
 from sqlalchemy.orm import Session
 from app.schemas.schemas import TaskSchema
-from app.utils.file_upload import save_file, delete_file
+from app.utils.file_upload import save_file, delete_file_later
+from app.utils.thumbnails import queue_thumbnails
 from app.utils.mongo_serializer import serialize_mongo
+from app.crud.remark_summary import on_remark_added, on_attachment_changed, on_remark_deleted
  
 def _is_manager(user) -> bool:
     return hasattr(user, "role") and ("Manager" in user.role if isinstance(user.role, list) else "Manager" in str(user.role))
@@ -51,6 +53,9 @@ def add_remark(task_id: int, comment: str, e_id: int, file=None, role: str = Non
         }
         result = remarks_collection.insert_one(remark)
         remark["_id"] = result.inserted_id
+        on_remark_added(remark)
+        # after the insert: the job writes the thumbnail ids onto this remark
+        queue_thumbnails(file_id, file.content_type if file else None, created_by=e_id)
         return serialize_mongo(remark)
     except HTTPException:
         raise
@@ -62,7 +67,7 @@ def add_remark(task_id: int, comment: str, e_id: int, file=None, role: str = Non
  
  
 def get_remarks_by_task(task_id: int):
-    docs = list(remarks_collection.find({"task_id": task_id}))
+    docs = list(remarks_collection.find({"task_id": task_id}).sort("created_at", 1))
     return [serialize_mongo(d) for d in docs]
 
 
@@ -80,12 +85,6 @@ def update_remark(remark_id: str, comment: str | None, file, e_id: int, role: st
         update_data["comment"] = comment
 
     if file:
-        if remark.get("file_id"):
-            try:
-                delete_file(remark["file_id"])
-            except Exception:
-                pass
-
         file_id = save_file(file)
         update_data["file_id"] = file_id
         update_data["file_name"] = file.filename
@@ -94,7 +93,15 @@ def update_remark(remark_id: str, comment: str | None, file, e_id: int, role: st
         raise HTTPException(status_code=400, detail="Nothing to update")
 
     update_data["updated_at"] = datetime.now(timezone.utc)
-    remarks_collection.update_one({"_id": ObjectId(remark_id)}, {"$set": update_data})
+    update = {"$set": update_data}
+    if file:
+        update["$unset"] = {"thumbnail_id": "", "preview_id": ""}  # they belong to the old attachment
+    remarks_collection.update_one({"_id": ObjectId(remark_id)}, update)
+    if file:
+        queue_thumbnails(update_data["file_id"], file.content_type, created_by=e_id)
+        if remark.get("file_id"):
+            delete_file_later(remark["file_id"], created_by=e_id)  # the replaced attachment
+    on_attachment_changed(remark["task_id"], bool(remark.get("file_id")), bool(remark.get("file_id") or file))
     updated = remarks_collection.find_one({"_id": ObjectId(remark_id)})
     return serialize_mongo(updated)
 
@@ -108,73 +115,8 @@ def delete_remark_by_id(remark_id: str, role: str, user):
     if not (role and role.upper() == "ADMIN") and remark.get("created_by") != getattr(user, "e_id", None):
         raise HTTPException(status_code=403, detail="Not allowed to delete this remark")
 
-    if remark.get("file_id"):
-        try:
-            delete_file(str(remark["file_id"]))
-        except Exception:
-            pass
-
-    remarks_collection.delete_one({"_id": ObjectId(remark_id)})
-    return {"message": "Remark and file deleted successfully", "remark_id": remark_id}
- 
- 
-def update_remark(
-    remark_id: str,
-    comment: str | None,
-    file,
-    e_id: int,
-    role: str
-):
-    remark = remarks_collection.find_one({"_id": ObjectId(remark_id)})
- 
-    if not remark:
-        raise HTTPException(status_code=404, detail="Remark not found")
- 
-    # 🔐 ownership check
-    if role != "ADMIN" and remark["e_id"] != e_id:
-        raise HTTPException(status_code=403, detail="Not allowed to update this remark")
- 
-    update_data = {}
- 
-    if comment:
-        update_data["comment"] = comment
- 
-    # 📎 replace file if uploaded
-    if file:
+    if remarks_collection.delete_one({"_id": ObjectId(remark_id)}).deleted_count:
+        on_remark_deleted(remark)
         if remark.get("file_id"):
-            delete_file(remark["file_id"])
- 
-        file_id = save_file(file)
-        update_data["file_id"] = file_id
-        update_data["file_name"] = file.filename
- 
-    if not update_data:
-        raise HTTPException(status_code=400, detail="Nothing to update")
- 
-    update_data["updated_at"] = datetime.now(timezone.utc)
- 
-    remarks_collection.update_one(
-        {"_id": ObjectId(remark_id)},
-        {"$set": update_data}
-    )
- 
-    updated = remarks_collection.find_one({"_id": ObjectId(remark_id)})
-    return serialize_mongo(updated)
- 
- 
-def delete_remark_by_id(remark_id: str):
-    remark = remarks_collection.find_one({"_id": ObjectId(remark_id)})
- 
-    if not remark:
-        raise Exception("Remark not found")
- 
-    # delete attached file if exists
-    if remark.get("file_id"):
-        delete_file(str(remark["file_id"]))
- 
-    remarks_collection.delete_one({"_id": ObjectId(remark_id)})
- 
-    return {
-        "message": "Remark and file deleted successfully",
-        "remark_id": remark_id
-    }
\ No newline at end of file
+            delete_file_later(remark["file_id"], created_by=getattr(user, "e_id", None))
+    return {"message": "Remark and file deleted successfully", "remark_id": remark_id}
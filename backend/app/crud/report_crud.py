@@ -0,0 +1,270 @@
+"""
+Weekly team reports (XLSX / PDF)
+
+POST /api/reports/team queues a background job that collects a manager's team (the manager
+and their direct reports), the tasks assigned to the team or reviewed by the manager that were
+open at some point in the ISO week, the remarks added to them that week and the closure
+stats, renders the file in the report process pool and stores it with the attachments. The finished
+report is downloaded through /api/file/{file_id}.
+
+Reports are cached in the `reports` collection by (team, week, format): asking again returns
+the stored file, or the job already underway. A week that has ended never changes, so its
+report is kept; the current week's report is rebuilt once it is older than
+REPORT_OPEN_PERIOD_TTL_SECONDS.
+"""
+
+import os
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+from sqlalchemy import select, or_
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.database.mysql_connection import get_read_connection
+from app.database.mongodb_connection import remarks_collection, reports_collection
+from app.schemas.schemas import TaskSchema, EmployeeSchema, TaskStatus
+from app.utils.file_storage import storage
+from app.utils.file_upload import delete_file_later
+from app.utils.job_queue import job_handler, enqueue
+from app.utils.report_render import render, CONTENT_TYPES, SUMMARY_ROWS
+
+REPORT_OPEN_PERIOD_TTL_SECONDS = float(os.getenv("REPORT_OPEN_PERIOD_TTL_SECONDS", "900"))
+FORMATS = tuple(CONTENT_TYPES)
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+WEEK = re.compile(r"^(\d{4})-W(\d{1,2})$")
+
+
+def parse_period(period: str = None):
+    """(label, start, end) of an ISO week such as 2026-W07; the last complete week by default"""
+    if not period:
+        last_week = datetime.now() - timedelta(days=7)
+        year, week, _ = last_week.isocalendar()
+    else:
+        m = WEEK.match(period.strip().upper())
+        if not m:
+            raise HTTPException(status_code=400, detail="period must be an ISO week like 2026-W07")
+        year, week = int(m.group(1)), int(m.group(2))
+    try:
+        start = datetime.fromisocalendar(year, week, 1)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{period} is not a valid ISO week")
+    return f"{year}-W{week:02d}", start, start + timedelta(days=7)
+
+
+def report_id(mgr_id: int, period: str, fmt: str) -> str:
+    return f"team-{mgr_id}-{period}-{fmt}"
+
+
+def _cycle_days(task):
+    begun = task["started_at"] or task["created_at"]
+    if not begun or not task["actual_closure"]:
+        return None
+    return (task["actual_closure"] - begun).total_seconds() / 86400
+
+
+def collect_team_report(mgr_id: int, start: datetime, end: datetime):
+    """Plain-data report for the renderers"""
+    session = None
+    try:
+        session = get_read_connection()
+        team = {
+            e.e_id: e.name
+            for e in session.execute(
+                select(EmployeeSchema.e_id, EmployeeSchema.name).where(
+                    or_(EmployeeSchema.e_id == mgr_id, EmployeeSchema.mgr_id == mgr_id)
+                )
+            ).all()
+        }
+        if mgr_id not in team:
+            raise HTTPException(status_code=404, detail="Manager not found")
+        columns = ["t_id", "title", "assigned_to", "status", "priority", "created_at", "started_at",
+                   "expected_closure", "actual_closure"]
+        rows = session.execute(
+            select(*[getattr(TaskSchema, c) for c in columns])
+            .where(
+                or_(TaskSchema.assigned_to.in_(list(team)), TaskSchema.reviewer == mgr_id),
+                TaskSchema.created_at < end,
+                or_(TaskSchema.actual_closure.is_(None), TaskSchema.actual_closure >= start),
+            )
+            .order_by(TaskSchema.t_id)
+        ).all()
+        # reviewed tasks can be assigned outside the team; names for the report only
+        names = dict(team)
+        others = {r.assigned_to for r in rows if r.assigned_to is not None} - set(team)
+        if others:
+            names.update(session.execute(
+                select(EmployeeSchema.e_id, EmployeeSchema.name).where(EmployeeSchema.e_id.in_(others))
+            ).all())
+    except SQLAlchemyError as e:
+        if session:
+            session.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    finally:
+        if session:
+            session.close()
+    tasks = [dict(zip(columns, row)) for row in rows]
+
+    remarks = list(remarks_collection.find(
+        {"task_id": {"$in": [t["t_id"] for t in tasks]}, "created_at": {"$gte": start, "$lt": end}},
+        {"task_id": 1, "created_by": 1, "created_at": 1, "comment": 1},
+    ).sort([("task_id", 1), ("created_at", 1)]))
+    remarks_per_task = defaultdict(int)
+    for r in remarks:
+        remarks_per_task[r["task_id"]] += 1
+
+    summary = {key: 0 for key, _ in SUMMARY_ROWS}
+    per_assignee = defaultdict(lambda: defaultdict(int))
+    cycle_days = []
+    for t in tasks:
+        closed = t["actual_closure"] is not None and t["actual_closure"] < end
+        on_time = closed and t["expected_closure"] is not None and t["actual_closure"] <= t["expected_closure"]
+        counts = {
+            "open_at_start": t["created_at"] is not None and t["created_at"] < start,
+            "created": t["created_at"] is not None and t["created_at"] >= start,
+            "closed": closed,
+            "closed_on_time": on_time,
+            "closed_late": closed and not on_time,
+            "open_at_end": not closed,
+            "overdue_at_end": not closed and t["expected_closure"] is not None and t["expected_closure"] < end,
+        }
+        assignee = per_assignee[t["assigned_to"]]
+        assignee["tasks"] += 1
+        assignee["remarks"] += remarks_per_task[t["t_id"]]
+        for key, hit in counts.items():
+            summary[key] += int(hit)
+            assignee[key] += int(hit)
+        if closed and _cycle_days(t) is not None:
+            cycle_days.append(_cycle_days(t))
+        t["assignee"] = names.get(t["assigned_to"], t["assigned_to"])
+        t["status"] = t["status"].value if isinstance(t["status"], TaskStatus) else t["status"]
+        t["priority"] = getattr(t["priority"], "value", t["priority"])
+        t["remarks"] = remarks_per_task[t["t_id"]]
+    summary["remarks"] = len(remarks)
+    summary["avg_cycle_days"] = round(sum(cycle_days) / len(cycle_days), 1) if cycle_days else None
+
+    return {
+        "manager": team[mgr_id],
+        "summary": summary,
+        "by_assignee": [
+            {"name": names.get(e_id, e_id if e_id is not None else "Unassigned"), **counts}
+            for e_id, counts in sorted(per_assignee.items(), key=lambda kv: str(names.get(kv[0], kv[0])))
+        ],
+        "tasks": tasks,
+        "remarks": [
+            {"task_id": r["task_id"], "author": names.get(r.get("created_by"), r.get("created_by")),
+             "created_at": r["created_at"], "comment": r.get("comment")}
+            for r in remarks
+        ],
+    }
+
+
+def _team_for(role, user, mgr_id):
+    """The manager whose team the caller may report on"""
+    if role not in user.roles:
+        raise HTTPException(status_code=403, detail="Not Authorized")
+    if role == "Admin":
+        if mgr_id is None:
+            raise HTTPException(status_code=400, detail="mgr_id is required")
+        return mgr_id
+    if role == "Manager":
+        if mgr_id not in (None, user.e_id):
+            raise HTTPException(status_code=403, detail="Managers can only report on their own team")
+        return user.e_id
+    raise HTTPException(status_code=403, detail="Only Managers and Admin can request team reports")
+
+
+def _public(report):
+    report = dict(report)
+    report["report_id"] = report.pop("_id")
+    if report.get("file_id"):
+        report["download_url"] = f"/api/file/{report['file_id']}"
+    return report
+
+
+def _fresh(report, now):
+    return report["status"] == DONE and (report.get("expires_at") is None or report["expires_at"] > now)
+
+
+def request_team_report(role, user, period: str = None, fmt: str = "xlsx", mgr_id: int = None):
+    """The cached report for (team, week, format), queueing its generation when needed"""
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {list(FORMATS)}")
+    mgr_id = _team_for(role, user, mgr_id)
+    label, start, end = parse_period(period)
+    rid = report_id(mgr_id, label, fmt)
+    now = datetime.now()
+
+    report = reports_collection.find_one({"_id": rid})
+    if report and (_fresh(report, now) or report["status"] in (PENDING, RUNNING)):
+        return _public(report)
+
+    previous_status = report["status"] if report else None
+    report = reports_collection.find_one_and_update(
+        {"_id": rid},
+        {
+            "$set": {"status": PENDING, "requested_by": user.e_id, "requested_at": now},
+            "$setOnInsert": {"mgr_id": mgr_id, "period": label, "format": fmt, "start": start, "end": end},
+        },
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    try:
+        job_id = enqueue("generate_report", {"report_id": rid}, dedup_key=f"report:{rid}", created_by=user.e_id)
+    except Exception:
+        # a PENDING report with no job would be handed out forever; the next request tries again
+        if previous_status is None:
+            reports_collection.delete_one({"_id": rid, "status": PENDING})
+        else:
+            reports_collection.update_one({"_id": rid, "status": PENDING}, {"$set": {"status": previous_status}})
+        raise
+    reports_collection.update_one({"_id": rid}, {"$set": {"job_id": job_id}})
+    report["job_id"] = job_id
+    return _public(report)
+
+
+def get_report(rid: str, role, user):
+    report = reports_collection.find_one({"_id": rid})
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+    _team_for(role, user, report["mgr_id"] if role == "Admin" else None)
+    if role != "Admin" and report["mgr_id"] != user.e_id:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return _public(report)
+
+
+@job_handler("generate_report")
+def generate_report(report_id: str):
+    report = reports_collection.find_one({"_id": report_id})
+    if not report:
+        return
+    reports_collection.update_one({"_id": report_id}, {"$set": {"status": RUNNING}})
+    try:
+        data = collect_team_report(report["mgr_id"], report["start"], report["end"])
+        data.update(period=report["period"], start=report["start"], end=report["end"])
+        content = render(report["format"], data)
+        file_id = storage.put(
+            content,
+            filename=f"team-report-{report['mgr_id']}-{report['period']}.{report['format']}",
+            content_type=CONTENT_TYPES[report["format"]],
+            metadata={"report_id": report_id},
+        )
+    except Exception as e:
+        reports_collection.update_one(
+            {"_id": report_id}, {"$set": {"status": FAILED, "error": str(getattr(e, "detail", None) or e)}}
+        )
+        raise
+
+    now = datetime.now()
+    # the week is still running: the report goes stale
+    expires_at = now + timedelta(seconds=REPORT_OPEN_PERIOD_TTL_SECONDS) if report["end"] > now else None
+    reports_collection.update_one(
+        {"_id": report_id},
+        {"$set": {"status": DONE, "file_id": file_id, "generated_at": now, "expires_at": expires_at},
+         "$unset": {"error": ""}},
+    )
+    if report.get("file_id") and report["file_id"] != file_id:
+        delete_file_later(report["file_id"], created_by=report.get("requested_by"))  # the previous build of a current-week report
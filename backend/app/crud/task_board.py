@@ -0,0 +1,129 @@
+"""
+Kanban board: the first page of every status column in one query
+
+    SELECT * FROM (
+        SELECT <cols>,
+               ROW_NUMBER() OVER (PARTITION BY status ORDER BY <priority rank>, expected_closure, t_id) AS rn,
+               COUNT(*)     OVER (PARTITION BY status) AS column_total
+        FROM tasks WHERE <visibility>
+    ) WHERE rn <= :limit
+
+Each column's order is (priority rank, expected_closure, t_id), which is unique, so the last
+card of a page is a keyset cursor: "load more" for one column selects the rows after that
+tuple in the same order instead of paging with OFFSET.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import select, case, func, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.database.mysql_connection import get_read_connection
+from app.crud.task_visibility import visible_tasks
+from app.crud.task_workflow import parse_status
+from app.crud.task_crud import TASK_COLUMNS, TASK_PROJECTIONS
+from app.schemas.schemas import TaskSchema, TaskStatus, TaskPriority
+from app.utils.orm_serializer import resolve_fields, row_to_dict
+
+MAX_COLUMN_LIMIT = 200
+
+# explicit comparisons so the enum is bound through the column type (stored as its name)
+PRIORITY_RANK = case(
+    (TaskSchema.priority == TaskPriority.HIGH, 0),
+    (TaskSchema.priority == TaskPriority.MEDIUM, 1),
+    else_=2,
+)
+COLUMN_ORDER = (PRIORITY_RANK, TaskSchema.expected_closure, TaskSchema.t_id)
+
+
+def _check_limit(limit):
+    if not 1 <= limit <= MAX_COLUMN_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_COLUMN_LIMIT}")
+
+
+def encode_cursor(row) -> str:
+    key = [row.priority_rank, row.expected_closure.isoformat(), row.t_id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        rank, closure, t_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return int(rank), datetime.fromisoformat(closure), int(t_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _select_columns(fields):
+    """Requested columns plus the ones the ordering and cursor need"""
+    columns = resolve_fields(fields, TASK_PROJECTIONS, TASK_COLUMNS, "t_id")
+    needed = list(dict.fromkeys(columns + ["status", "expected_closure"]))
+    return columns, [getattr(TaskSchema, c) for c in needed] + [PRIORITY_RANK.label("priority_rank")]
+
+
+def get_board(role, user, limit: int = 20, fields: str = "kanban"):
+    """{status: {"tasks", "total", "next_cursor"}} for all four columns, in one round trip"""
+    _check_limit(limit)
+    columns, selected = _select_columns(fields)
+    ranked = visible_tasks(
+        role, user, *selected,
+        func.row_number().over(partition_by=TaskSchema.status, order_by=COLUMN_ORDER).label("rn"),
+        func.count().over(partition_by=TaskSchema.status).label("column_total"),
+    ).subquery()
+    stmt = select(ranked).where(ranked.c.rn <= limit).order_by(ranked.c.status, ranked.c.rn)
+
+    session = None
+    try:
+        session = get_read_connection()
+        rows = session.execute(stmt).all()
+    except SQLAlchemyError as e:
+        if session:
+            session.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    finally:
+        if session:
+            session.close()
+
+    board = {s.value: {"tasks": [], "total": 0, "next_cursor": None} for s in TaskStatus}
+    for row in rows:
+        column = board[row.status.value]
+        column["tasks"].append(row_to_dict(row, columns))
+        column["total"] = row.column_total
+        if row.rn == limit and row.column_total > limit:
+            column["next_cursor"] = encode_cursor(row)
+    return board
+
+
+def get_board_column(role, user, status, after: str = None, limit: int = 20, fields: str = "kanban"):
+    """Next page of one column after `after` (a next_cursor from /Task/board or a previous page)"""
+    _check_limit(limit)
+    value = parse_status(status)
+    if value is None:
+        raise HTTPException(status_code=400, detail=f"Unknown status {status}")
+    columns, selected = _select_columns(fields)
+    stmt = visible_tasks(role, user, *selected).where(TaskSchema.status == value)
+    if after:
+        stmt = stmt.where(tuple_(*COLUMN_ORDER) > tuple_(*decode_cursor(after)))
+    stmt = stmt.order_by(*COLUMN_ORDER).limit(limit + 1)
+
+    session = None
+    try:
+        session = get_read_connection()
+        rows = session.execute(stmt).all()
+    except SQLAlchemyError as e:
+        if session:
+            session.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    finally:
+        if session:
+            session.close()
+
+    page = rows[:limit]
+    return {
+        "status": value.value,
+        "tasks": [row_to_dict(r, columns) for r in page],
+        "next_cursor": encode_cursor(page[-1]) if len(rows) > limit else None,
+    }
@@ -0,0 +1,165 @@
+"""
+Delta sync for task lists
+
+Every task write appends to task_changes in its own transaction; the autoincrement
+change_id is the sync token. /Task/changes?since=<token> returns the tasks changed after the
+token and the ids that were deleted (or are no longer visible to the caller), so a client
+refresh costs what actually changed instead of a full reload.
+
+Each change row carries a snapshot of the task's people columns and is filtered with the
+same visibility predicate as the task lists. A reassignment writes a "delete" for the old
+people before the "upsert" for the new ones, so the previous assignee learns that the task
+left their view.
+
+Rows older than TASK_CHANGE_RETENTION_DAYS are purged (the newest row is always kept so the
+oldest retained token stays known). A client whose token predates the retained window gets
+410 and must do a full resync. The newest TASK_CHANGE_SETTLE_SECONDS of changes are held back
+so a token never moves past an id whose transaction has not committed yet.
+
+Client protocol: call /Task/changes without `since` to get the current token, load the full
+list, then poll with `since`. Applying a change twice is harmless.
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import select, func, delete
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.database.mysql_connection import get_connection
+from app.crud.task_visibility import visibility_predicate, visible_tasks
+from app.schemas.schemas import TaskSchema, TaskChangeSchema
+from app.utils.orm_serializer import column_names, rows_to_dicts
+
+logger = logging.getLogger(__name__)
+
+TASK_CHANGE_RETENTION_DAYS = float(os.getenv("TASK_CHANGE_RETENTION_DAYS", "30"))
+TASK_CHANGE_PURGE_INTERVAL_SECONDS = float(os.getenv("TASK_CHANGE_PURGE_INTERVAL_SECONDS", "3600"))
+# Changes younger than this are held back: a slow transaction may still commit a lower change_id
+TASK_CHANGE_SETTLE_SECONDS = float(os.getenv("TASK_CHANGE_SETTLE_SECONDS", "2"))
+MAX_CHANGES_PER_PAGE = 1000
+
+PEOPLE = ("assigned_to", "assigned_by", "reviewer", "created_by")
+TASK_COLUMNS = column_names(TaskSchema)
+
+
+def _people(obj):
+    return {f: getattr(obj, f, None) for f in PEOPLE}
+
+
+def record_change(session, t_id, previous=None, now=None):
+    """Append an "upsert" for task t_id as it is now in this transaction.
+
+    `previous` is the task before the write (ORM object or Row); if its people differ from the
+    current ones, a "delete" carrying the old snapshot is written first.
+    """
+    now = now or datetime.now()
+    current = session.execute(select(*[getattr(TaskSchema, f) for f in PEOPLE]).where(TaskSchema.t_id == t_id)).first()
+    if current is None:
+        return
+    if previous is not None and _people(previous) != _people(current):
+        session.add(TaskChangeSchema(t_id=t_id, op="delete", changed_at=now, **_people(previous)))
+    session.add(TaskChangeSchema(t_id=t_id, op="upsert", changed_at=now, **_people(current)))
+    session.flush()
+
+
+def record_delete(session, task, now=None):
+    """Tombstone for a task that is being deleted"""
+    session.add(TaskChangeSchema(t_id=task.t_id, op="delete", changed_at=now or datetime.now(), **_people(task)))
+
+
+def get_task_changes(role, user, since=None, limit: int = MAX_CHANGES_PER_PAGE):
+    """{"token", "changed": [task dicts], "deleted": [t_id], "has_more"} for changes after `since`.
+
+    Without `since` only the current token is returned (with "resync": True).
+    """
+    predicate = visibility_predicate(role, user, entity=TaskChangeSchema)
+    limit = max(1, min(limit, MAX_CHANGES_PER_PAGE))
+    session = None
+    try:
+        session = get_connection()
+        oldest, latest = session.execute(
+            select(func.min(TaskChangeSchema.change_id), func.max(TaskChangeSchema.change_id))
+        ).one()
+        settled = datetime.now() - timedelta(seconds=TASK_CHANGE_SETTLE_SECONDS)
+        newest = session.execute(
+            select(func.max(TaskChangeSchema.change_id)).where(TaskChangeSchema.changed_at <= settled)
+        ).scalar() or 0
+        if since is None:
+            return {"token": newest, "resync": True, "changed": [], "deleted": [], "has_more": False}
+        if since > (latest or 0):
+            raise HTTPException(status_code=400, detail="Unknown sync token")
+        newest = max(newest, since)
+        if oldest is not None and since < oldest - 1:
+            raise HTTPException(
+                status_code=410,
+                detail={"message": "Sync token expired, reload the full task list", "resync": True, "token": newest},
+            )
+
+        changes = session.execute(
+            select(TaskChangeSchema.change_id, TaskChangeSchema.t_id, TaskChangeSchema.op)
+            .where(TaskChangeSchema.change_id > since, TaskChangeSchema.change_id <= newest, predicate)
+            .order_by(TaskChangeSchema.change_id)
+            .limit(limit + 1)
+        ).all()
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+        # scanned up to here; invisible changes in between are skipped by moving the token past them
+        token = changes[-1].change_id if has_more else newest
+
+        last_op = {}
+        for change in changes:
+            last_op[change.t_id] = change.op
+        upserted = [t for t, op in last_op.items() if op == "upsert"]
+        rows = session.execute(
+            visible_tasks(role, user, *[getattr(TaskSchema, c) for c in TASK_COLUMNS]).where(TaskSchema.t_id.in_(upserted))
+        ).all() if upserted else []
+        changed = rows_to_dicts(rows, TASK_COLUMNS)
+        present = {t["t_id"] for t in changed}
+        # deleted, or changed again since (e.g. reassigned away) and no longer visible now
+        deleted = [t for t, op in last_op.items() if op == "delete" or t not in present]
+        return {"token": token, "resync": False, "changed": changed, "deleted": deleted, "has_more": has_more}
+    except SQLAlchemyError as e:
+        if session:
+            session.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    finally:
+        if session:
+            session.close()
+
+
+def purge_task_changes(now=None) -> int:
+    """Delete change rows past the retention window, always keeping the newest one"""
+    cutoff = (now or datetime.now()) - timedelta(days=TASK_CHANGE_RETENTION_DAYS)
+    session = get_connection()
+    try:
+        newest = session.execute(select(func.max(TaskChangeSchema.change_id))).scalar()
+        if newest is None:
+            return 0
+        deleted = session.execute(
+            delete(TaskChangeSchema).where(TaskChangeSchema.changed_at < cutoff, TaskChangeSchema.change_id < newest)
+        ).rowcount
+        session.commit()
+        return deleted
+    except SQLAlchemyError:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+async def run_purge_loop(interval: float = TASK_CHANGE_PURGE_INTERVAL_SECONDS):
+    """Background task started with the API"""
+    while True:
+        try:
+            await asyncio.to_thread(purge_task_changes)
+        except Exception as e:
+            logger.warning(f"Task change purge failed: {str(e)}")
+        await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    print(f"Purged {purge_task_changes()} task changes")
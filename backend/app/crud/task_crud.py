@@ -1,13 +1,44 @@
-from app.database.mysql_connection import get_connection
-from app.crud.users_crud import get_user_by_id
-from app.schemas.schemas import TaskSchema
+from app.database.mysql_connection import get_connection, get_read_connection, reads_from_primary
+from app.crud.users_crud import get_user_by_id, grant_role_later
+from app.crud.task_visibility import visible_tasks, visible_flag, default_role, visibility_scope
+from app.crud.task_workflow import apply_transition, compare_and_set, version_conflict
+from app.crud.task_history import record_created, record_field_changes
+from app.crud.task_changes import record_change, record_delete
+from app.schemas.schemas import TaskSchema, TaskStatus as TaskStatusColumn
 from app.models.models import TaskReqRes
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import or_
+from app.utils.orm_serializer import column_names, rows_to_dicts, resolve_fields
+from app.utils.single_flight import read_coalescer
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy import select
 from fastapi import HTTPException
 from datetime import datetime, timezone
 import logging
 
+TASK_COLUMNS = column_names(TaskSchema)
+
+# Named column sets for list endpoints (?fields=kanban). Detail views keep full ORM hydration.
+TASK_PROJECTIONS = {
+    "kanban": ["t_id", "title", "status", "priority", "assigned_to", "version"],
+    "summary": ["t_id", "title", "status", "priority", "assigned_to", "reviewer", "expected_closure", "actual_closure", "version"],
+    "full": TASK_COLUMNS,
+}
+
+
+def _reload_conflict(t_id):
+    """Build the 409 after losing a compare-and-swap, reading the winner's state in a fresh session"""
+    session = get_connection()
+    try:
+        return version_conflict(session.query(TaskSchema).filter(TaskSchema.t_id == t_id).first())
+    finally:
+        session.close()
+
+
+def _check_version(t, expected_version):
+    # If-Match from the client; the UPDATE itself is also guarded by the version column
+    if expected_version is not None and t.version != expected_version:
+        raise version_conflict(t)
+
 
 def add_task(new_task: TaskReqRes, role, user):
     session = None
@@ -16,6 +47,7 @@ def add_task(new_task: TaskReqRes, role, user):
             raise HTTPException(status_code=403, detail="Only Manager and Admin can create a new task")
 
         session = get_connection()
+        now = datetime.now()
         task = TaskSchema(
             title=new_task.title,
             description=new_task.description,
@@ -29,26 +61,32 @@ def add_task(new_task: TaskReqRes, role, user):
             reviewer=new_task.reviewer,
             created_by=user.e_id,
             expected_closure=new_task.expected_closure,
-            actual_closure=None
+            actual_closure=None,
+            created_at=now,
+            status_changed_at=now,
         )
         # set assigned_at if assigned_to is present
         if task.assigned_to:
-            # ensure the assigned user has Developer role persisted
-            from app.crud.users_crud import add_role_to_user
-
-            add_role_to_user(task.assigned_to, "Developer")
             task.assigned_by = user.e_id
             task.assigned_at = datetime.now()
-        if task.reviewer:
-            # ensure the reviewer has Manager role persisted
-            from app.crud.users_crud import add_role_to_user
-
-            add_role_to_user(task.reviewer, "Manager")
 
         session.add(task)
+        session.flush()
+        record_created(session, task, user, now)
+        record_change(session, task.t_id, now=now)
         session.commit()
         session.refresh(task)
+        # ensure the assignee has the Developer and the reviewer the Manager role persisted
+        if task.assigned_to:
+            grant_role_later(task.assigned_to, "Developer", created_by=user.e_id)
+        if task.reviewer:
+            grant_role_later(task.reviewer, "Manager", created_by=user.e_id)
         return TaskReqRes.model_validate(task)
+    except IntegrityError:
+        if session:
+            session.rollback()
+        # a 409 tells clients not to retry, unlike the 500 this used to surface as
+        raise HTTPException(status_code=409, detail="A task with this description already exists")
     except SQLAlchemyError as e:
         if session:
             session.rollback()
@@ -58,33 +96,60 @@ def add_task(new_task: TaskReqRes, role, user):
             session.close()
 
 
-def get_all_tasks(role, user):
+def _status_column_value(status):
+    """Map a status from the API ("to_do" or "TO_DO") to the column enum, None if unknown"""
+    try:
+        return TaskStatusColumn(status)
+    except ValueError:
+        try:
+            return TaskStatusColumn[str(status).upper()]
+        except KeyError:
+            return None
+
+
+def get_all_tasks(role, user, fields="full", status=None):
+    columns = resolve_fields(fields, TASK_PROJECTIONS, TASK_COLUMNS, "t_id")
+    status_value = None
+    if status is not None:
+        status_value = _status_column_value(status)
+        if status_value is None:
+            return []
+    # The caller is authorized here (visibility_scope checks the role); identical concurrent
+    # queries from callers with the same scope then share one execution
+    key = ("tasks", tuple(columns), status_value, visibility_scope(role, user), reads_from_primary())
+    return list(read_coalescer.do(key, lambda: _query_tasks(role, user, columns, status_value)))
+
+
+def _query_tasks(role, user, columns, status_value=None):
     session = None
     try:
-        session = get_connection()
-        if role == "Manager":
-            if "Manager" in user.roles:
-                # Managers should see tasks they review, tasks they created, and tasks they assigned
-                tasks = session.query(TaskSchema).filter(
-                    or_(
-                        TaskSchema.reviewer == user.e_id,
-                        TaskSchema.created_by == user.e_id,
-                        TaskSchema.assigned_by == user.e_id,
-                    )
-                ).all()
-            else:
-                raise HTTPException(status_code=403, detail="Not Authorized")
-        elif role == "Admin":
-            if "Admin" in user.roles:
-                tasks = session.query(TaskSchema).all()
-            else:
-                raise HTTPException(status_code=403, detail="Not Authorized")
-        else:
-            if role in user.roles:
-                tasks = session.query(TaskSchema).filter(TaskSchema.assigned_to == user.e_id).all()
-            else:
-                raise HTTPException(status_code=403, detail="Not Authorized")
-        return [TaskReqRes.from_orm(t) for t in tasks]
+        # Column-only select over the caller's visible tasks: rows come back as plain tuples,
+        # no identity map or instrumentation, and authorization happens in the WHERE clause
+        stmt = visible_tasks(role, user, *[getattr(TaskSchema, c) for c in columns])
+        if status_value is not None:
+            stmt = stmt.where(TaskSchema.status == status_value)
+        session = get_read_connection()
+        tasks = session.execute(stmt).all()
+        # Trusted rows: serialize once to dicts, the router sends them with orjson
+        return rows_to_dicts(tasks, columns)
+    except SQLAlchemyError as e:
+        if session:
+            session.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    finally:
+        if session:
+            session.close()
+
+
+def get_visible_task_ids(task_ids, role, user):
+    """The subset of task_ids the caller may see acting as role"""
+    if not task_ids:
+        return set()
+    session = None
+    try:
+        session = get_read_connection()
+        stmt = visible_tasks(role, user, TaskSchema.t_id).where(TaskSchema.t_id.in_(task_ids))
+        return set(session.execute(stmt).scalars().all())
     except SQLAlchemyError as e:
         if session:
             session.rollback()
@@ -98,34 +163,17 @@ def get_all_tasks(role, user):
 def get_task_by_id(t_id: int, user):
     session = None
     try:
-        session = get_connection()
-        t = session.query(TaskSchema).filter(TaskSchema.t_id == t_id).first()
-        if not t:
+        session = get_read_connection()
+        # One query resolves both cases: no row -> 404, row with visible=False -> 403.
+        # Admin sees any task; Managers what they review/created/assigned; others what is assigned to them.
+        row = session.execute(
+            select(TaskSchema, visible_flag(default_role(user), user)).where(TaskSchema.t_id == t_id)
+        ).first()
+        if not row:
             raise HTTPException(status_code=404, detail="Task Not Found")
-        # Authorization logic:
-        # - Admin can view any task
-        # - Manager can view if they are the reviewer, the creator, or the assigner
-        # - Developers (and others) can view only if they are the assigned_to
-        if "Admin" not in user.roles:
-            if "Manager" in user.roles:
-                if not (
-                    t.reviewer == user.e_id
-                    or t.created_by == user.e_id
-                    or t.assigned_by == user.e_id
-                ):
-                    raise HTTPException(status_code=403, detail="Not authorized to view this task")
-            else:
-                # Non-manager (e.g., developer) must be the assignee
-                if t.assigned_to != user.e_id:
-                    raise HTTPException(status_code=403, detail="Not authorized to view this task")
-        # Optional: Add authorization check
-        # Uncomment if you want to restrict access based on user role
-        # if "Admin" not in user.role:
-        #     if "Manager" in user.role and t.reviewer != user.e_id:
-        #         raise HTTPException(status_code=403, detail="Not authorized to view this task")
-        #     elif t.assigned_to != user.e_id:
-        #         raise HTTPException(status_code=403, detail="Not authorized to view this task")
-        
+        t, visible = row
+        if not visible:
+            raise HTTPException(status_code=403, detail="Not authorized to view this task")
         return TaskReqRes.model_validate(t)
     except SQLAlchemyError as e:
         if session:
@@ -136,13 +184,8 @@ def get_task_by_id(t_id: int, user):
             session.close()
 
 
-def get_task_by_status(status, role, user):
-    try:
-        data = get_all_tasks(role, user)
-        new_data = [task for task in data if task.status == status]
-        return new_data
-    except SQLAlchemyError as e:
-        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+def get_task_by_status(status, role, user, fields="full"):
+    return get_all_tasks(role, user, fields, status=status)
 
 
 def update_task(
@@ -155,12 +198,13 @@ def update_task(
     reviewer: int = None,
     expected_closure: datetime = None,
     role: str = None,
-    user= None
+    user= None,
+    expected_version: int = None
 ) :
     session = None
     try:
         # Role-based access control
-        if role not in ["Manager", "Admin"]:
+        if role not in ["Manager", "Admin"] or role not in user.roles:
             raise HTTPException(status_code=403, detail="You don't have permission to update this task")
         session=get_connection()
         # Retrieve task
@@ -172,47 +216,56 @@ def update_task(
         logging.info(f"update_task called t_id={t_id} assigned_to={assigned_to} priority={priority} status={status} reviewer={reviewer} expected_closure={expected_closure}")
         logging.info(f"existing task: assigned_to={t.assigned_to} assigned_by={t.assigned_by} reviewer={t.reviewer} status={t.status}")
 
-        # Update fields if provided
+        # Collect the changes; they are written by one version-guarded UPDATE below
+        values = {}
         if title:
-            t.title = title
+            values["title"] = title
         if description:
-            t.description = description
+            values["description"] = description
         if assigned_to is not None:
             assigned_user = get_user_by_id(assigned_to)
             if not assigned_user:
                 raise HTTPException(status_code=404, detail="Assigned user not found")
-            t.assigned_to = assigned_to
-            t.assigned_at = datetime.now()  # Update assignment timestamp
-
-            t.assigned_by = user.e_id
-            # ensure assigned user has Developer role persisted
-            from app.crud.users_crud import add_role_to_user
-            add_role_to_user(assigned_to, "Developer")
+            values["assigned_to"] = assigned_to
+            values["assigned_at"] = datetime.now()  # Update assignment timestamp
+            values["assigned_by"] = user.e_id
         if priority:
-            t.priority = priority
-        if status:
-            patch_status(t_id=t_id, status=status, role=role, user=user, session=session)
-            t.status = status
+            values["priority"] = priority
         if reviewer is not None:
             reviewer_user = get_user_by_id(reviewer)
             if not reviewer_user:
                 raise HTTPException(status_code=404, detail="Reviewer not found")
-            t.reviewer = reviewer
-            # ensure reviewer has Manager role persisted
-            from app.crud.users_crud import add_role_to_user
-            add_role_to_user(reviewer, "Manager")
+            values["reviewer"] = reviewer
         if expected_closure:
-            t.expected_closure = expected_closure
+            values["expected_closure"] = expected_closure
 
         # Update timestamps
-        t.updated_by = user.e_id
-        t.updated_at = datetime.now()
+        now = datetime.now()
+        values["updated_by"] = user.e_id
+        values["updated_at"] = now
+        # History rows go in the same transaction; the status move records its own
+        record_field_changes(session, t_id, t, values, user, now)
 
+        if status:
+            # The status move goes through the workflow engine, carrying the other changes along;
+            # it checks If-Match only after the reviewer/assignee check (the 409 carries the task)
+            expected = t.version if expected_version is None else expected_version
+            apply_transition(session, t_id, status, role, user, expected_version=expected, values=values, previous=t)
+        else:
+            _check_version(t, expected_version)
+            if not compare_and_set(session, t_id, t.version, values, previous=t):
+                session.rollback()
+                raise _reload_conflict(t_id)
 
         # Commit the transaction
         session.commit()
         logging.info(f"update_task committed for t_id={t_id}")
         session.refresh(t)
+        # ensure the new assignee has the Developer and the new reviewer the Manager role persisted
+        if assigned_to is not None:
+            grant_role_later(assigned_to, "Developer", created_by=user.e_id)
+        if reviewer is not None:
+            grant_role_later(reviewer, "Manager", created_by=user.e_id)
 
         # Return updated task as a response
         return TaskReqRes.model_validate(t)
@@ -225,7 +278,7 @@ def update_task(
         if session:
             session.close()
 
-def patch_priority(t_id: int, priority: str, role: str, user):
+def patch_priority(t_id: int, priority: str, role: str, user, expected_version: int = None):
     session = None
     try:
         # Retrieve task
@@ -235,7 +288,7 @@ def patch_priority(t_id: int, priority: str, role: str, user):
             raise HTTPException(status_code=404, detail="Task not found")
 
         # Check if the user has permission to change the priority
-        if role not in ["Manager", "Admin"]:
+        if role not in ["Manager", "Admin"] or role not in user.roles:
             raise HTTPException(status_code=403, detail="You do not have permission to change the priority of this task")
 
         # Ensure the user is the manager of the task if they are not an Admin
@@ -243,10 +296,17 @@ def patch_priority(t_id: int, priority: str, role: str, user):
             if user.e_id != t.reviewer:  # Assuming `reviewer` is the manager of the task
                 raise HTTPException(status_code=403, detail="You are not the manager of this task")
 
+        # only after the permission checks: the 409 carries the task
+        _check_version(t, expected_version)
+
         # Update the priority of the task
+        now = datetime.now()
+        record_field_changes(session, t_id, t, {"priority": priority}, user, now)
         t.priority = priority
         t.updated_by = user.e_id
-        t.updated_at = datetime.now()
+        t.updated_at = now
+        session.flush()  # the version-guarded UPDATE; StaleDataError if someone else won
+        record_change(session, t_id, now=now)
 
         # Commit transaction
         session.commit()
@@ -255,6 +315,9 @@ def patch_priority(t_id: int, priority: str, role: str, user):
         # Return updated task as a response
         return TaskReqRes.from_orm(t)
 
+    except StaleDataError:
+        session.rollback()
+        raise _reload_conflict(t_id)
     except SQLAlchemyError as e:
         if session:
             session.rollback()
@@ -264,49 +327,21 @@ def patch_priority(t_id: int, priority: str, role: str, user):
             session.close()
 
 
-def patch_status(t_id, status, role, user, session=None):
-    # If a session is provided, operate within it without committing/closing here.
-    created_session = False
+def patch_status(t_id, status, role, user, expected_version=None):
+    session = None
     try:
-        if session is None:
-            session = get_connection()
-            created_session = True
-
+        session = get_connection()
+        # One conditional UPDATE; 404/403/409 are worked out only if it matches no row
+        apply_transition(session, t_id, status, role, user, expected_version=expected_version)
+        session.commit()
         t = session.query(TaskSchema).filter(TaskSchema.t_id == t_id).first()
-        if not t:
-            raise HTTPException(status_code=404, detail="Task Not Found")
-        
-        if role == "Manager":
-            if user.e_id != t.reviewer:
-                raise HTTPException(status_code=403, detail="Not Reviewer for the task")
-            if (status.upper() == "IN_PROGRESS" or status.upper() == "DONE") and t.status.upper() == "REVIEW":
-                if status.upper() == "DONE":
-                    t.actual_closure = datetime.now()
-                t.status = status
-            else:
-                raise HTTPException(status_code=409, detail="Can only change status to IN_PROGRESS or DONE from REVIEW status")
-        else:
-            if user.e_id != t.assigned_to:
-                raise HTTPException(status_code=403, detail="Not assigned to this task")
-            if status.upper() == "IN_PROGRESS"  and t.status.upper() == "TO_DO":
-                t.status = status
-            elif status.upper() == "REVIEW" and t.status.upper() == "IN_PROGRESS":
-                t.status = status
-            else:
-                raise HTTPException(status_code=409, detail="Can only change status from TO_DO to IN_PROGRESS or from IN_PROGRESS to REVIEW")
-
-        if created_session:
-            session.commit()
-            session.refresh(t)
-            return TaskReqRes.model_validate(t)
-        else:
-            return TaskReqRes.model_validate(t)
+        return TaskReqRes.model_validate(t)
     except SQLAlchemyError as e:
-        if created_session and session:
+        if session:
             session.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
     finally:
-        if created_session and session:
+        if session:
             session.close()
 
 
@@ -322,6 +357,7 @@ def delete_task(t_id: int, user):
         if "Admin" not in user.roles:
             raise HTTPException(status_code=403, detail="Only Admin can delete tasks")
         
+        record_delete(session, t)
         session.delete(t)
         session.commit()
         return {"detail": "Task Deleted Successfully"}
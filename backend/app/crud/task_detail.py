@@ -0,0 +1,67 @@
+"""
+Composite task detail for /Task/{t_id}/full
+
+Opening a task needs the task row (MySQL), its remarks (Mongo) and the people on it
+(MySQL). The three reads are independent - the employee query selects by subquery on the
+task instead of waiting for the task row - so they run concurrently on the threadpool and
+the request takes as long as the slowest store rather than the sum of all of them.
+Visibility is decided by the task read; if it fails, the other results are discarded.
+"""
+
+import asyncio
+
+from fastapi import HTTPException
+from sqlalchemy import select, union
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+
+from app.database.mysql_connection import get_connection
+from app.crud.task_crud import get_task_by_id
+from app.crud.remarks_crud import get_remarks_by_task
+from app.crud.employee_cache import employee_cache, EMPLOYEE_COLUMNS
+from app.schemas.schemas import TaskSchema, EmployeeSchema
+from app.utils.orm_serializer import rows_to_dicts
+
+PEOPLE_FIELDS = ("assigned_to", "assigned_by", "reviewer", "created_by", "updated_by")
+
+
+def get_task_people(t_id: int):
+    """e_id -> employee dict for everyone referenced by task t_id, in one query"""
+    session = None
+    try:
+        session = get_connection()
+        ids = union(*[select(getattr(TaskSchema, f)).where(TaskSchema.t_id == t_id) for f in PEOPLE_FIELDS])
+        generation = employee_cache.generation
+        rows = rows_to_dicts(
+            session.execute(
+                select(*[getattr(EmployeeSchema, c) for c in EMPLOYEE_COLUMNS]).where(EmployeeSchema.e_id.in_(ids))
+            ).all(),
+            EMPLOYEE_COLUMNS,
+        )
+        employee_cache.fill(rows, [r["e_id"] for r in rows], generation)
+        return {r["e_id"]: r for r in rows}
+    except SQLAlchemyError as e:
+        if session:
+            session.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    finally:
+        if session:
+            session.close()
+
+
+async def get_task_full(t_id: int, user):
+    """Task, remarks (oldest first) and the referenced employees, keyed by role on the task"""
+    task, remarks, people = await asyncio.gather(
+        run_in_threadpool(get_task_by_id, t_id, user),
+        run_in_threadpool(get_remarks_by_task, t_id),
+        run_in_threadpool(get_task_people, t_id),
+        return_exceptions=True,
+    )
+    for result in (task, remarks, people):
+        if isinstance(result, BaseException):
+            raise result
+    return {
+        "task": task.model_dump(mode="json"),
+        "remarks": remarks,
+        "people": {f: people.get(getattr(task, f)) for f in PEOPLE_FIELDS},
+    }
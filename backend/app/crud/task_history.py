@@ -0,0 +1,170 @@
+"""
+Task change history and incrementally maintained flow analytics
+
+Every task write appends to task_history inside its own transaction. Status moves also fold
+their durations into task_flow_stats (time in each status, lead time, cycle time) per
+assignee and per reviewer, so /Task/analytics reads a handful of rows instead of scanning
+the history.
+"""
+
+from datetime import datetime
+from enum import Enum
+
+from fastapi import HTTPException
+from sqlalchemy import select, update, or_
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from app.database.mysql_connection import get_connection
+from app.schemas.schemas import (
+    TaskSchema, TaskHistorySchema, TaskFlowStatSchema, TaskStatus, EmployeeSchema,
+)
+
+DIMENSIONS = {"assignee": "assigned_to", "reviewer": "reviewer"}
+
+
+def _text(value):
+    if value is None:
+        return None
+    if isinstance(value, Enum):
+        return value.name
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)[:255]
+
+
+def record_field_changes(session, t_id, old, values, user, now):
+    """Append one history row per column in `values` whose value differs from `old`.
+
+    `old` is anything exposing the previous column values as attributes (ORM object or Row).
+    """
+    rows = []
+    for field, new in values.items():
+        if field in ("updated_by", "updated_at", "version"):
+            continue
+        previous = getattr(old, field, None)
+        before = _text(previous)
+        # enum columns are written as names ("LOW") or values ("low"); compare by name
+        after = new.upper() if isinstance(previous, Enum) and isinstance(new, str) else _text(new)
+        if before != after:
+            rows.append(TaskHistorySchema(
+                t_id=t_id, field=field, old_value=before, new_value=after,
+                changed_by=user.e_id, changed_at=now,
+            ))
+    session.add_all(rows)
+
+
+def record_created(session, task, user, now):
+    session.add(TaskHistorySchema(
+        t_id=task.t_id, field="status", old_value=None, new_value=_text(task.status),
+        changed_by=user.e_id, changed_at=now,
+    ))
+
+
+def _add_sample(session, dimension, e_id, metric, seconds):
+    """total += seconds, samples += 1 for one stats row, creating it on first use"""
+    key = (
+        TaskFlowStatSchema.dimension == dimension,
+        TaskFlowStatSchema.e_id == e_id,
+        TaskFlowStatSchema.metric == metric,
+    )
+    bump = update(TaskFlowStatSchema).where(*key).values(
+        total_seconds=TaskFlowStatSchema.total_seconds + seconds,
+        samples=TaskFlowStatSchema.samples + 1,
+    )
+    if session.execute(bump).rowcount:
+        return
+    try:
+        with session.begin_nested():
+            session.add(TaskFlowStatSchema(
+                dimension=dimension, e_id=e_id, metric=metric, total_seconds=seconds, samples=1,
+            ))
+    except IntegrityError:
+        # another transaction created the row first
+        session.execute(bump)
+
+
+def _add_samples(session, task, metric, seconds):
+    for dimension, column in DIMENSIONS.items():
+        e_id = getattr(task, column)
+        if e_id is not None:
+            _add_sample(session, dimension, e_id, metric, max(seconds, 0.0))
+
+
+def record_transition(session, t_id, from_status, to_status, user, now):
+    """History row, workflow timestamps and flow stats for a status move already applied by the caller.
+
+    Must run in the transaction that performed the conditional UPDATE: the row is locked by then,
+    and status_changed_at still holds the time the task entered `from_status`.
+    """
+    task = session.execute(
+        select(
+            TaskSchema.assigned_to, TaskSchema.reviewer, TaskSchema.created_at,
+            TaskSchema.started_at, TaskSchema.status_changed_at, TaskSchema.assigned_at,
+        ).where(TaskSchema.t_id == t_id)
+    ).first()
+
+    session.add(TaskHistorySchema(
+        t_id=t_id, field="status", old_value=from_status.name, new_value=to_status.name,
+        changed_by=user.e_id, changed_at=now,
+    ))
+
+    # Tasks from before migration 0003 have no status_changed_at until their first move here; when
+    # they entered the status is unknown, so that move gives no time-in-status sample
+    if task.status_changed_at is not None:
+        _add_samples(
+            session, task, f"time_in_{from_status.value}", (now - task.status_changed_at).total_seconds()
+        )
+    if to_status == TaskStatus.DONE:
+        if task.created_at is not None:
+            _add_samples(session, task, "lead_time", (now - task.created_at).total_seconds())
+        if task.started_at is not None:
+            _add_samples(session, task, "cycle_time", (now - task.started_at).total_seconds())
+
+    stamps = {"status_changed_at": now}
+    if to_status == TaskStatus.IN_PROGRESS and task.started_at is None:
+        stamps["started_at"] = now
+    session.execute(
+        update(TaskSchema).where(TaskSchema.t_id == t_id).values(**stamps)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def get_task_analytics(role: str, user, dimension: str = "assignee", e_id: int = None):
+    """Averages per person from task_flow_stats.
+
+    Admin sees everyone, a Manager sees themselves and their direct reports, anyone else
+    only their own numbers.
+    """
+    if dimension not in DIMENSIONS:
+        raise HTTPException(status_code=400, detail=f"dimension must be one of {sorted(DIMENSIONS)}")
+    if role not in user.roles:
+        raise HTTPException(status_code=403, detail="Not Authorized")
+
+    session = None
+    try:
+        session = get_connection()
+        stmt = select(TaskFlowStatSchema).where(TaskFlowStatSchema.dimension == dimension)
+        if role == "Manager":
+            team = select(EmployeeSchema.e_id).where(EmployeeSchema.mgr_id == user.e_id)
+            stmt = stmt.where(or_(TaskFlowStatSchema.e_id == user.e_id, TaskFlowStatSchema.e_id.in_(team)))
+        elif role != "Admin":
+            stmt = stmt.where(TaskFlowStatSchema.e_id == user.e_id)
+        if e_id is not None:
+            stmt = stmt.where(TaskFlowStatSchema.e_id == e_id)
+
+        people = {}
+        for stat in session.execute(stmt).scalars():
+            metrics = people.setdefault(stat.e_id, {})
+            metrics[stat.metric] = {
+                "avg_seconds": stat.total_seconds / stat.samples if stat.samples else None,
+                "total_seconds": stat.total_seconds,
+                "samples": stat.samples,
+            }
+        return [{"dimension": dimension, "e_id": k, "metrics": v} for k, v in sorted(people.items())]
+    except SQLAlchemyError as e:
+        if session:
+            session.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    finally:
+        if session:
+            session.close()
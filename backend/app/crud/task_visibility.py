@@ -0,0 +1,73 @@
+"""
+Task visibility rules as composable SQL predicates
+
+Every task query (lists, single task, status filters, and anything built on top of them) goes
+through these helpers so authorization is always pushed into the WHERE clause:
+
+- Admin sees every task
+- Manager sees tasks they review, created, or assigned
+- anyone else (Developer) sees the tasks assigned to them
+"""
+
+from fastapi import HTTPException
+from sqlalchemy import or_, select, true, case
+
+from app.schemas.schemas import TaskSchema
+
+
+def check_role(role: str, user):
+    """Raise 403 unless the caller actually holds the role they are acting as"""
+    if role not in user.roles:
+        raise HTTPException(status_code=403, detail="Not Authorized")
+
+
+def default_role(user) -> str:
+    """The broadest role a user holds, used when an endpoint has no explicit role parameter"""
+    if "Admin" in user.roles:
+        return "Admin"
+    if "Manager" in user.roles:
+        return "Manager"
+    return "Developer"
+
+
+def visibility_predicate(role: str, user, entity=TaskSchema):
+    """WHERE clause restricting `entity` to the tasks `user` may see when acting as `role`.
+
+    `entity` can be any table or alias exposing the task's people columns (reviewer, created_by,
+    assigned_by, assigned_to), so the same rules apply to joins, subqueries and history tables.
+    """
+    check_role(role, user)
+    if role == "Admin":
+        return true()
+    if role == "Manager":
+        return or_(
+            entity.reviewer == user.e_id,
+            entity.created_by == user.e_id,
+            entity.assigned_by == user.e_id,
+        )
+    return entity.assigned_to == user.e_id
+
+
+def visibility_scope(role: str, user):
+    """Hashable description of which rows visibility_predicate(role, user) admits.
+
+    Callers with equal scopes see exactly the same tasks (used to share query results).
+    """
+    check_role(role, user)
+    if role == "Admin":
+        return ("all",)
+    return (role if role == "Manager" else "Developer", user.e_id)
+
+
+def visible_tasks(role: str, user, *columns):
+    """select() of the given columns (default: the TaskSchema entity) over the visible tasks"""
+    stmt = select(*columns) if columns else select(TaskSchema)
+    return stmt.where(visibility_predicate(role, user))
+
+
+def visible_flag(role: str, user):
+    """The visibility predicate as a selectable boolean column.
+
+    Lets a single query tell "not found" (no row) apart from "forbidden" (row, flag false).
+    """
+    return case((visibility_predicate(role, user), True), else_=False).label("visible")
@@ -0,0 +1,140 @@
+"""
+Declarative task workflow
+
+Allowed status moves live in TRANSITIONS. A move is applied as a single conditional UPDATE
+
+    UPDATE tasks SET status = :to, version = version + 1, ...
+    WHERE t_id = :id AND status = :from AND <actor predicate> [AND version = :expected]
+
+so there is no read-check-write window. When no row is affected, one follow-up SELECT works
+out why and maps it to 404 (no task), 403 (not the reviewer/assignee) or 409 (wrong state or
+stale version). update_task and any bulk endpoint apply their changes through this module.
+"""
+
+from datetime import datetime
+from typing import NamedTuple, Callable, Dict, Any, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import update, select, case
+
+from app.models.models import TaskReqRes
+from app.crud.task_history import record_transition
+from app.crud.task_changes import record_change
+from app.schemas.schemas import TaskSchema, TaskStatus
+
+
+class Transition(NamedTuple):
+    role: str
+    from_status: TaskStatus
+    to_status: TaskStatus
+    # extra columns to set, computed from (user, now) when the move is applied
+    side_effects: Optional[Dict[str, Callable[[Any, datetime], Any]]] = None
+
+
+TRANSITIONS = [
+    Transition("Developer", TaskStatus.TO_DO, TaskStatus.IN_PROGRESS),
+    Transition("Developer", TaskStatus.IN_PROGRESS, TaskStatus.REVIEW),
+    Transition("Manager", TaskStatus.REVIEW, TaskStatus.IN_PROGRESS),
+    Transition("Manager", TaskStatus.REVIEW, TaskStatus.DONE, {"actual_closure": lambda user, now: now}),
+]
+
+# Who may move a task when acting as each role
+ACTORS = {
+    "Manager": (lambda user: TaskSchema.reviewer == user.e_id, "Not Reviewer for the task"),
+    "Developer": (lambda user: TaskSchema.assigned_to == user.e_id, "Not assigned to this task"),
+}
+
+
+def version_conflict(t):
+    """409 carrying the task as it is now, so the client can re-apply its change without reloading the board"""
+    current = TaskReqRes.model_validate(t).model_dump(mode="json") if t is not None else None
+    return HTTPException(
+        status_code=409,
+        detail={"message": "Task was modified by someone else", "task": current},
+    )
+
+
+def actor_for(role: str) -> str:
+    # Reviewers act as "Manager"; every other role moves tasks as the assignee
+    return "Manager" if role == "Manager" else "Developer"
+
+
+def parse_status(status):
+    """TaskStatus for "IN_PROGRESS" / "in_progress" / TaskStatus, None if unknown"""
+    if isinstance(status, TaskStatus):
+        return status
+    try:
+        return TaskStatus[str(status).upper()]
+    except KeyError:
+        try:
+            return TaskStatus(str(status).lower())
+        except ValueError:
+            return None
+
+
+def _describe(actor):
+    moves = [f"from {t.from_status.name} to {t.to_status.name}" for t in TRANSITIONS if t.role == actor]
+    return "Can only change status " + " or ".join(moves)
+
+
+def _diagnose(session, t_id, actor, user, expected_version):
+    """Explain a zero-row UPDATE with one SELECT"""
+    predicate, forbidden = ACTORS[actor]
+    row = session.execute(
+        select(TaskSchema, case((predicate(user), True), else_=False)).where(TaskSchema.t_id == t_id)
+    ).first()
+    if not row:
+        return HTTPException(status_code=404, detail="Task Not Found")
+    t, allowed = row
+    if not allowed:
+        return HTTPException(status_code=403, detail=forbidden)
+    if expected_version is not None and t.version != expected_version:
+        return version_conflict(t)
+    return HTTPException(status_code=409, detail=_describe(actor))
+
+
+def compare_and_set(session, t_id, expected_version, values, where=(), previous=None):
+    """UPDATE one task guarded by its version (and any extra `where` clauses); bumps the version.
+
+    Returns True if the row was updated, in which case the change feed entry is written too
+    (`previous` is the task before the write, if the caller has it). Does not commit.
+    """
+    stmt = update(TaskSchema).where(TaskSchema.t_id == t_id, *where)
+    if expected_version is not None:
+        stmt = stmt.where(TaskSchema.version == expected_version)
+    stmt = stmt.values(version=TaskSchema.version + 1, **values).execution_options(synchronize_session=False)
+    if session.execute(stmt).rowcount != 1:
+        return False
+    record_change(session, t_id, previous)
+    return True
+
+
+def apply_transition(session, t_id, status, role, user, expected_version=None, values=None, previous=None):
+    """Move task `t_id` to `status` as `role`, together with any other column `values`.
+
+    Runs inside the caller's transaction (history and flow stats are written in it too);
+    raises HTTPException 404/403/409 and does not commit.
+    """
+    actor = actor_for(role)
+    target = parse_status(status)
+    candidates = [t for t in TRANSITIONS if t.role == actor and t.to_status == target]
+    predicate, _ = ACTORS[actor]
+    now = datetime.now()
+
+    for transition in candidates:
+        row_values = dict(values or {})
+        row_values["status"] = transition.to_status
+        for column, compute in (transition.side_effects or {}).items():
+            row_values[column] = compute(user, now)
+        if compare_and_set(
+            session,
+            t_id,
+            expected_version,
+            row_values,
+            where=(TaskSchema.status == transition.from_status, predicate(user)),
+            previous=previous,
+        ):
+            record_transition(session, t_id, transition.from_status, transition.to_status, user, now)
+            return transition
+
+    raise _diagnose(session, t_id, actor, user, expected_version)
@@ -1,6 +1,9 @@
-from app.database.mysql_connection import get_connection
+from app.database.mysql_connection import get_connection, get_read_connection
 from app.schemas.schemas import UserSchema
 from app.models.models import UserReqRes
+from app.core.passwords import hash_password
+from app.utils.job_queue import job_handler, defer
+from sqlalchemy import update
 from sqlalchemy.exc import SQLAlchemyError
 from fastapi import HTTPException
 
@@ -50,7 +53,7 @@ def add_user(new_user: UserReqRes):
         session = get_connection()
         user = UserSchema(
             e_id=new_user.e_id,
-            password=new_user.password or "password123",
+            password=hash_password(new_user.password or "password123"),
             roles=_ensure_roles_list(new_user.roles),
             status=new_user.status,
         )
@@ -74,7 +77,7 @@ def add_user(new_user: UserReqRes):
 
 def get_all_users():
     try:
-        session = get_connection()
+        session = get_read_connection()
         users = session.query(UserSchema).all()
         res = []
         for u in users:
@@ -133,6 +136,8 @@ def update_user(e_id: int, updated: dict):
         if "role" in updated:
             # normalize to stored representation (JSON/list supported by SQLAlchemy JSON)
             updated["roles"] = _ensure_roles_list(updated["roles"]) if updated["roles"] is not None else u.role
+        if updated.get("password"):
+            updated["password"] = hash_password(updated["password"])
         for key, value in updated.items():
             setattr(u, key, value)
         session.commit()
@@ -145,6 +150,24 @@ def update_user(e_id: int, updated: dict):
         session.close()
 
 
+def replace_password_hash(e_id: int, old: str, new: str) -> bool:
+    """Swap the stored password for a rehashed one, unless it changed since it was read"""
+    try:
+        session = get_connection()
+        result = session.execute(
+            update(UserSchema)
+            .where(UserSchema.e_id == e_id, UserSchema.password == old)
+            .values(password=new)
+        )
+        session.commit()
+        return result.rowcount == 1
+    except SQLAlchemyError as e:
+        session.rollback()
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    finally:
+        session.close()
+
+
 def delete_user(e_id: int):
     try:
         session = get_connection()
@@ -161,6 +184,7 @@ def delete_user(e_id: int):
         session.close()
 
 
+@job_handler("grant_role")
 def add_role_to_user(e_id: int, role: str):
     """Ensure the user with e_id has the given role. Adds and persists if missing.
 
@@ -183,4 +207,10 @@ def add_role_to_user(e_id: int, role: str):
         session.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
     finally:
-        session.close()
\ No newline at end of file
+        session.close()
+
+
+def grant_role_later(e_id: int, role: str, created_by: int = None):
+    """Queue add_role_to_user as a background job; identical pending grants are collapsed"""
+    return defer("grant_role", {"e_id": e_id, "role": role}, dedup_key=f"grant_role:{e_id}:{role}",
+                 created_by=created_by)
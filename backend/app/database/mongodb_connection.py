@@ -9,13 +9,39 @@ load_dotenv()
 # Get MongoDB configuration from environment variables
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 MONGO_DB = os.getenv("MONGO_DB", "ust_task_logs")
+# Raw request logs expire after this many days; per-minute rollups are kept
+LOG_RETENTION_DAYS = float(os.getenv("LOG_RETENTION_DAYS", "7"))
 
-client = MongoClient(MONGO_URI)
+# MONGO_BACKEND=memory keeps remarks, files and logs in process memory (mongomock, from
+# requirements-dev.txt) and loses them on restart. It defaults to memory together with
+# STORAGE_BACKEND=memory so tests and benchmarks need neither MySQL nor Mongo.
+MONGO_BACKEND = os.getenv("MONGO_BACKEND", "memory" if os.getenv("STORAGE_BACKEND", "").lower() == "memory" else "mongo").lower()
+
+if MONGO_BACKEND == "memory":
+    try:
+        import mongomock
+        import mongomock.gridfs
+    except ImportError:
+        raise RuntimeError("MONGO_BACKEND=memory needs mongomock: pip install -r requirements-dev.txt")
+    mongomock.gridfs.enable_gridfs_integration()
+    client = mongomock.MongoClient()
+elif MONGO_BACKEND == "mongo":
+    client = MongoClient(MONGO_URI)
+else:
+    raise RuntimeError(f"Unknown MONGO_BACKEND {MONGO_BACKEND!r}, expected mongo or memory")
 mongodb = client[MONGO_DB]
 
 # Collections
 remarks_collection = mongodb["remarks"]
+remark_summaries_collection = mongodb["remark_summaries"]
+remark_summary_state_collection = mongodb["remark_summary_state"]
 logs_collection = mongodb["logs"]
+log_rollups_collection = mongodb["log_rollups"]
+log_rollup_state_collection = mongodb["log_rollup_state"]
+rate_limits_collection = mongodb["rate_limits"]
+jobs_collection = mongodb["jobs"]
+reports_collection = mongodb["reports"]
+idempotency_collection = mongodb["idempotency_keys"]
 
 # GridFS for file upload / download
 fs = GridFS(mongodb)
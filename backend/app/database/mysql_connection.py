@@ -1,10 +1,33 @@
-from sqlalchemy import create_engine
+from contextvars import ContextVar
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
+import atexit
+import glob
+import itertools
+import logging
 import os
+import tempfile
+import threading
+import time
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Relational storage backend:
+#   mysql   the DB_* settings below (default)
+#   sqlite  a local database file (SQLITE_PATH), for small single-node installs; run
+#           init_db.py against it like against MySQL
+#   memory  a throwaway SQLite database private to this process, for tests, benchmarks and
+#           demos; the tables are created by create_memory_schema() at startup and the file is
+#           removed at exit. (A true ":memory:" database would be one connection shared by
+#           every thread, and the request threads and job workers would mix transactions.)
+# Each backend runs the same SQLAlchemy CRUD code, so the backend only decides the engine.
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mysql").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", "ust_task.db")
+
 # Get database configuration from environment variables
 DB_USER = os.getenv("DB_USER", "root")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "password123")
@@ -12,9 +35,34 @@ DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = os.getenv("DB_PORT", "3306")
 DB_NAME = os.getenv("DB_NAME", "ust_task_db")
 
-DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+_DEFAULT_URLS = {
+    "mysql": f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}",
+    "sqlite": f"sqlite:///{SQLITE_PATH}",
+    "memory": None,  # set below
+}
+if STORAGE_BACKEND not in _DEFAULT_URLS:
+    raise RuntimeError(f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r}, expected one of {sorted(_DEFAULT_URLS)}")
+
+if STORAGE_BACKEND == "memory":
+    _fd, _memory_path = tempfile.mkstemp(prefix="ust_task_", suffix=".db", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+    os.close(_fd)
+    atexit.register(lambda: [os.remove(p) for p in glob.glob(_memory_path + "*")])
+    DATABASE_URL = f"sqlite:///{_memory_path}"
+    engine = create_engine(DATABASE_URL)
+else:
+    # DATABASE_URL takes precedence so migrations and tooling can target another database
+    DATABASE_URL = os.getenv("DATABASE_URL", _DEFAULT_URLS[STORAGE_BACKEND])
+    engine = create_engine(DATABASE_URL, echo=True)
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _sqlite_pragmas(dbapi_connection, _):
+        # readers do not block the writer, and writers wait for each other instead of failing
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA busy_timeout=30000")
+        cursor.close()
 
-engine = create_engine(DATABASE_URL, echo=True)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
 # Shared Base for all schema modules so ForeignKey references resolve
@@ -23,4 +71,127 @@ Base = declarative_base()
 
 def get_connection():
     return SessionLocal()
-    
\ No newline at end of file
+
+
+def create_memory_schema():
+    """Create all tables in the memory backend (there are no migrations to run against it)"""
+    if STORAGE_BACKEND != "memory":
+        return
+    import app.schemas.schemas  # noqa: F401  (registers the tables on Base.metadata)
+    Base.metadata.create_all(engine)
+    
+
+# Read replicas
+#
+# DATABASE_REPLICA_URLS is an optional comma separated list of replica URLs. Read-only CRUD
+# functions take their session from get_read_connection(), which hands out a replica
+# (round robin over the healthy ones) and everything else stays on the primary. A replica is
+# checked at most every REPLICA_CHECK_INTERVAL_SECONDS; one that cannot be reached, whose
+# replication is stopped or that is more than REPLICA_MAX_LAG_SECONDS behind is skipped until
+# a later check passes. With no healthy replica, reads go to the primary.
+#
+# Read-your-writes: the read routing middleware pins a request to the primary when it is a
+# write, or when the same client wrote within READ_YOUR_WRITES_SECONDS (see
+# app/middleware/read_routing.py). Code outside a request reads from replicas.
+DATABASE_REPLICA_URLS = [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()]
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_CHECK_INTERVAL_SECONDS = float(os.getenv("REPLICA_CHECK_INTERVAL_SECONDS", "5"))
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+_reads_from_primary = ContextVar("reads_from_primary", default=False)
+
+
+def replication_lag(connection):
+    """Seconds the replica behind `connection` is behind its source; None if replication is not running"""
+    if connection.dialect.name != "mysql":
+        return 0.0  # stand-ins (SQLite files in development) have no replication to lag
+    try:
+        status = connection.exec_driver_sql("SHOW REPLICA STATUS").mappings().first()
+        field = "Seconds_Behind_Source"
+    except DBAPIError:  # MySQL before 8.0.22
+        status = connection.exec_driver_sql("SHOW SLAVE STATUS").mappings().first()
+        field = "Seconds_Behind_Master"
+    if status is None or status.get(field) is None:
+        return None
+    return float(status[field])
+
+
+class Replica:
+    def __init__(self, url):
+        self.engine = create_engine(url, echo=True, pool_pre_ping=True)
+        self.healthy = True
+        self.lag = None
+        self.error = None
+        self.checked_at = None
+        self.check_lock = threading.Lock()
+
+    def check(self):
+        try:
+            with self.engine.connect() as connection:
+                self.lag = replication_lag(connection)
+            if self.lag is None:
+                self.healthy, self.error = False, "replication is not running"
+            elif self.lag > REPLICA_MAX_LAG_SECONDS:
+                self.healthy, self.error = False, f"{self.lag:.0f}s behind"
+            else:
+                self.healthy, self.error = True, None
+        except Exception as e:
+            self.healthy, self.error = False, str(e)
+            logger.warning(f"Read replica {self.engine.url!r} unavailable: {self.error}")
+        self.checked_at = time.monotonic()
+
+
+class ReplicaSet:
+    def __init__(self, urls, check_interval=REPLICA_CHECK_INTERVAL_SECONDS):
+        self.replicas = [Replica(u) for u in urls]
+        self.check_interval = check_interval
+        self._turns = itertools.count()  # next() on a count is atomic: no lock for round robin
+
+    def _refresh(self, replica):
+        due = replica.checked_at is None or time.monotonic() - replica.checked_at >= self.check_interval
+        # one request re-checks a replica, concurrent ones use the last result meanwhile
+        if due and replica.check_lock.acquire(blocking=False):
+            try:
+                replica.check()
+            finally:
+                replica.check_lock.release()
+
+    def pick(self):
+        """Engine of the next healthy replica, None if there is none"""
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._turns) % len(self.replicas)]
+            self._refresh(replica)
+            if replica.healthy:
+                return replica.engine
+        return None
+
+    def status(self):
+        return [
+            {"url": r.engine.url.render_as_string(hide_password=True), "healthy": r.healthy, "lag": r.lag, "error": r.error}
+            for r in self.replicas
+        ]
+
+
+replicas = ReplicaSet(DATABASE_REPLICA_URLS)
+
+
+def read_from_primary(value: bool = True):
+    """Pin reads in the current context to the primary; returns a token for reset_read_routing()"""
+    return _reads_from_primary.set(value)
+
+
+def reset_read_routing(token):
+    _reads_from_primary.reset(token)
+
+
+def reads_from_primary() -> bool:
+    return _reads_from_primary.get() or not replicas.replicas
+
+
+def get_read_connection():
+    """Session for read-only queries: a healthy replica unless reads are pinned to the primary"""
+    if not _reads_from_primary.get():
+        replica = replicas.pick()
+        if replica is not None:
+            return SessionLocal(bind=replica)
+    return SessionLocal()
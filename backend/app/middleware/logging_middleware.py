@@ -1,14 +1,99 @@
 """
 Logging middleware for the FastAPI application
 Logs all API requests to MongoDB
+
+Log documents are buffered in memory and written with one insert_many every
+LOG_FLUSH_INTERVAL_SECONDS (or as soon as LOG_FLUSH_BATCH entries are waiting) by a background
+task, so no request waits on Mongo. While Mongo is unreachable at most LOG_BUFFER_MAX entries
+are kept; older ones are dropped and counted. Entries can therefore reach Mongo well after
+their request; the rollups (app.utils.log_rollup) go by insertion time, so they still count.
 """
 from fastapi import Request
+from pymongo.errors import BulkWriteError
+from collections import deque
 from datetime import datetime
+import asyncio
+import os
+import threading
 import time
 import logging
 
 logger = logging.getLogger(__name__)
 
+LOG_FLUSH_INTERVAL_SECONDS = float(os.getenv("LOG_FLUSH_INTERVAL_SECONDS", "1"))
+LOG_FLUSH_BATCH = int(os.getenv("LOG_FLUSH_BATCH", "500"))
+LOG_BUFFER_MAX = int(os.getenv("LOG_BUFFER_MAX", "50000"))
+
+
+class LogBuffer:
+    def __init__(self, max_entries=LOG_BUFFER_MAX):
+        self._entries = deque()
+        self._lock = threading.Lock()
+        self.max_entries = max_entries
+        self.dropped = 0
+        self.ready = asyncio.Event()
+
+    def add(self, entry):
+        with self._lock:
+            self._entries.append(entry)
+            if len(self._entries) > self.max_entries:
+                self._entries.popleft()
+                self.dropped += 1
+            if len(self._entries) >= LOG_FLUSH_BATCH:
+                self.ready.set()
+
+    def flush(self) -> int:
+        """Write the buffered entries; on failure they go back to the front of the buffer"""
+        from app.database.mongodb_connection import logs_collection
+
+        with self._lock:
+            batch = list(self._entries)
+            self._entries.clear()
+        if not batch:
+            return 0
+        try:
+            logs_collection.insert_many(batch, ordered=False)
+        except Exception as e:
+            if isinstance(e, BulkWriteError):
+                # the rest went in; duplicates are entries an earlier attempt wrote
+                write_errors = e.details.get("writeErrors", [])
+                failed = [batch[err["index"]] for err in write_errors if err.get("code") != 11000]
+            else:
+                failed = batch
+            for entry in failed:
+                # insert_many set an _id; a fresh one on the retry dates it for the rollup watermark
+                entry.pop("_id", None)
+            with self._lock:
+                self._entries.extendleft(reversed(failed))
+                while len(self._entries) > self.max_entries:
+                    self._entries.popleft()
+                    self.dropped += 1
+            raise
+        return len(batch)
+
+
+log_buffer = LogBuffer()
+
+
+async def run_log_flush_loop(interval: float = LOG_FLUSH_INTERVAL_SECONDS):
+    """Background task started with the API; flushes once more when cancelled"""
+    try:
+        while True:
+            try:
+                await asyncio.wait_for(log_buffer.ready.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            log_buffer.ready.clear()
+            try:
+                await asyncio.to_thread(log_buffer.flush)
+            except Exception as e:
+                logger.warning(f"Failed to log to MongoDB: {str(e)}")
+    finally:
+        try:
+            log_buffer.flush()
+        except Exception as e:
+            logger.warning(f"Dropping {len(log_buffer._entries)} request logs: {str(e)}")
+
 
 async def logging_middleware(request: Request, call_next):
     """
@@ -36,20 +121,21 @@ async def logging_middleware(request: Request, call_next):
         
         # Optional: Log to MongoDB
         try:
-            from app.database.mongodb_connection import logs_collection
-            
+            # Route template (e.g. /api/Task/{t_id}/priority) so rollups group by endpoint, not by id
+            route = request.scope.get("route")
             log_entry = {
                 "timestamp": datetime.now(),
                 "method": request.method,
                 "path": request.url.path,
+                "route": getattr(route, "path", request.url.path),
                 "query_params": str(request.query_params),
                 "status_code": response.status_code,
                 "process_time": process_time,
                 "client_host": request.client.host if request.client else None
             }
             
-            # Insert log asynchronously (non-blocking)
-            logs_collection.insert_one(log_entry)
+            # Written by run_log_flush_loop, off the request path
+            log_buffer.add(log_entry)
         except Exception as e:
             logger.warning(f"Failed to log to MongoDB: {str(e)}")
         
@@ -0,0 +1,246 @@
+"""
+Admission control middleware
+Per-principal token buckets plus a per-worker concurrency cap
+
+Every request is charged to a bucket keyed by (principal, route class). The principal is the
+JWT `sub` when a valid bearer token is sent, otherwise the client address. Route classes have
+their own rate and burst (RATE_LIMITS), so a dashboard polling /Task/getall runs out long
+before someone clicking through the UI. An empty bucket gives 429 with Retry-After.
+
+Admitted requests then need one of MAX_CONCURRENT_REQUESTS slots, held until the response
+body has been sent (exports and downloads stream after the handler returns). The default
+matches the SQLAlchemy pool (5 + 10 overflow), so excess load is shed here with 503 instead of
+queueing on pool checkout for 30 s. A request waits at most ADMISSION_WAIT_SECONDS for a slot.
+
+Buckets live in process memory by default. Set RATE_LIMIT_STORE=mongo to share them between
+workers (atomic pipeline updates in the `rate_limits` collection), or call set_bucket_store()
+with anything that implements BucketStore.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Tuple
+
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+from jose import JWTError, jwt
+
+logger = logging.getLogger(__name__)
+
+# class=rate/burst, rate in requests per second
+RATE_LIMITS = os.getenv("RATE_LIMITS", "auth=0.2/5,heavy=1/10,write=5/20,read=10/50")
+RATE_LIMIT_STORE = os.getenv("RATE_LIMIT_STORE", "memory")
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "15"))
+ADMISSION_WAIT_SECONDS = float(os.getenv("ADMISSION_WAIT_SECONDS", "0.5"))
+
+EXEMPT_PATHS = {"/", "/health", "/docs", "/redoc", "/openapi.json"}
+HEAVY_MARKERS = ("/getall", "/getbystatus", "/export/", "/analytics", "/logs/")
+
+
+def parse_limits(spec: str):
+    limits = {}
+    for part in spec.split(","):
+        if part.strip():
+            name, value = part.split("=")
+            rate, burst = value.split("/")
+            limits[name.strip()] = (float(rate), float(burst))
+    return limits
+
+
+LIMITS = parse_limits(RATE_LIMITS)
+
+
+def route_class(method: str, path: str) -> str:
+    if path.endswith("/auth/login"):
+        return "auth"
+    if method == "GET" and any(m in path for m in HEAVY_MARKERS):
+        return "heavy"
+    if method in ("POST", "PUT", "PATCH", "DELETE"):
+        return "write"
+    return "read"
+
+
+def principal(request: Request) -> str:
+    header = request.headers.get("authorization", "")
+    if header.lower().startswith("bearer "):
+        # imported here: security reads its settings at import time
+        from app.core.security import SECRET_KEY, ALGORITHM
+        try:
+            sub = jwt.decode(header[7:], SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+            if sub is not None:
+                return f"user:{sub}"
+        except JWTError:
+            pass  # the route itself answers 401; limit by address meanwhile
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+class BucketStore(ABC):
+    """Storage for token buckets. take() must be atomic per key."""
+
+    blocking = False  # True if take() does I/O and should run off the event loop
+
+    @abstractmethod
+    def take(self, key: str, rate: float, burst: float, now: float) -> Tuple[bool, float]:
+        """Remove one token. Returns (allowed, seconds until a token is available)."""
+
+
+class MemoryBucketStore(BucketStore):
+    MAX_KEYS = 50000
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, now):
+        with self._lock:
+            tokens, ts = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - ts) * rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.MAX_KEYS:
+                self._evict(now)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate
+
+    def _evict(self, now):
+        # a bucket idle for 10 minutes is as good as full, which is what a missing key means
+        self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < 600}
+
+
+class MongoBucketStore(BucketStore):
+    """Buckets shared by all workers; one find_one_and_update per request"""
+
+    blocking = True
+
+    def __init__(self):
+        from pymongo import ReturnDocument
+        from app.database.mongodb_connection import rate_limits_collection
+        self._collection = rate_limits_collection
+        self._after = ReturnDocument.AFTER
+        self._collection.create_index("expires_at", expireAfterSeconds=0)
+
+    def take(self, key, rate, burst, now):
+        refilled = {"$min": [burst, {"$add": [
+            {"$ifNull": ["$tokens", burst]},
+            {"$multiply": [{"$subtract": [now, {"$ifNull": ["$ts", now]}]}, rate]},
+        ]}]}
+        doc = self._collection.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"tokens": refilled, "ts": now}},
+                {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+                {"$set": {
+                    "tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                    "expires_at": {"$add": ["$$NOW", 600 * 1000]},
+                }},
+            ],
+            upsert=True,
+            return_document=self._after,
+        )
+        return doc["allowed"], 0.0 if doc["allowed"] else (1 - doc["tokens"]) / rate
+
+
+_store = None
+_slots = None
+
+
+def set_bucket_store(store: BucketStore):
+    global _store
+    _store = store
+
+
+def get_bucket_store() -> BucketStore:
+    global _store
+    if _store is None:
+        _store = MongoBucketStore() if RATE_LIMIT_STORE == "mongo" else MemoryBucketStore()
+    return _store
+
+
+def _reject(status_code, detail, retry_after):
+    return JSONResponse(
+        status_code=status_code,
+        content={"detail": detail},
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+async def rate_limit_middleware(request: Request, call_next):
+    """
+    Token bucket per (principal, route class), then a global concurrency cap
+    """
+    global _slots
+    path = request.url.path
+    if request.method == "OPTIONS" or path in EXEMPT_PATHS:
+        return await call_next(request)
+
+    cls = route_class(request.method, path)
+    limit = LIMITS.get(cls)
+    if limit:
+        store = get_bucket_store()
+        key = f"{principal(request)}:{cls}"
+        try:
+            if store.blocking:
+                allowed, retry_after = await asyncio.to_thread(store.take, key, *limit, time.time())
+            else:
+                allowed, retry_after = store.take(key, *limit, time.time())
+        except Exception as e:
+            # fail open: a broken shared store must not take the API down
+            logger.warning(f"Rate limit store unavailable: {str(e)}")
+            allowed, retry_after = True, 0.0
+        if not allowed:
+            return _reject(status.HTTP_429_TOO_MANY_REQUESTS, "Too many requests", retry_after)
+
+    if MAX_CONCURRENT_REQUESTS <= 0:
+        return await call_next(request)
+    if _slots is None:
+        _slots = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    try:
+        await asyncio.wait_for(_slots.acquire(), ADMISSION_WAIT_SECONDS)
+    except asyncio.TimeoutError:
+        return _reject(status.HTTP_503_SERVICE_UNAVAILABLE, "Server busy, retry shortly", 1)
+    release = _release_once(_slots)
+    try:
+        response = await call_next(request)
+    except BaseException:
+        release()
+        raise
+    return _ReleasingResponse(response, release)
+
+
+def _release_once(slots):
+    released = False
+
+    def release():
+        nonlocal released
+        if not released:
+            released = True
+            slots.release()
+    return release
+
+
+class _ReleasingResponse:
+    """Sends the wrapped response, then frees its concurrency slot.
+
+    The slot is held until the body has gone out, and released on every way out: a client
+    that disconnects before the response starts makes send() raise (or the task is
+    cancelled), and then the body iterator never runs.
+    """
+
+    def __init__(self, response, release):
+        self._response = response
+        self._release = release
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self._response(scope, receive, send)
+        finally:
+            self._release()
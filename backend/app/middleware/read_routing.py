@@ -0,0 +1,92 @@
+"""
+Read routing middleware
+Read-your-writes stickiness for the read replicas
+
+Writes (anything but GET/HEAD/OPTIONS) always run against the primary, and so does every
+read from a client that wrote in the last READ_YOUR_WRITES_SECONDS: a user who saves a task
+and lands back on the list sees it even if the replicas have not caught up yet. Clients are
+identified like the rate limiter does (JWT `sub`, else address). The recent-writer table is
+per worker, so a successful write also sets a short-lived cookie that carries the window to
+whichever worker serves the next request.
+
+Does nothing when no DATABASE_REPLICA_URLS are configured.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import Request
+
+from app.database.mysql_connection import (
+    READ_YOUR_WRITES_SECONDS,
+    replicas,
+    read_from_primary,
+    reset_read_routing,
+)
+from app.middleware.rate_limit import principal
+
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+STICKY_COOKIE = "read_primary_until"
+MAX_TRACKED_WRITERS = 10000
+
+
+class RecentWriters:
+    """principal -> time until which its reads go to the primary"""
+
+    def __init__(self, window=READ_YOUR_WRITES_SECONDS, max_entries=MAX_TRACKED_WRITERS):
+        self.window = window
+        self.max_entries = max_entries
+        self._until = OrderedDict()
+        self._lock = threading.Lock()
+
+    def note_write(self, who, now=None):
+        now = now or time.monotonic()
+        with self._lock:
+            self._until[who] = now + self.window
+            self._until.move_to_end(who)
+            while len(self._until) > self.max_entries:
+                self._until.popitem(last=False)
+
+    def is_sticky(self, who, now=None):
+        now = now or time.monotonic()
+        with self._lock:
+            until = self._until.get(who)
+            if until is not None and until <= now:
+                del self._until[who]
+                until = None
+        return until is not None
+
+
+recent_writers = RecentWriters()
+
+
+def _cookie_sticky(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+async def read_routing_middleware(request: Request, call_next):
+    if not replicas.replicas:
+        return await call_next(request)
+
+    who = principal(request)
+    write = request.method not in READ_METHODS
+    token = read_from_primary(write or recent_writers.is_sticky(who) or _cookie_sticky(request))
+    try:
+        response = await call_next(request)
+    finally:
+        reset_read_routing(token)
+
+    if write and response.status_code < 400:
+        recent_writers.note_write(who)
+        response.set_cookie(
+            STICKY_COOKIE,
+            str(time.time() + READ_YOUR_WRITES_SECONDS),
+            max_age=max(1, int(READ_YOUR_WRITES_SECONDS)),
+            httponly=True,
+            samesite="lax",
+        )
+    return response
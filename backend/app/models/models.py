@@ -21,6 +21,8 @@ class RemarkReqRes(BaseModel):
     comment: str = Field(..., max_length=1000)
     file_id : Optional[str] = None
     file_name : Optional[str] = None
+    thumbnail_id: Optional[str] = None  # set once the background thumbnail job has run
+    preview_id: Optional[str] = None  # first page of PDF attachments
     created_by: Optional[int] = None
     created_at: Optional[datetime] = None
 
@@ -54,6 +56,10 @@ class TaskReqRes(BaseModel):
     created_by: Optional[int] = None
     expected_closure: datetime
     actual_closure: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    status_changed_at: Optional[datetime] = None
+    version: Optional[int] = None  # optimistic concurrency token, echoed as the ETag
 
     class Config:
         orm_mode = True
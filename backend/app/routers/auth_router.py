@@ -1,24 +1,19 @@
 from fastapi import APIRouter, HTTPException, Depends
 from app.models.models import LoginRequest, Token
-from app.core.security import authenticate_user, create_access_token, get_current_user
+from app.core.security import authenticate_user_async, create_access_token, get_current_user
 from datetime import timedelta
 from app.core.security import create_access_token, get_current_user
-from app.crud.users_crud import get_user_by_id
 
 auth_router = APIRouter(prefix="/auth", tags=["auth"])
 
 @auth_router.post("/login")
-def login(credentials: LoginRequest):
-	# Explicitly fetch user and compare password so we can surface clearer failures
-	try:
-		user = get_user_by_id(credentials.e_id)
-	except HTTPException:
+async def login(credentials: LoginRequest):
+	# bcrypt runs on the password-hashing process pool, not on the event loop
+	user = await authenticate_user_async(credentials.e_id, credentials.password)
+	if not user:
 		# Do not reveal which part failed to the client; return generic message
 		raise HTTPException(status_code=401, detail="Invalid e_id or password")
 
-	if not user or user.password != credentials.password:
-		raise HTTPException(status_code=401, detail="Invalid e_id or password")
-
 	access_token_expires = timedelta(minutes=30)
 	token = create_access_token(subject=str(user.e_id), expires_delta=access_token_expires)
 
@@ -1,30 +1,60 @@
-from fastapi import APIRouter, HTTPException, Depends
-from app.crud.employee_crud import get_all_employees, add_employee, get_by_employee_id, update_employee, delete_employee
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Header, Response
+from fastapi.responses import ORJSONResponse
+from app.crud.employee_crud import get_all_employees, add_employee, get_by_employee_id, update_employee, delete_employee, get_many_employees
+from app.crud.import_crud import import_employees
 from app.models.models import EmployeeReqRes
-from typing import List
+from typing import List, Optional
+from app.utils.idempotency import run_idempotent, fingerprint
 from app.core.security import get_current_user  # Assumed utility for authentication
 employee_router = APIRouter(prefix="/Employee", tags=["Employee"])
 
 @employee_router.get("/getall", response_model=List[EmployeeReqRes])
-def get_all(role: str, user=Depends(get_current_user)):
+def get_all(role: str, fields: str = "full", user=Depends(get_current_user)):
+    """fields: "full", "directory" or a comma separated column list"""
     try:
-        employees = get_all_employees(role, user)
+        employees = get_all_employees(role, user, fields)
         if not employees:
             raise HTTPException(status_code=404, detail="No employees found")
-        return employees
+        return ORJSONResponse(employees)
     except HTTPException as e:
         raise e  # Re-raise the specific HTTPException
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
 @employee_router.post("/create")
-def add_new_employee(role: str, new_emp: EmployeeReqRes, user=Depends(get_current_user)):
+def add_new_employee(role: str, new_emp: EmployeeReqRes, response: Response,
+                     idempotency_key: Optional[str] = Header(None), user=Depends(get_current_user)):
     try:
         if role != "Admin":
             raise HTTPException(status_code=403, detail="Only Admin can create employees.")
-        
-        new_employee = add_employee(new_emp, role, user)
-        return {"detail": "Employee Added Successfully", "employee": new_employee}
+
+        def create():
+            new_employee = add_employee(new_emp, role, user)
+            return {"detail": "Employee Added Successfully", "employee": new_employee}
+
+        result, replayed = run_idempotent(
+            idempotency_key, f"employee-create:{user.e_id}", fingerprint(role, new_emp.model_dump()), create
+        )
+        if replayed:
+            response.headers["Idempotent-Replayed"] = "true"
+        return result
+    except HTTPException as e:
+        raise e  # Re-raise the specific HTTPException
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+@employee_router.post("/import")
+def import_employee_file(role: str, file: UploadFile = File(...), format: Optional[str] = None,
+                         user=Depends(get_current_user)):
+    """Bulk-create employees and their user accounts from a CSV or JSONL upload.
+
+    format defaults to the file extension; the response has one result per input row.
+    """
+    try:
+        fmt = format or (file.filename or "").rsplit(".", 1)[-1].lower()
+        if fmt == "ndjson":
+            fmt = "jsonl"
+        return ORJSONResponse(import_employees(file.file, fmt, role, user))
     except HTTPException as e:
         raise e  # Re-raise the specific HTTPException
     except Exception as e:
@@ -40,6 +70,20 @@ def get_by_id(id: int, role: str, user=Depends(get_current_user)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
+@employee_router.get("/getmany")
+def get_many(ids: str, role: str, user=Depends(get_current_user)):
+    """ids: comma separated employee ids, e.g. ?ids=3,7,12"""
+    try:
+        try:
+            id_list = [int(i) for i in ids.split(",") if i.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="ids must be comma separated integers")
+        return ORJSONResponse(get_many_employees(id_list, role, user))
+    except HTTPException as e:
+        raise e  # Re-raise the specific HTTPException
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
 @employee_router.put("/update")
 def update_employee_data(id: int, new_data: dict, role: str, user=Depends(get_current_user)):
     try:
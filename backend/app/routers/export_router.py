@@ -0,0 +1,73 @@
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
+from app.crud.export_crud import export_tasks, export_remarks, FORMATS
+from app.core.security import get_current_user
+from typing import Optional
+from datetime import datetime
+
+export_router = APIRouter(prefix="/export", tags=["Export"])
+
+
+def _streaming(chunks, name, fmt, gzip):
+    filename = f"{name}.{fmt}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        chunks,
+        media_type="application/gzip" if gzip else FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@export_router.get("/tasks")
+def export_all_tasks(
+    role: str,
+    format: str = "ndjson",
+    gzip: bool = False,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    assigned_to: Optional[int] = None,
+    reviewer: Optional[int] = None,
+    created_by: Optional[int] = None,
+    expected_from: Optional[datetime] = None,
+    expected_to: Optional[datetime] = None,
+    user=Depends(get_current_user),
+):
+    """Stream the caller's visible tasks as NDJSON or CSV (optionally gzipped)"""
+    try:
+        chunks = export_tasks(
+            role, user, format, gzip,
+            status=status, priority=priority, assigned_to=assigned_to, reviewer=reviewer,
+            created_by=created_by, expected_from=expected_from, expected_to=expected_to,
+        )
+        return _streaming(chunks, "tasks", format, gzip)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+
+@export_router.get("/remarks")
+def export_all_remarks(
+    role: str,
+    format: str = "ndjson",
+    gzip: bool = False,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    assigned_to: Optional[int] = None,
+    reviewer: Optional[int] = None,
+    created_by: Optional[int] = None,
+    expected_from: Optional[datetime] = None,
+    expected_to: Optional[datetime] = None,
+    user=Depends(get_current_user),
+):
+    """Stream remarks on the caller's visible tasks; task filters select which tasks"""
+    try:
+        chunks = export_remarks(
+            role, user, format, gzip,
+            status=status, priority=priority, assigned_to=assigned_to, reviewer=reviewer,
+            created_by=created_by, expected_from=expected_from, expected_to=expected_to,
+        )
+        return _streaming(chunks, "remarks", format, gzip)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
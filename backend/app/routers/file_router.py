@@ -1,22 +1,114 @@
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import StreamingResponse
+import re
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from bson import ObjectId
-from app.database.mongodb_connection import fs
+from app.utils.file_storage import storage, FileMissing, accel_redirect_path
 from app.core.security import get_current_user
+from app.utils.thumbnails import derived_file_id
 
 file_router = APIRouter(prefix="/file", tags=["Files"])
 
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK = 64 * 1024
 
-@file_router.get("/{file_id}")
-def get_file(file_id: str, user=Depends(get_current_user)):
+
+def _object_id(file_id: str):
     try:
-        oid = ObjectId(file_id)
+        return ObjectId(file_id)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid file id")
 
+
+def _byte_range(header: str, size: int):
+    """(start, end) inclusive for a single `bytes=` range; None to send the whole file"""
+    m = RANGE.match(header.replace(" ", ""))
+    if not m or m.groups() == ("", ""):
+        return None  # multiple or malformed ranges: RFC 9110 allows ignoring the header
+    first, last = m.groups()
+    if first == "":  # suffix: the last N bytes
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise HTTPException(
+            status_code=416, detail="Range Not Satisfiable", headers={"Content-Range": f"bytes */{size}"}
+        )
+    return start, end
+
+
+def _read_range(f, start, end):
     try:
-        grid_out = fs.get(oid)
-    except Exception:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def _send(stored, request: Request, headers: dict = None):
+    headers = dict(headers or {}, **{"Accept-Ranges": "bytes"})
+    if stored.sha256:
+        headers["ETag"] = f'"{stored.sha256}"'  # content addressed: the hash is the version
+    accel = accel_redirect_path(stored)
+    if accel:
+        # nginx sends the file (sendfile, ranges included) from its internal location
+        headers["X-Accel-Redirect"] = accel
+        return Response(media_type=stored.content_type, headers=headers)
+
+    byte_range = _byte_range(request.headers["range"], stored.length) if request.headers.get("range") else None
+    if byte_range is None:
+        if stored.path:
+            return FileResponse(stored.path, media_type=stored.content_type, headers=headers)
+        return StreamingResponse(stored.open(), media_type=stored.content_type, headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{stored.length}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        _read_range(stored.open(), start, end), status_code=206, media_type=stored.content_type, headers=headers
+    )
+
+
+@file_router.get("/{file_id}")
+def get_file(file_id: str, request: Request, user=Depends(get_current_user)):
+    _object_id(file_id)
+
+    try:
+        stored = storage.get(file_id)
+    except FileMissing:
         raise HTTPException(status_code=404, detail="File not found")
 
-    return StreamingResponse(grid_out, media_type=grid_out.content_type)
+    return _send(stored, request)
+
+
+def _derived(file_id: str, kind: str, request: Request):
+    _object_id(file_id)
+    derived_id = derived_file_id(file_id, kind)
+    if not derived_id:
+        # not an image/PDF, or the background job has not run yet
+        raise HTTPException(status_code=404, detail=f"No {kind} for this file")
+    try:
+        stored = storage.get(derived_id)
+    except FileMissing:
+        raise HTTPException(status_code=404, detail=f"No {kind} for this file")
+    # derived files never change for a given original
+    return _send(stored, request, {"Cache-Control": "private, max-age=86400, immutable"})
+
+
+@file_router.get("/{file_id}/thumb")
+def get_thumbnail(file_id: str, request: Request, user=Depends(get_current_user)):
+    """Fixed-size JPEG thumbnail of an image or PDF attachment"""
+    return _derived(file_id, "thumbnail", request)
+
+
+@file_router.get("/{file_id}/preview")
+def get_preview(file_id: str, request: Request, user=Depends(get_current_user)):
+    """First page of a PDF attachment as a JPEG"""
+    return _derived(file_id, "preview", request)
@@ -0,0 +1,55 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+from app.core.security import get_current_user
+from app.utils.job_queue import get_job, list_jobs, retry_job
+
+job_router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+def _require_admin(role, user):
+    if role != "Admin" or "Admin" not in user.roles:
+        raise HTTPException(status_code=403, detail="Only Admin can manage background jobs")
+
+
+@job_router.get("")
+def get_jobs(
+    role: str,
+    status: Optional[str] = None,
+    type: Optional[str] = None,
+    limit: int = Query(50, gt=0, le=500),
+    user=Depends(get_current_user),
+):
+    """Most recent background jobs, optionally by status (queued, running, done, failed) and type"""
+    try:
+        _require_admin(role, user)
+        return list_jobs(status=status, job_type=type, limit=limit)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+
+@job_router.get("/{job_id}")
+def get_job_status(job_id: str, role: str, user=Depends(get_current_user)):
+    """One job: status, attempts, next run and last error. Admins see every job, others their own."""
+    try:
+        job = get_job(job_id)
+        if not (role == "Admin" and "Admin" in user.roles) and job.get("created_by") != user.e_id:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+
+@job_router.post("/{job_id}/retry")
+def retry_failed_job(job_id: str, role: str, user=Depends(get_current_user)):
+    try:
+        _require_admin(role, user)
+        return retry_job(job_id)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
@@ -0,0 +1,52 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from app.core.security import get_current_user
+from app.utils.log_rollup import slowest_routes
+from app.utils.single_flight import read_coalescer
+from app.database.mysql_connection import replicas
+
+log_router = APIRouter(prefix="/logs", tags=["Logs"])
+
+
+@log_router.get("/slowest")
+def get_slowest_routes(
+    role: str,
+    hours: float = Query(24, gt=0, le=24 * 90),
+    limit: int = Query(10, gt=0, le=100),
+    user=Depends(get_current_user),
+):
+    """Routes with the highest p95 latency over the last N hours, read from the per-minute rollups"""
+    try:
+        if role != "Admin" or "Admin" not in user.roles:
+            raise HTTPException(status_code=403, detail="Only Admin can view request statistics")
+        return slowest_routes(hours=hours, limit=limit)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+
+
+@log_router.get("/coalescing")
+def get_coalescing_stats(role: str, user=Depends(get_current_user)):
+    """Per query kind: DB executions, requests that shared an in-flight execution, and in flight now (this worker)"""
+    try:
+        if role != "Admin" or "Admin" not in user.roles:
+            raise HTTPException(status_code=403, detail="Only Admin can view request statistics")
+        return read_coalescer.stats()
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+
+@log_router.get("/replicas")
+def get_replica_status(role: str, user=Depends(get_current_user)):
+    """Read replicas as last checked by this worker: health, replication lag in seconds, error"""
+    try:
+        if role != "Admin" or "Admin" not in user.roles:
+            raise HTTPException(status_code=403, detail="Only Admin can view request statistics")
+        return replicas.status()
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
@@ -5,9 +5,12 @@ from app.core.security import get_current_user
 # from app.crud.remark_crud import add_remark, get_remarks_by_task, delete_remark_by_id, update_remark
 
 from fastapi import APIRouter, HTTPException
-from fastapi import APIRouter, UploadFile, File, Header, Form
+from fastapi import APIRouter, UploadFile, File, Header, Form, Response
 from app.crud.remarks_crud import add_remark, get_remarks_by_task, delete_remark_by_id
 from app.crud.remarks_crud import update_remark
+from app.crud.remark_summary import get_remark_summaries, MAX_SUMMARY_IDS
+from app.crud.task_crud import get_visible_task_ids
+from app.utils.idempotency import run_idempotent, fingerprint
 
 remark_router = APIRouter(prefix="/Remark", tags=["Remark"])
  
@@ -19,6 +22,23 @@ def list_for_task(task_id: int, role: str, user=Depends(get_current_user)):
     return remarks
 
 
+@remark_router.get("/summary")
+def summaries_for_tasks(task_ids: str, role: str, user=Depends(get_current_user)):
+    """Remark count, attachment count and latest remark for each of task_ids (comma separated)
+    that the caller may see; other ids are left out"""
+    try:
+        try:
+            ids = list(dict.fromkeys(int(t) for t in task_ids.split(",") if t.strip()))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="task_ids must be comma separated integers")
+        if len(ids) > MAX_SUMMARY_IDS:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_SUMMARY_IDS} task ids per request")
+        visible = get_visible_task_ids(ids, role, user)
+        return list(get_remark_summaries([t for t in ids if t in visible]).values())
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
 @remark_router.post("/create")
 def create_remark(
@@ -26,10 +46,23 @@ def create_remark(
     comment: str = Form(...),
     file: Optional[UploadFile] = File(None),
     role: str = Form(...),
+    response: Response = None,
+    idempotency_key: Optional[str] = Header(None),
     user=Depends(get_current_user),
 ):
-    r = add_remark(task_id=task_id, comment=comment, e_id=getattr(user, "e_id", None), file=file, role=role, user=user)
-    return {"detail": "Remark Added Successfully", "remark": r}
+    def create():
+        r = add_remark(task_id=task_id, comment=comment, e_id=getattr(user, "e_id", None), file=file, role=role, user=user)
+        return {"detail": "Remark Added Successfully", "remark": r}
+
+    # retries with the same Idempotency-Key neither add a second remark nor store the file again
+    upload = (file.filename, getattr(file, "size", None)) if file else None
+    result, replayed = run_idempotent(
+        idempotency_key, f"remark-create:{getattr(user, 'e_id', None)}",
+        fingerprint(task_id, comment, role, upload), create,
+    )
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
 
 
 @remark_router.put("/update")
@@ -0,0 +1,42 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Response
+from app.core.security import get_current_user
+from app.crud.report_crud import request_team_report, get_report, DONE
+
+report_router = APIRouter(prefix="/reports", tags=["Reports"])
+
+
+@report_router.post("/team")
+def team_report(
+    role: str,
+    response: Response,
+    period: Optional[str] = None,
+    format: str = "xlsx",
+    mgr_id: Optional[int] = None,
+    user=Depends(get_current_user),
+):
+    """Weekly team report (period like 2026-W07, default last week; format xlsx or pdf).
+
+    200 with download_url when a cached report exists, otherwise 202 and the report is built in
+    the background: poll GET /reports/{report_id} until status is "done".
+    """
+    try:
+        report = request_team_report(role, user, period=period, fmt=format, mgr_id=mgr_id)
+        if report["status"] != DONE:
+            response.status_code = 202
+        return report
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+
+@report_router.get("/{report_id}")
+def report_status(report_id: str, role: str, user=Depends(get_current_user)):
+    try:
+        return get_report(report_id, role, user)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
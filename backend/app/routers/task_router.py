@@ -1,42 +1,96 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header, Response
+from fastapi.responses import ORJSONResponse
 from app.crud.task_crud import add_task, get_all_tasks, get_task_by_id,patch_priority,get_task_by_status,patch_status,update_task, delete_task
+from app.crud.task_history import get_task_analytics
+from app.crud.remark_summary import with_remark_summaries
+from app.crud.task_detail import get_task_full
+from app.crud.task_board import get_board, get_board_column
+from app.crud.task_changes import get_task_changes
 from app.core.security import get_current_user
 from app.models.models import TaskReqRes, UserRole
-from typing import List
+from app.utils.helpers import parse_if_match, etag
+from app.utils.idempotency import run_idempotent, fingerprint
+from typing import List, Optional
 from datetime import datetime
 task_router = APIRouter(prefix="/Task", tags=["Task"])
 
 
 @task_router.get("/getall", response_model=List[TaskReqRes])
-def get_all(role: str, user=Depends(get_current_user)):
+def get_all(role: str, fields: str = "full", include_remarks: bool = False, user=Depends(get_current_user)):
+    """fields: "full", "summary", "kanban" or a comma separated column list.
+    include_remarks adds each task's remark_summary (count, attachments, latest remark)."""
     try:
-        tasks = get_all_tasks(role,user)
+        tasks = get_all_tasks(role, user, fields)
         if not tasks:
             raise HTTPException(status_code=404, detail="No tasks found")
-        return tasks
+        if include_remarks:
+            tasks = with_remark_summaries(tasks)
+        # Returning the response directly skips response_model re-validation (it still documents the shape)
+        return ORJSONResponse(tasks)
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
-@task_router.get("/getbystatus",response_model=List[TaskReqRes])
-def get_by_status(status,role,user=Depends(get_current_user)):
+@task_router.get("/board")
+def get_kanban_board(role: str, limit: int = 20, fields: str = "kanban", user=Depends(get_current_user)):
+    """First `limit` cards of every status column plus per-column totals and load-more cursors"""
     try:
-        if role not in user.roles:
-            raise HTTPException(status_code=409,detail="The user doesnt have the mentioned role")
-        return get_task_by_status(status,role,user)
+        return ORJSONResponse(get_board(role, user, limit, fields))
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+@task_router.get("/board/column")
+def get_kanban_column(role: str, status: str, after: Optional[str] = None, limit: int = 20,
+                      fields: str = "kanban", user=Depends(get_current_user)):
+    """Load more for one column: pass the column's next_cursor as `after`"""
+    try:
+        return ORJSONResponse(get_board_column(role, user, status, after, limit, fields))
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+@task_router.get("/changes")
+def get_changes(role: str, since: Optional[int] = None, limit: int = 1000, user=Depends(get_current_user)):
+    """Tasks changed and ids deleted since a sync token; 410 means the token expired (reload everything)"""
+    try:
+        return ORJSONResponse(get_task_changes(role, user, since, limit))
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+@task_router.get("/analytics")
+def get_analytics(role: str, dimension: str = "assignee", e_id: Optional[int] = None, user=Depends(get_current_user)):
+    """Average time in each status, lead time and cycle time per assignee or reviewer"""
+    try:
+        return get_task_analytics(role, user, dimension, e_id)
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
 @task_router.post("/create")
-def add_new_task(role: str,new_task: TaskReqRes,user=Depends(get_current_user)):
+def add_new_task(role: str,new_task: TaskReqRes,response: Response,
+                 idempotency_key: Optional[str] = Header(None),user=Depends(get_current_user)):
     try:
         if role != "Manager" and role != "Admin":
             raise HTTPException(status_code=409,detail="The user doesn't have the mentioned role")
-        t = add_task(new_task,role,user)
-        return {"detail": "Task Added Successfully", "task": t}
+
+        def create():
+            t = add_task(new_task,role,user)
+            return {"detail": "Task Added Successfully", "task": t}
+
+        # A retried request with the same Idempotency-Key gets the first response back
+        result, replayed = run_idempotent(
+            idempotency_key, f"task-create:{user.e_id}", fingerprint(role, new_task.model_dump(mode="json")), create
+        )
+        if replayed:
+            response.headers["Idempotent-Replayed"] = "true"
+        return result
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -44,9 +98,10 @@ def add_new_task(role: str,new_task: TaskReqRes,user=Depends(get_current_user)):
 
 
 @task_router.get("/get", response_model=TaskReqRes)
-def get_by_id(id: int,user=Depends(get_current_user)):
+def get_by_id(id: int, response: Response, user=Depends(get_current_user)):
     try:
         t = get_task_by_id(id,user)
+        response.headers["ETag"] = etag(t.version)
         return t
     except HTTPException as e:
         raise e
@@ -54,12 +109,24 @@ def get_by_id(id: int,user=Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
 
+@task_router.get("/{t_id}/full")
+async def get_full(t_id: int, user=Depends(get_current_user)):
+    """Task, its remarks and the people on it in one round trip (the three reads run concurrently)"""
+    try:
+        detail = await get_task_full(t_id, user)
+        return ORJSONResponse(detail, headers={"ETag": etag(detail["task"]["version"])})
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+
 @task_router.get("/getbystatus", response_model=List[TaskReqRes])
-def get_by_status(status: str, role: str, user=Depends(get_current_user)):
+def get_by_status(status: str, role: str, fields: str = "full", user=Depends(get_current_user)):
     try:
         if role not in user.roles:
             raise HTTPException(status_code=409, detail="The user doesn't have the mentioned role")
-        return get_task_by_status(status, role, user)
+        return ORJSONResponse(get_task_by_status(status, role, user, fields))
     except HTTPException as e:
         raise e
     except Exception as e:
@@ -67,6 +134,7 @@ def get_by_status(status: str, role: str, user=Depends(get_current_user)):
 
 @task_router.put("/update")
 def update_task_data(t_id: int,role: str,
+    response: Response,
     title: str = None,
     description: str = None,
     assigned_to: int = None,
@@ -74,6 +142,7 @@ def update_task_data(t_id: int,role: str,
     status: str = None,
     reviewer: int = None,
     expected_closure: datetime = None, 
+    if_match: Optional[str] = Header(None),
     user=Depends(get_current_user),
     ):
     try:
@@ -91,20 +160,23 @@ def update_task_data(t_id: int,role: str,
             reviewer=reviewer,
             expected_closure=expected_closure,
             role=role,
-            user=user
+            user=user,
+            expected_version=parse_if_match(if_match),
         )
+        response.headers["ETag"] = etag(updated_task.version)
         return {"detail": "Task Updated Successfully", "task": updated_task}
     except HTTPException as e:
         raise e
 
 @task_router.patch("/patch")
-def patch_stat(id: int, status: str, role: str, user=Depends(get_current_user)):
+def patch_stat(id: int, status: str, role: str, response: Response, if_match: Optional[str] = Header(None), user=Depends(get_current_user)):
     try:
         # FIXED: Changed 'and' to 'or' for proper validation
         if role not in user.roles or role.upper() == "ADMIN":
             raise HTTPException(status_code=409, detail="The user doesn't have the mentioned role")
         
-        patched = patch_status(id, status, role, user)
+        patched = patch_status(id, status, role, user, expected_version=parse_if_match(if_match))
+        response.headers["ETag"] = etag(patched.version)
         return {"detail": "Patched the task", "task": patched}
     except HTTPException as e:
         raise e
@@ -129,9 +201,11 @@ def delete_task_by_id(id: int, role: str, user=Depends(get_current_user)):
     
     
 @task_router.patch("/{t_id}/priority")
-async def update_task_priority(t_id: int, priority: str, role: str, user=Depends(get_current_user)):
+async def update_task_priority(t_id: int, priority: str, role: str, response: Response, if_match: Optional[str] = Header(None), user=Depends(get_current_user)):
     # Call patch_priority function to handle priority change
     try:
-        return patch_priority(t_id=t_id, priority=priority, role=role, user=user)
+        patched = patch_priority(t_id=t_id, priority=priority, role=role, user=user, expected_version=parse_if_match(if_match))
+        response.headers["ETag"] = etag(patched.version)
+        return patched
     except HTTPException as e:
         raise e
\ No newline at end of file
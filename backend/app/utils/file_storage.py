@@ -0,0 +1,273 @@
+"""
+Attachment storage backends
+
+Remark attachments, thumbnails and reports go through `storage`, chosen by FILE_STORAGE:
+
+- gridfs (default): the file in GridFS (fs.files / fs.chunks). Downloads read the 255 KB
+  chunks back through Python.
+- local: the bytes in UPLOAD_DIR, content addressed (UPLOAD_DIR/ab/cd/<sha256>, so the same
+  upload stored twice takes the space once), and the file document in the `files` collection
+  with the same fields as fs.files plus sha256. Downloads are served straight from disk, or by
+  nginx when UPLOAD_ACCEL_REDIRECT names an internal location that maps to UPLOAD_DIR.
+
+File ids are ObjectId strings with either backend. The local backend still reads and deletes
+files that are only in GridFS, so FILE_STORAGE=local can be switched on before
+`python -m scripts.migrate_files` has moved the old blobs over (keeping their ids).
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from gridfs.errors import NoFile
+
+from app.database.mongodb_connection import fs, mongodb
+
+FILE_STORAGE = os.getenv("FILE_STORAGE", "gridfs").lower()
+UPLOAD_DIR = os.path.abspath(os.getenv("UPLOAD_DIR", "uploads"))
+# e.g. /protected-uploads/ for `location /protected-uploads/ { internal; alias <UPLOAD_DIR>/; }`
+UPLOAD_ACCEL_REDIRECT = os.getenv("UPLOAD_ACCEL_REDIRECT", "")
+
+COPY_CHUNK = 1024 * 1024
+
+
+class FileMissing(Exception):
+    """No file with that id in the storage backend"""
+
+
+class StoredFile:
+    """A stored file: its document fields plus a way to read the bytes"""
+
+    def __init__(self, doc, path=None, grid_out=None):
+        self.id = str(doc["_id"])
+        self.filename = doc.get("filename")
+        self.content_type = doc.get("contentType") or "application/octet-stream"
+        self.length = doc.get("length", 0)
+        self.upload_date = doc.get("uploadDate")
+        self.metadata = doc.get("metadata") or {}
+        self.sha256 = doc.get("sha256")
+        self.path = path  # local backend only
+        self._grid_out = grid_out
+
+    def open(self):
+        """Binary, seekable file object; the caller closes it"""
+        if self.path:
+            return open(self.path, "rb")
+        return self._grid_out
+
+    def read(self) -> bytes:
+        with self.open() as f:
+            return f.read()
+
+
+def _oid(file_id):
+    try:
+        return ObjectId(file_id)
+    except Exception:
+        raise FileMissing(file_id)
+
+
+class GridFSStorage:
+    name = "gridfs"
+
+    def __init__(self, gridfs, db):
+        self.fs = gridfs
+        self.files = db["fs.files"]
+
+    def put(self, data, filename=None, content_type=None, metadata=None, file_id=None, upload_date=None) -> str:
+        """Store bytes or a binary file object; returns the file id"""
+        kwargs = {"filename": filename, "content_type": content_type}
+        if metadata is not None:
+            kwargs["metadata"] = metadata
+        if file_id is not None:
+            kwargs["_id"] = ObjectId(file_id)
+        if upload_date is not None:
+            kwargs["uploadDate"] = upload_date
+        return str(self.fs.put(data, **kwargs))
+
+    def get(self, file_id) -> StoredFile:
+        try:
+            grid_out = self.fs.get(_oid(file_id))
+        except NoFile:
+            raise FileMissing(file_id)
+        doc = {"_id": grid_out._id, "filename": grid_out.filename, "contentType": grid_out.content_type,
+               "length": grid_out.length, "uploadDate": grid_out.upload_date, "metadata": grid_out.metadata}
+        return StoredFile(doc, grid_out=grid_out)
+
+    def delete(self, file_id):
+        """A missing file is a no-op"""
+        self.fs.delete(_oid(file_id))
+
+    def find_one(self, query, projection=None):
+        return self.files.find_one(query, projection)
+
+    def find(self, query, projection=None):
+        return self.files.find(query, projection)
+
+    def update_metadata(self, file_id, values: dict):
+        self.files.update_one({"_id": _oid(file_id)}, {"$set": {f"metadata.{k}": v for k, v in values.items()}})
+
+    def ensure_indexes(self):
+        # derived files (thumbnails, previews) are looked up and deleted by their original
+        self.files.create_index("metadata.derived_from")
+
+
+class LocalFileStorage:
+    name = "local"
+
+    def __init__(self, root, db, fallback=None):
+        self.root = root
+        self.files = db["files"]
+        self.fallback = fallback  # GridFS files not migrated yet
+
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def _spool(self, data):
+        """Copy the bytes to a temp file in UPLOAD_DIR, hashing on the way; (tmp path, sha256, length)"""
+        tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        length = 0
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                chunks = [data] if isinstance(data, (bytes, bytearray)) else iter(lambda: data.read(COPY_CHUNK), b"")
+                for chunk in chunks:
+                    digest.update(chunk)
+                    length += len(chunk)
+                    out.write(chunk)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return tmp_path, digest.hexdigest(), length
+
+    def put(self, data, filename=None, content_type=None, metadata=None, file_id=None, upload_date=None) -> str:
+        """Store bytes or a binary file object; returns the file id"""
+        tmp_path, sha256, length = self._spool(data)
+        doc = {
+            "_id": ObjectId(file_id) if file_id is not None else ObjectId(),
+            "filename": filename,
+            "contentType": content_type,
+            "length": length,
+            "uploadDate": upload_date or datetime.now(timezone.utc),
+            "sha256": sha256,
+        }
+        if metadata is not None:  # as in GridFS: `metadata: null` would block $set of its fields
+            doc["metadata"] = metadata
+        try:
+            self.files.insert_one(doc)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        # the blob is checked only after the document exists; delete() relies on that order
+        path = self.blob_path(sha256)
+        if os.path.exists(path):
+            os.unlink(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        return str(doc["_id"])
+
+    def get(self, file_id) -> StoredFile:
+        doc = self.files.find_one({"_id": _oid(file_id)})
+        if doc is None:
+            if self.fallback:
+                return self.fallback.get(file_id)
+            raise FileMissing(file_id)
+        path = self.blob_path(doc["sha256"])
+        if not os.path.exists(path) and not self._wait_for_blob(path):
+            raise FileMissing(file_id)
+        return StoredFile(doc, path=path)
+
+    @staticmethod
+    def _wait_for_blob(path, attempts=5):
+        # a delete of another copy moves the blob aside for a moment before putting it back
+        for _ in range(attempts):
+            time.sleep(0.01)
+            if os.path.exists(path):
+                return True
+        return False
+
+    def delete(self, file_id):
+        """A missing file is a no-op; the blob goes with the last file that uses it"""
+        doc = self.files.find_one_and_delete({"_id": _oid(file_id)}, {"sha256": 1})
+        if doc is None:
+            if self.fallback:
+                self.fallback.delete(file_id)
+            return
+        sha256 = doc["sha256"]
+        if self.files.count_documents({"sha256": sha256}, limit=1):
+            return
+        # A put() of the same content may have inserted its document after that count, seen the
+        # blob and dropped its own copy. So the blob is moved aside before counting again: a put
+        # that saw the blob had inserted its document first and is counted now (the blob goes
+        # back); a put that checks after the move finds no blob and moves its own copy in.
+        path = self.blob_path(sha256)
+        aside = f"{path}.deleting-{uuid.uuid4().hex}"
+        try:
+            os.rename(path, aside)
+        except FileNotFoundError:
+            return  # a concurrent delete of the same content has it
+        if self.files.count_documents({"sha256": sha256}, limit=1):
+            os.replace(aside, path)  # same bytes, also if a put has moved a copy in meanwhile
+        else:
+            os.unlink(aside)
+
+    def find_one(self, query, projection=None):
+        doc = self.files.find_one(query, projection)
+        if doc is None and self.fallback:
+            doc = self.fallback.find_one(query, projection)
+        return doc
+
+    def find(self, query, projection=None):
+        yield from self.files.find(query, projection)
+        if self.fallback:
+            yield from self.fallback.find(query, projection)
+
+    def update_metadata(self, file_id, values: dict):
+        update = {"$set": {f"metadata.{k}": v for k, v in values.items()}}
+        if self.files.update_one({"_id": _oid(file_id)}, update).matched_count == 0 and self.fallback:
+            self.fallback.update_metadata(file_id, values)
+
+    def ensure_indexes(self):
+        os.makedirs(self.root, exist_ok=True)
+        self.files.create_index("metadata.derived_from")
+        self.files.create_index("sha256")
+        if self.fallback:
+            self.fallback.ensure_indexes()
+
+    def clean_tmp(self, older_than_seconds: float = 3600):
+        """Remove temp files left by uploads that were interrupted"""
+        tmp_dir = os.path.join(self.root, "tmp")
+        if not os.path.isdir(tmp_dir):
+            return 0
+        cutoff = datetime.now().timestamp() - older_than_seconds
+        removed = 0
+        for entry in os.scandir(tmp_dir):
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+                removed += 1
+        return removed
+
+
+gridfs_storage = GridFSStorage(fs, mongodb)
+
+if FILE_STORAGE == "gridfs":
+    storage = gridfs_storage
+elif FILE_STORAGE == "local":
+    storage = LocalFileStorage(UPLOAD_DIR, mongodb, fallback=gridfs_storage)
+else:
+    raise RuntimeError(f"Unknown FILE_STORAGE {FILE_STORAGE!r}, expected gridfs or local")
+
+
+def accel_redirect_path(stored: StoredFile):
+    """Internal nginx location of a local file, None when nginx does not serve uploads"""
+    if not (UPLOAD_ACCEL_REDIRECT and stored.path):
+        return None
+    return UPLOAD_ACCEL_REDIRECT.rstrip("/") + "/" + os.path.relpath(stored.path, UPLOAD_DIR).replace(os.sep, "/")
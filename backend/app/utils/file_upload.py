@@ -1,26 +1,36 @@
-from gridfs import GridFS
-from app.database.mongodb_connection import mongodb
-
 from bson import ObjectId
-from app.database.mongodb_connection import fs
-
-fs = GridFS(mongodb)
+from app.utils.file_storage import storage
+from app.utils.job_queue import job_handler, defer
 
 
 def save_file(file):
-    content = file.file.read()
-    file_id = fs.put(
-        content,
+    # streamed into the storage backend rather than read into memory first
+    file_id = storage.put(
+        file.file,
         filename=file.filename,
         content_type=file.content_type
     )
-    return str(file_id)
+    return file_id
 
 
 
 
 def delete_file(file_id: str):
     try:
-        fs.delete(ObjectId(file_id))
+        storage.delete(file_id)
     except Exception:
         pass  # safe delete (file may already be gone)
+
+
+@job_handler("delete_file")
+def _delete_file_job(file_id: str):
+    # the file and its thumbnail/preview; a missing file is a no-op, other errors are retried
+    for derived in list(storage.find({"metadata.derived_from": ObjectId(file_id)}, {"_id": 1})):
+        storage.delete(derived["_id"])
+    storage.delete(file_id)
+
+
+def delete_file_later(file_id: str, created_by: int = None):
+    """Remove a stored file from a background job instead of inside the request"""
+    return defer("delete_file", {"file_id": str(file_id)}, dedup_key=f"delete_file:{file_id}",
+                 created_by=created_by)
@@ -0,0 +1,22 @@
+from fastapi import HTTPException
+from typing import Optional
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """Version number from an If-Match header ("3", "\"3\"" or W/"3"); None when absent or "*" """
+    if if_match is None:
+        return None
+    value = if_match.strip()
+    if value in ("", "*"):
+        return None
+    if value.startswith("W/"):
+        value = value[2:]
+    value = value.strip('"')
+    try:
+        return int(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must be the task version returned in the ETag")
+
+
+def etag(version) -> str:
+    return f'"{version}"'
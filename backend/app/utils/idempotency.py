@@ -0,0 +1,262 @@
+"""
+Idempotency-Key support for create endpoints
+
+A client that retries a create with the same Idempotency-Key header gets the first
+attempt's response back instead of a second row (or a 500 from the UNIQUE description on
+tasks). Keys are scoped to the caller and the endpoint, and bound to a fingerprint of the
+request so a reused key with a different payload is rejected with 422.
+
+While the first attempt is still running, retries with the same key wait for it (up to
+IDEMPOTENCY_WAIT_SECONDS, then 409) rather than executing again. Successful responses and
+4xx errors are remembered for IDEMPOTENCY_TTL_SECONDS; 5xx failures are forgotten, and
+retries waiting on them run the request again.
+
+Keys live in process memory by default, which only holds with a single API worker: behind
+several workers a retry that lands on another one runs again. Set IDEMPOTENCY_STORE=mongo to
+share them (the `idempotency_keys` collection); a claim whose worker died is taken over after
+IDEMPOTENCY_LEASE_SECONDS. The memory store keeps at most IDEMPOTENCY_MAX_KEYS keys, evicting
+the least recently used.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_STORE = os.getenv("IDEMPOTENCY_STORE", "memory")
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "30"))
+IDEMPOTENCY_LEASE_SECONDS = float(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "300"))
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyStore(ABC):
+    """Storage for idempotency keys. claim() must be atomic per key."""
+
+    @abstractmethod
+    def claim(self, key: str, fingerprint: str) -> Optional[str]:
+        """None if the caller now owns key and runs the request, else the fingerprint it was claimed with"""
+
+    @abstractmethod
+    def wait(self, key: str, timeout: float) -> Optional[dict]:
+        """{"result", "error"} of the finished request; None if it was forgotten. TimeoutError if still running."""
+
+    @abstractmethod
+    def finish(self, key: str, result=None, error: dict = None):
+        """Remember the outcome for IDEMPOTENCY_TTL_SECONDS"""
+
+    @abstractmethod
+    def forget(self, key: str):
+        """Drop the claim (the request failed with a server error)"""
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "done", "result", "error", "expires", "forgotten")
+
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.expires = None  # set when finished
+        self.forgotten = False
+
+
+class MemoryIdempotencyStore(IdempotencyStore):
+    def __init__(self, ttl=IDEMPOTENCY_TTL_SECONDS, max_keys=IDEMPOTENCY_MAX_KEYS):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def claim(self, key, fingerprint):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires is not None and entry.expires <= now:
+                entry = None
+            if entry is None:
+                self._entries[key] = _Entry(fingerprint)
+                self._evict()
+                return None
+            self._entries.move_to_end(key)
+            return entry.fingerprint
+
+    def wait(self, key, timeout):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if not entry.done.wait(timeout):
+            raise TimeoutError(key)
+        if entry.forgotten:
+            return None
+        return {"result": entry.result, "error": entry.error}
+
+    def finish(self, key, result=None, error=None):
+        with self._lock:
+            entry = self._entries[key]
+            entry.result, entry.error = result, error
+            entry.expires = time.monotonic() + self.ttl
+        entry.done.set()
+
+    def forget(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry.forgotten = True
+            entry.done.set()
+
+    def _evict(self):
+        # only finished entries are evicted; in-flight ones hold waiters
+        while len(self._entries) > self.max_keys:
+            for key, entry in self._entries.items():
+                if entry.done.is_set():
+                    del self._entries[key]
+                    break
+            else:
+                return
+
+
+class MongoIdempotencyStore(IdempotencyStore):
+    """Keys shared by all workers; waiters poll the key's document"""
+
+    POLL_SECONDS = (0.05, 0.5)  # first and longest pause between polls
+
+    def __init__(self, ttl=IDEMPOTENCY_TTL_SECONDS, lease=IDEMPOTENCY_LEASE_SECONDS):
+        from app.database.mongodb_connection import idempotency_collection
+        self.ttl = ttl
+        self.lease = lease
+        self._collection = idempotency_collection
+        self._collection.create_index("expires_at", expireAfterSeconds=0)
+
+    def claim(self, key, fingerprint):
+        from pymongo.errors import DuplicateKeyError
+
+        now = datetime.now(timezone.utc)
+        running = {"fingerprint": fingerprint, "status": "running", "expires_at": now + timedelta(seconds=self.lease)}
+        try:
+            self._collection.insert_one({"_id": key, **running})
+            return None
+        except DuplicateKeyError:
+            pass
+        # expired but not yet removed by the TTL monitor, or claimed by a worker that died
+        if self._collection.find_one_and_update(
+            {"_id": key, "expires_at": {"$lte": now}}, {"$set": running, "$unset": {"result": "", "error": ""}}
+        ):
+            return None
+        doc = self._collection.find_one({"_id": key}, {"fingerprint": 1})
+        if doc is None:  # forgotten in between
+            return self.claim(key, fingerprint)
+        return doc["fingerprint"]
+
+    def wait(self, key, timeout):
+        deadline = time.monotonic() + timeout
+        pause, longest = self.POLL_SECONDS
+        while True:
+            doc = self._collection.find_one({"_id": key}, {"status": 1, "result": 1, "error": 1})
+            if doc is None:
+                return None
+            if doc["status"] == "done":
+                return {"result": doc.get("result"), "error": doc.get("error")}
+            if time.monotonic() >= deadline:
+                raise TimeoutError(key)
+            time.sleep(min(pause, max(deadline - time.monotonic(), 0)))
+            pause = min(pause * 2, longest)
+
+    def finish(self, key, result=None, error=None):
+        self._collection.update_one({"_id": key}, {"$set": {
+            "status": "done",
+            "result": jsonable_encoder(result),
+            "error": error,
+            "expires_at": datetime.now(timezone.utc) + timedelta(seconds=self.ttl),
+        }})
+
+    def forget(self, key):
+        self._collection.delete_one({"_id": key, "status": "running"})
+
+
+_store = None
+
+
+def set_idempotency_store(store: IdempotencyStore):
+    global _store
+    _store = store
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    global _store
+    if _store is None:
+        _store = MongoIdempotencyStore() if IDEMPOTENCY_STORE == "mongo" else MemoryIdempotencyStore()
+    return _store
+
+
+def fingerprint(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def run_idempotent(idempotency_key: Optional[str], scope: str, request_fingerprint: str, fn):
+    """Run fn() once per (scope, key). Returns (result, replayed).
+
+    Without a key fn() simply runs. HTTPExceptions below 500 are replayed like results.
+    """
+    if not idempotency_key:
+        return fn(), False
+    if len(idempotency_key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters")
+
+    store = get_idempotency_store()
+    key = f"{scope}:{idempotency_key}"
+    try:
+        claimed_with = store.claim(key, request_fingerprint)
+    except Exception as e:
+        # fail open: a broken shared store must not block creates
+        logger.warning(f"Idempotency store unavailable: {str(e)}")
+        return fn(), False
+
+    if claimed_with is not None:
+        if claimed_with != request_fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+        try:
+            outcome = store.wait(key, IDEMPOTENCY_WAIT_SECONDS)
+        except TimeoutError:
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+        if outcome is None:
+            # the first attempt failed with a server error and was forgotten: run it again
+            return run_idempotent(idempotency_key, scope, request_fingerprint, fn)
+        if outcome["error"] is not None:
+            raise HTTPException(**outcome["error"])
+        return outcome["result"], True
+
+    try:
+        result = fn()
+    except HTTPException as e:
+        if e.status_code < 500:
+            _settle(store.finish, key, error={"status_code": e.status_code, "detail": e.detail, "headers": e.headers})
+        else:
+            _settle(store.forget, key)
+        raise
+    except BaseException:
+        _settle(store.forget, key)
+        raise
+    _settle(store.finish, key, result=result)
+    return result, False
+
+
+def _settle(method, key, **kwargs):
+    try:
+        method(key, **kwargs)
+    except Exception as e:
+        logger.warning(f"Could not record idempotency outcome for {key}: {str(e)}")
@@ -0,0 +1,276 @@
+"""
+Durable background jobs
+
+Side effects that do not have to finish before the response (role grants after an
+assignment, file deletes after a remark goes) are written to the `jobs` collection and run
+by workers. Jobs survive restarts: a worker claims one with an atomic find_one_and_update that
+leases it for JOB_LEASE_SECONDS, and a job whose worker died is claimed again once the lease
+runs out.
+
+Failures are retried with exponential backoff (JOB_RETRY_BASE_SECONDS, doubling, capped at
+JOB_RETRY_MAX_SECONDS) until max_attempts; HTTPExceptions below 500 are permanent and fail the
+job at once. A job with a dedup_key is not enqueued again while one with the same key is still
+queued or running. Finished jobs expire after JOB_RETENTION_DAYS; failed ones are kept for
+GET /api/jobs and can be retried.
+
+The API runs JOB_WORKERS worker tasks. Set it to 0 and run the workers as separate processes
+with `python -m app.utils.job_queue [workers]` from the backend directory.
+"""
+
+import asyncio
+import importlib
+import logging
+import os
+import random
+import socket
+import sys
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from app.database.mongodb_connection import jobs_collection
+from app.utils.mongo_serializer import serialize_mongo
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))
+JOB_RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "3600"))
+JOB_RETENTION_DAYS = float(os.getenv("JOB_RETENTION_DAYS", "7"))
+# workers start only once the dedup index exists; how often to retry creating it
+JOB_INDEX_RETRY_SECONDS = float(os.getenv("JOB_INDEX_RETRY_SECONDS", "30"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+STATUSES = (QUEUED, RUNNING, DONE, FAILED)
+
+# modules whose import registers job handlers; standalone workers import them up front
+HANDLER_MODULES = ("app.crud.users_crud", "app.utils.file_upload", "app.crud.report_crud", "app.utils.thumbnails")
+
+_handlers = {}
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help"""
+
+
+def job_handler(job_type: str):
+    """Register fn(**payload) as the handler for job_type"""
+    def register(fn):
+        _handlers[job_type] = fn
+        return fn
+    return register
+
+
+def load_handlers():
+    for module in HANDLER_MODULES:
+        importlib.import_module(module)
+
+
+def ensure_job_indexes():
+    jobs_collection.create_index([("status", ASCENDING), ("run_at", ASCENDING)], name="claim")
+    # one queued/running job per dedup_key; finished jobs drop the `active` flag
+    jobs_collection.create_index(
+        "dedup_key", name="dedup_active", unique=True, partialFilterExpression={"active": True}
+    )
+    jobs_collection.create_index("expires_at", name="expire_finished", expireAfterSeconds=0)
+
+
+def enqueue(job_type: str, payload: dict = None, dedup_key: str = None, delay: float = 0,
+            max_attempts: int = JOB_MAX_ATTEMPTS, created_by: int = None) -> str:
+    """Persist a job and return its id (the existing job's id if dedup_key is already pending)"""
+    now = datetime.now()
+    doc = {
+        "type": job_type,
+        "payload": payload or {},
+        "status": QUEUED,
+        "attempts": 0,
+        "max_attempts": max_attempts,
+        "run_at": now + timedelta(seconds=delay),
+        "created_by": created_by,
+        "created_at": now,
+        "updated_at": now,
+    }
+    if dedup_key is None:
+        return str(jobs_collection.insert_one(doc).inserted_id)
+
+    pending = {"dedup_key": dedup_key, "active": True}
+    try:
+        job = jobs_collection.find_one_and_update(
+            pending, {"$setOnInsert": doc}, upsert=True,
+            projection={"_id": 1}, return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        # a concurrent enqueue inserted it first
+        job = jobs_collection.find_one(pending, {"_id": 1})
+        if job is None:  # ... and it has finished since: queue a fresh one
+            return enqueue(job_type, payload, dedup_key, delay, max_attempts, created_by)
+    return str(job["_id"])
+
+
+def defer(job_type: str, payload: dict = None, dedup_key: str = None, **kwargs):
+    """enqueue(), or run the handler right away if the job store is unreachable"""
+    try:
+        return enqueue(job_type, payload, dedup_key, **kwargs)
+    except PyMongoError as e:
+        logger.warning(f"Could not enqueue {job_type} job, running it inline: {str(e)}")
+        try:
+            _handlers[job_type](**(payload or {}))
+        except Exception as inline_error:
+            logger.warning(f"Inline {job_type} job failed: {str(inline_error)}")
+        return None
+
+
+def claim(worker_id: str):
+    """Lease the next due job to worker_id; None if there is nothing to do"""
+    now = datetime.now()
+    return jobs_collection.find_one_and_update(
+        {"$or": [
+            {"status": QUEUED, "run_at": {"$lte": now}},
+            {"status": RUNNING, "locked_until": {"$lt": now}},  # its worker died
+        ]},
+        {
+            "$set": {
+                "status": RUNNING,
+                "worker": worker_id,
+                "locked_until": now + timedelta(seconds=JOB_LEASE_SECONDS),
+                "started_at": now,
+                "updated_at": now,
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("run_at", ASCENDING)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def backoff(attempts: int) -> float:
+    delay = min(JOB_RETRY_MAX_SECONDS, JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1.0)  # jitter so failed jobs do not retry in lockstep
+
+
+def _error_text(error) -> str:
+    detail = getattr(error, "detail", None)
+    return str(detail or error) or type(error).__name__
+
+
+def run_job(job, worker_id: str):
+    """Run a claimed job and record the outcome"""
+    handler = _handlers.get(job["type"])
+    try:
+        if handler is None:
+            raise PermanentJobError(f"No handler for job type {job['type']}")
+        if job["attempts"] > job["max_attempts"]:
+            raise PermanentJobError("Lease expired on the last attempt")
+        handler(**job["payload"])
+    except Exception as e:
+        _record_failure(job, worker_id, e)
+        return False
+    now = datetime.now()
+    jobs_collection.update_one(
+        {"_id": job["_id"], "worker": worker_id, "status": RUNNING},
+        {
+            "$set": {"status": DONE, "finished_at": now, "updated_at": now,
+                     "expires_at": now + timedelta(days=JOB_RETENTION_DAYS)},
+            "$unset": {"active": "", "locked_until": ""},
+        },
+    )
+    return True
+
+
+def _record_failure(job, worker_id, error):
+    now = datetime.now()
+    permanent = isinstance(error, PermanentJobError) or (
+        isinstance(error, HTTPException) and error.status_code < 500
+    )
+    if permanent or job["attempts"] >= job["max_attempts"]:
+        logger.warning(f"Job {job['_id']} ({job['type']}) failed: {_error_text(error)}")
+        update = {
+            "$set": {"status": FAILED, "last_error": _error_text(error), "finished_at": now, "updated_at": now},
+            "$unset": {"active": "", "locked_until": ""},
+        }
+    else:
+        update = {
+            "$set": {"status": QUEUED, "last_error": _error_text(error), "updated_at": now,
+                     "run_at": now + timedelta(seconds=backoff(job["attempts"]))},
+            "$unset": {"locked_until": ""},
+        }
+    jobs_collection.update_one({"_id": job["_id"], "worker": worker_id, "status": RUNNING}, update)
+
+
+async def run_worker(name: str = "0", poll_interval: float = JOB_POLL_SECONDS):
+    """Claim and run jobs until cancelled; handlers run on a thread"""
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{name}"
+    while True:
+        try:
+            job = await asyncio.to_thread(claim, worker_id)
+        except Exception as e:
+            logger.warning(f"Job claim failed: {str(e)}")
+            job = None
+        if job is None:
+            await asyncio.sleep(poll_interval)
+            continue
+        await asyncio.to_thread(run_job, job, worker_id)
+
+
+def _object_id(job_id: str):
+    try:
+        return ObjectId(job_id)
+    except (InvalidId, TypeError):
+        raise HTTPException(status_code=404, detail="Job not found")
+
+
+def get_job(job_id: str):
+    job = jobs_collection.find_one({"_id": _object_id(job_id)})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return serialize_mongo(job)
+
+
+def list_jobs(status: str = None, job_type: str = None, limit: int = 50):
+    query = {}
+    if status:
+        if status not in STATUSES:
+            raise HTTPException(status_code=400, detail=f"status must be one of {list(STATUSES)}")
+        query["status"] = status
+    if job_type:
+        query["type"] = job_type
+    return [serialize_mongo(j) for j in jobs_collection.find(query).sort("created_at", DESCENDING).limit(limit)]
+
+
+def retry_job(job_id: str):
+    """Queue a failed job again with a fresh set of attempts"""
+    job = jobs_collection.find_one({"_id": _object_id(job_id)})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] != FAILED:
+        raise HTTPException(status_code=409, detail=f"Only failed jobs can be retried, this one is {job['status']}")
+    now = datetime.now()
+    update = {"status": QUEUED, "attempts": 0, "run_at": now, "updated_at": now}
+    if job.get("dedup_key"):
+        update["active"] = True
+    try:
+        jobs_collection.update_one({"_id": job["_id"], "status": FAILED}, {"$set": update, "$unset": {"finished_at": ""}})
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="A job with the same dedup key is already pending")
+    return get_job(job_id)
+
+
+async def _main(workers: int):
+    load_handlers()
+    ensure_job_indexes()
+    await asyncio.gather(*[run_worker(str(i)) for i in range(workers)])
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(_main(int(sys.argv[1]) if len(sys.argv) > 1 else max(JOB_WORKERS, 1)))
+    except KeyboardInterrupt:
+        pass
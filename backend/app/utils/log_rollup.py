@@ -0,0 +1,246 @@
+"""
+Request log retention and per-minute rollups
+
+Raw documents in `logs` expire through a TTL index (LOG_RETENTION_DAYS). Before they go,
+the rollup job folds them into `log_rollups`: one document per (route, method, minute) with
+the request count, error count, total latency and a mergeable latency sketch. Rollups are
+kept long-term and are what the "slowest routes" query reads.
+
+Run once from the backend directory with `python -m app.utils.log_rollup`; the API also runs
+it every LOG_ROLLUP_INTERVAL_SECONDS. Every API worker runs the loop, so a run first leases
+the window past the `inserted_until` watermark in log_rollup_state; the others skip it until
+the watermark has moved or the lease (LOG_ROLLUP_LEASE_SECONDS) has run out.
+
+The watermark is on insertion time (the ObjectId of each log document), not on the request
+timestamp: the API buffers logs and may write them late, after a Mongo outage by a lot. A late
+entry is still counted, into the minute of its request. Entries are rolled up once they are
+LOG_ROLLUP_SETTLE_SECONDS old, which covers writes in flight and clock skew between hosts.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from app.database.mongodb_connection import (
+    mongodb,
+    logs_collection,
+    log_rollups_collection,
+    log_rollup_state_collection,
+    LOG_RETENTION_DAYS,
+)
+
+logger = logging.getLogger(__name__)
+
+LOG_ROLLUP_INTERVAL_SECONDS = float(os.getenv("LOG_ROLLUP_INTERVAL_SECONDS", "60"))
+LOG_ROLLUP_LEASE_SECONDS = float(os.getenv("LOG_ROLLUP_LEASE_SECONDS", "300"))
+LOG_ROLLUP_SETTLE_SECONDS = float(os.getenv("LOG_ROLLUP_SETTLE_SECONDS", "30"))
+
+
+class LatencySketch:
+    """Log-bucketed histogram with bounded relative error (DDSketch style).
+
+    Bucket i counts latencies in (gamma^(i-1), gamma^i]. Sketches merge by adding bucket
+    counts, which is what lets Mongo combine them with $inc and lets queries merge minutes.
+    """
+
+    RELATIVE_ACCURACY = 0.02
+    GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+    _LOG_GAMMA = math.log(GAMMA)
+    ZERO = "z"  # bucket for zero latencies
+
+    def __init__(self, buckets=None):
+        self.buckets = defaultdict(int, buckets or {})
+
+    @classmethod
+    def key(cls, seconds: float) -> str:
+        if seconds <= 0:
+            return cls.ZERO
+        return str(math.ceil(math.log(seconds) / cls._LOG_GAMMA))
+
+    def add(self, seconds: float):
+        self.buckets[self.key(seconds)] += 1
+
+    def merge(self, buckets: dict):
+        for k, n in buckets.items():
+            self.buckets[k] += n
+
+    def quantile(self, q: float):
+        total = sum(self.buckets.values())
+        if not total:
+            return None
+        rank = q * (total - 1)
+        zeros = self.buckets.get(self.ZERO, 0)
+        if rank < zeros:
+            return 0.0
+        seen = zeros
+        for k in sorted((k for k in self.buckets if k != self.ZERO), key=int):
+            seen += self.buckets[k]
+            if seen > rank:
+                # midpoint of the bucket in relative terms
+                return 2 * self.GAMMA ** int(k) / (self.GAMMA + 1)
+        return None
+
+
+def ensure_log_indexes():
+    """TTL on raw logs (retention changes are applied with collMod) and lookup indexes on rollups"""
+    ttl = int(LOG_RETENTION_DAYS * 86400)
+    existing = logs_collection.index_information().get("timestamp_ttl")
+    if existing and existing.get("expireAfterSeconds") != ttl:
+        mongodb.command("collMod", logs_collection.name,
+                        index={"name": "timestamp_ttl", "expireAfterSeconds": ttl})
+    elif not existing:
+        logs_collection.create_index([("timestamp", ASCENDING)], name="timestamp_ttl", expireAfterSeconds=ttl)
+    log_rollups_collection.create_index(
+        [("minute", ASCENDING), ("route", ASCENDING), ("method", ASCENDING)], unique=True
+    )
+
+
+def _minute(ts: datetime) -> datetime:
+    return ts.replace(second=0, microsecond=0)
+
+
+def _claim_window(now: datetime, until: datetime):
+    """(since, lease token) of the window to roll up, None if there is none or another run holds it"""
+    state = log_rollup_state_collection.find_one({"_id": "logs"})
+    if state is None or "inserted_until" not in state:
+        if state is not None:
+            start = state["rolled_until"]  # rolled up by request timestamp until then
+        else:
+            oldest = logs_collection.find_one({}, sort=[("_id", ASCENDING)])
+            if not oldest:
+                return None
+            start = oldest["_id"].generation_time.replace(tzinfo=None)
+        try:
+            log_rollup_state_collection.update_one(
+                {"_id": "logs", "inserted_until": {"$exists": False}},
+                {"$set": {"inserted_until": start}, "$unset": {"rolled_until": ""}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            pass  # another worker started it
+        state = log_rollup_state_collection.find_one({"_id": "logs"})
+    since = state["inserted_until"]
+    if since >= until:
+        return None
+    token = uuid.uuid4().hex
+    claimed = log_rollup_state_collection.find_one_and_update(
+        {"_id": "logs", "inserted_until": since,
+         "$or": [{"leased_until": {"$exists": False}}, {"leased_until": {"$lt": now}}]},
+        {"$set": {"leased_until": now + timedelta(seconds=LOG_ROLLUP_LEASE_SECONDS), "lease_owner": token}},
+    )
+    return (since, token) if claimed else None
+
+
+def rollup_logs(now: datetime = None, batch_size: int = 5000) -> int:
+    """Fold raw logs written since the last run into log_rollups; `now` is naive UTC.
+
+    Returns the number of raw entries processed. Delivery is at-least-once: a run that dies, or
+    outlives its lease, between the rollup writes and the watermark update can count that window
+    twice.
+    """
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    # ObjectIds carry whole seconds
+    until = (now - timedelta(seconds=LOG_ROLLUP_SETTLE_SECONDS)).replace(microsecond=0)
+    claim = _claim_window(now, until)
+    if claim is None:
+        return 0
+    since, token = claim
+    try:
+        processed = _fold(since, until, batch_size)
+    except Exception:
+        # let the next run (here or in another worker) retry the window right away
+        log_rollup_state_collection.update_one(
+            {"_id": "logs", "lease_owner": token}, {"$unset": {"leased_until": "", "lease_owner": ""}}
+        )
+        raise
+    log_rollup_state_collection.update_one(
+        {"_id": "logs", "lease_owner": token},
+        {"$set": {"inserted_until": until}, "$unset": {"leased_until": "", "lease_owner": ""}},
+    )
+    return processed
+
+
+def _fold(since: datetime, until: datetime, batch_size: int) -> int:
+    """Add the raw logs written in [since, until) to the per-minute rollups; returns how many were read"""
+    groups = {}
+    processed = 0
+    cursor = logs_collection.find(
+        {"_id": {"$gte": ObjectId.from_datetime(since), "$lt": ObjectId.from_datetime(until)}},
+        {"timestamp": 1, "route": 1, "path": 1, "method": 1, "status_code": 1, "process_time": 1},
+    ).batch_size(batch_size)
+    for doc in cursor:
+        key = (doc.get("route") or doc.get("path"), doc.get("method"), _minute(doc["timestamp"]))
+        g = groups.get(key)
+        if g is None:
+            g = groups[key] = {"count": 0, "errors": 0, "latency_total": 0.0, "sketch": defaultdict(int)}
+        latency = float(doc.get("process_time") or 0.0)
+        g["count"] += 1
+        g["errors"] += 1 if (doc.get("status_code") or 0) >= 500 else 0
+        g["latency_total"] += latency
+        g["sketch"][LatencySketch.key(latency)] += 1
+        processed += 1
+
+    ops = []
+    for (route, method, minute), g in groups.items():
+        inc = {"count": g["count"], "errors": g["errors"], "latency_total": g["latency_total"]}
+        inc.update({f"sketch.{k}": n for k, n in g["sketch"].items()})
+        ops.append(UpdateOne({"route": route, "method": method, "minute": minute}, {"$inc": inc}, upsert=True))
+    if ops:
+        log_rollups_collection.bulk_write(ops, ordered=False)
+    return processed
+
+
+def slowest_routes(hours: float = 24, limit: int = 10, now: datetime = None):
+    """Routes ordered by p95 latency over the last `hours`, computed from the rollups only"""
+    now = now or datetime.now()
+    merged = {}
+    for doc in log_rollups_collection.find({"minute": {"$gte": now - timedelta(hours=hours)}}):
+        key = (doc["route"], doc["method"])
+        m = merged.get(key)
+        if m is None:
+            m = merged[key] = {"count": 0, "errors": 0, "latency_total": 0.0, "sketch": LatencySketch()}
+        m["count"] += doc.get("count", 0)
+        m["errors"] += doc.get("errors", 0)
+        m["latency_total"] += doc.get("latency_total", 0.0)
+        m["sketch"].merge(doc.get("sketch", {}))
+
+    routes = []
+    for (route, method), m in merged.items():
+        sketch = m["sketch"]
+        routes.append({
+            "route": route,
+            "method": method,
+            "count": m["count"],
+            "errors": m["errors"],
+            "error_rate": m["errors"] / m["count"] if m["count"] else 0.0,
+            "avg_seconds": m["latency_total"] / m["count"] if m["count"] else None,
+            "p50_seconds": sketch.quantile(0.50),
+            "p95_seconds": sketch.quantile(0.95),
+            "p99_seconds": sketch.quantile(0.99),
+        })
+    routes.sort(key=lambda r: r["p95_seconds"] or 0.0, reverse=True)
+    return routes[:limit]
+
+
+async def run_rollup_loop(interval: float = LOG_ROLLUP_INTERVAL_SECONDS):
+    """Background task started with the API: keep rollups current until cancelled"""
+    while True:
+        try:
+            await asyncio.to_thread(rollup_logs)
+        except Exception as e:
+            logger.warning(f"Log rollup failed: {str(e)}")
+        await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    ensure_log_indexes()
+    print(f"Rolled up {rollup_logs()} log entries")
@@ -0,0 +1,55 @@
+"""
+Fast serialization of SQLAlchemy rows for list endpoints
+
+Rows read from our own tables are already valid, so list endpoints turn them straight into
+plain dicts (enums unwrapped to their values) and hand them to ORJSONResponse instead of
+building a Pydantic model per row and letting FastAPI validate the list a second time.
+List queries select only the requested columns, so they come back as lightweight Row tuples
+rather than tracked ORM entities.
+"""
+
+from enum import Enum
+from fastapi import HTTPException
+
+
+def column_names(schema):
+    """Names of the mapped table columns, in table order"""
+    return [c.key for c in schema.__table__.columns]
+
+
+def row_to_dict(obj, columns):
+    """Read the given attributes off an ORM object (or Row) into a JSON-ready dict"""
+    out = {}
+    for name in columns:
+        value = getattr(obj, name)
+        if isinstance(value, Enum):
+            value = value.value
+        out[name] = value
+    return out
+
+
+def rows_to_dicts(rows, columns):
+    return [row_to_dict(r, columns) for r in rows]
+
+
+def resolve_fields(fields, projections, columns, key):
+    """Turn a `fields` query value into the list of columns to select.
+
+    `fields` is either the name of a projection (e.g. "kanban") or a comma separated list of
+    column names. The primary key `key` is always included so clients can address the rows.
+    """
+    if not fields:
+        fields = "full"
+    if fields in projections:
+        selected = list(projections[fields])
+    else:
+        selected = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in selected if f not in columns]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields {unknown}; use one of {sorted(projections)} or a subset of {columns}",
+            )
+    if key not in selected:
+        selected.insert(0, key)
+    return selected
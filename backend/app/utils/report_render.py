@@ -0,0 +1,153 @@
+"""
+Team report rendering (XLSX with openpyxl, PDF with reportlab)
+
+The renderers are plain functions of the report data (dicts, lists, datetimes) returning the
+file bytes, so they can run in the REPORT_WORKERS process pool: a PDF of a large team takes
+seconds of CPU that should not come out of the API process. REPORT_WORKERS=0 renders in the
+calling thread.
+"""
+
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape
+
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+
+CONTENT_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "pdf": "application/pdf",
+}
+
+SUMMARY_ROWS = [
+    ("open_at_start", "Open at start of period"),
+    ("created", "Created"),
+    ("closed", "Closed"),
+    ("closed_on_time", "Closed on time"),
+    ("closed_late", "Closed late"),
+    ("open_at_end", "Open at end of period"),
+    ("overdue_at_end", "Overdue at end of period"),
+    ("avg_cycle_days", "Average cycle time (days)"),
+    ("remarks", "Remarks added"),
+]
+ASSIGNEE_COLUMNS = [
+    ("name", "Assignee"), ("tasks", "Tasks"), ("closed", "Closed"), ("closed_on_time", "On time"),
+    ("closed_late", "Late"), ("open_at_end", "Open"), ("remarks", "Remarks"),
+]
+TASK_COLUMNS = [
+    ("t_id", "ID"), ("title", "Title"), ("assignee", "Assignee"), ("status", "Status"),
+    ("priority", "Priority"), ("expected_closure", "Due"), ("actual_closure", "Closed"), ("remarks", "Remarks"),
+]
+
+_pool = None
+_pool_lock = threading.Lock()  # job workers render from several threads
+
+
+def _title(data):
+    return f"Team report: {data['manager']} - {data['period']}"
+
+
+def _fmt(value):
+    if value is None:
+        return ""
+    if hasattr(value, "strftime"):
+        return value.strftime("%Y-%m-%d")
+    return value
+
+
+def render_xlsx(data) -> bytes:
+    from openpyxl import Workbook
+    from openpyxl.styles import Font
+
+    wb = Workbook()
+    summary = wb.active
+    summary.title = "Summary"
+    summary.append([_title(data)])
+    summary["A1"].font = Font(bold=True, size=14)
+    summary.append([f"{_fmt(data['start'])} to {_fmt(data['end'])} (end exclusive)"])
+    summary.append([])
+    for key, label in SUMMARY_ROWS:
+        summary.append([label, data["summary"][key]])
+    summary.column_dimensions["A"].width = 32
+
+    for title, columns, rows in (
+        ("By assignee", ASSIGNEE_COLUMNS, data["by_assignee"]),
+        ("Tasks", TASK_COLUMNS, data["tasks"]),
+    ):
+        sheet = wb.create_sheet(title)
+        sheet.append([label for _, label in columns])
+        for cell in sheet[1]:
+            cell.font = Font(bold=True)
+        for row in rows:
+            sheet.append([row.get(key) for key, _ in columns])
+        sheet.freeze_panes = "A2"
+
+    remarks = wb.create_sheet("Remarks")
+    remarks.append(["Task", "Author", "Added", "Comment"])
+    for cell in remarks[1]:
+        cell.font = Font(bold=True)
+    for r in data["remarks"]:
+        remarks.append([r["task_id"], r["author"], r["created_at"], r["comment"]])
+
+    out = io.BytesIO()
+    wb.save(out)
+    return out.getvalue()
+
+
+def render_pdf(data) -> bytes:
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    grid = TableStyle([
+        ("GRID", (0, 0), (-1, -1), 0.25, colors.grey),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+        ("FONTSIZE", (0, 0), (-1, -1), 8),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+    ])
+
+    def table(columns, rows):
+        body = [[label for _, label in columns]]
+        body += [[Paragraph(escape(str(_fmt(row.get(key)))), styles["BodyText"]) if key == "title" else _fmt(row.get(key))
+                  for key, _ in columns] for row in rows]
+        t = Table(body, repeatRows=1)
+        t.setStyle(grid)
+        return t
+
+    summary = Table([[label, data["summary"][key]] for key, label in SUMMARY_ROWS])
+    summary.setStyle(TableStyle([("GRID", (0, 0), (-1, -1), 0.25, colors.grey), ("FONTSIZE", (0, 0), (-1, -1), 9)]))
+    story = [
+        Paragraph(escape(_title(data)), styles["Title"]),
+        Paragraph(f"{_fmt(data['start'])} to {_fmt(data['end'])} (end exclusive)", styles["Normal"]),
+        Spacer(1, 12), summary,
+        Spacer(1, 18), Paragraph("By assignee", styles["Heading2"]), table(ASSIGNEE_COLUMNS, data["by_assignee"]),
+        Spacer(1, 18), Paragraph("Tasks", styles["Heading2"]), table(TASK_COLUMNS, data["tasks"]),
+    ]
+    out = io.BytesIO()
+    SimpleDocTemplate(out, pagesize=landscape(A4), title=_title(data)).build(story)
+    return out.getvalue()
+
+
+RENDERERS = {"xlsx": render_xlsx, "pdf": render_pdf}
+
+
+def render(fmt: str, data) -> bytes:
+    """Render in the worker pool and wait for the result (called from a job worker thread)"""
+    global _pool
+    if REPORT_WORKERS <= 0:
+        return RENDERERS[fmt](data)
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=REPORT_WORKERS)
+        pool = _pool
+    return pool.submit(RENDERERS[fmt], data).result()
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
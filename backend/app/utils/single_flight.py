@@ -0,0 +1,76 @@
+"""
+Single-flight coalescing for read queries
+
+When many identical reads arrive together (everyone opening the board at stand-up), only the
+first one runs the query; the others wait for it and share its result. Keys are built by the
+CRUD functions from the normalized query (selected columns, filters) and the caller's
+visibility scope, after the caller has been authorized, so a result is only ever shared
+between callers entitled to exactly the same rows.
+
+Nothing is cached: once the leading query finishes, the next request runs a fresh one.
+Shared results must be treated as read-only; callers get their own copy of the list.
+"""
+
+import threading
+from collections import defaultdict
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        # per key namespace (key[0]): queries executed and requests that joined one in flight
+        self._executed = defaultdict(int)
+        self._coalesced = defaultdict(int)
+
+    def do(self, key, fn):
+        """fn() for the first caller with `key`; concurrent callers with the same key get its result"""
+        namespace = key[0] if isinstance(key, tuple) else key
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._executed[namespace] += 1
+            else:
+                self._coalesced[namespace] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                ns: {
+                    "executed": self._executed[ns],
+                    "coalesced": self._coalesced[ns],
+                    "in_flight": sum(1 for k in self._calls if (k[0] if isinstance(k, tuple) else k) == ns),
+                }
+                for ns in sorted(set(self._executed) | set(self._coalesced))
+            }
+
+
+read_coalescer = SingleFlight()
@@ -0,0 +1,162 @@
+"""
+Thumbnails and previews for remark attachments
+
+When a remark gets an image or PDF attachment, a background job renders a fixed-size
+THUMBNAIL_SIZE x THUMBNAIL_SIZE JPEG (the image scaled and padded, never cropped) and, for
+PDFs, a first-page preview PREVIEW_WIDTH pixels wide. Rendering runs in the THUMBNAIL_WORKERS
+process pool (0 renders in the job thread). The results are stored files (see file_storage)
+with metadata.derived_from pointing at the original. Their ids are written to the original's
+metadata and to the remarks that reference it (thumbnail_id, preview_id), so the remark list
+can show /api/file/{id}/thumb instead of downloading every attachment.
+
+Images need Pillow. PDFs also need PyMuPDF (pip install PyMuPDF); without it PDF
+attachments simply get no thumbnail.
+"""
+
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from bson import ObjectId
+
+from app.database.mongodb_connection import remarks_collection
+from app.utils.file_storage import storage, FileMissing
+from app.utils.job_queue import job_handler, defer, PermanentJobError
+
+THUMBNAIL_SIZE = int(os.getenv("THUMBNAIL_SIZE", "256"))
+PREVIEW_WIDTH = int(os.getenv("PREVIEW_WIDTH", "1024"))
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "2"))
+THUMBNAIL_MAX_SOURCE_BYTES = int(os.getenv("THUMBNAIL_MAX_SOURCE_BYTES", str(25 * 1024 * 1024)))
+
+PDF = "application/pdf"
+JPEG_QUALITY = 80
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def wants_thumbnail(content_type) -> bool:
+    return bool(content_type) and (content_type.startswith("image/") or content_type == PDF)
+
+
+def ensure_thumbnail_indexes():
+    # derived files are looked up (and deleted) by their original
+    storage.ensure_indexes()
+
+
+def _jpeg(image) -> bytes:
+    from PIL import Image
+
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    elif image.mode != "RGB":
+        image = image.convert("RGB")
+    out = io.BytesIO()
+    image.save(out, "JPEG", quality=JPEG_QUALITY, optimize=True)
+    return out.getvalue()
+
+
+def _thumbnail(image) -> bytes:
+    from PIL import ImageOps
+
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+    return _jpeg(ImageOps.pad(image, (THUMBNAIL_SIZE, THUMBNAIL_SIZE), color="white"))
+
+
+def render_derivatives(content_type: str, data: bytes) -> dict:
+    """{"thumbnail": jpeg bytes, "preview": jpeg bytes (PDFs only)}; runs in the worker pool"""
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    if content_type == PDF:
+        try:
+            import pymupdf as fitz
+        except ImportError:
+            try:
+                import fitz  # PyMuPDF before 1.24.3
+            except ImportError:
+                raise PermanentJobError("PDF previews need PyMuPDF")
+        try:
+            with fitz.open(stream=data, filetype="pdf") as doc:
+                if doc.page_count == 0:
+                    raise PermanentJobError("PDF has no pages")
+                page = doc[0]
+                zoom = PREVIEW_WIDTH / max(page.rect.width, 1)
+                pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+                first_page = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+        except (RuntimeError, ValueError) as e:  # PyMuPDF's FileDataError is a RuntimeError
+            raise PermanentJobError(f"Cannot read PDF: {str(e)}")
+        return {"preview": _jpeg(first_page), "thumbnail": _thumbnail(first_page)}
+
+    try:
+        image = Image.open(io.BytesIO(data))
+        image.seek(0)  # first frame of animations
+        image = ImageOps.exif_transpose(image)
+        # open() only reads the header: decode now so a truncated file fails here, not as a retry
+        image.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        raise PermanentJobError(f"Cannot read image: {str(e)}")
+    return {"thumbnail": _thumbnail(image)}
+
+
+def _render(content_type, data):
+    global _pool
+    if THUMBNAIL_WORKERS <= 0:
+        return render_derivatives(content_type, data)
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=THUMBNAIL_WORKERS)
+        pool = _pool
+    return pool.submit(render_derivatives, content_type, data).result()
+
+
+def queue_thumbnails(file_id, content_type, created_by: int = None):
+    """Background thumbnail job for a stored attachment, if it is an image or a PDF"""
+    if file_id and wants_thumbnail(content_type):
+        return defer("thumbnail", {"file_id": str(file_id)}, dedup_key=f"thumbnail:{file_id}",
+                     created_by=created_by)
+    return None
+
+
+@job_handler("thumbnail")
+def generate_thumbnails(file_id: str):
+    oid = ObjectId(file_id)
+    try:
+        original = storage.get(file_id)
+    except FileMissing:
+        return  # deleted before the job ran
+    if original.length > THUMBNAIL_MAX_SOURCE_BYTES:
+        raise PermanentJobError(f"Attachment too large for a thumbnail ({original.length} bytes)")
+
+    derived = {}
+    for kind, content in _render(original.content_type, original.read()).items():
+        # a retried job reuses what an earlier attempt already stored
+        existing = storage.find_one({"metadata.derived_from": oid, "metadata.kind": kind}, {"_id": 1})
+        if existing:
+            derived[f"{kind}_id"] = str(existing["_id"])
+            continue
+        derived[f"{kind}_id"] = storage.put(
+            content,
+            filename=f"{kind}-{original.filename}.jpg",
+            content_type="image/jpeg",
+            metadata={"derived_from": oid, "kind": kind},
+        )
+    storage.update_metadata(file_id, derived)
+    remarks_collection.update_many({"file_id": file_id}, {"$set": derived})
+
+
+def derived_file_id(file_id: str, kind: str):
+    """Id of the thumbnail/preview of a file, None if there is none (yet)"""
+    doc = storage.find_one({"_id": ObjectId(file_id)}, {f"metadata.{kind}_id": 1})
+    return ((doc or {}).get("metadata") or {}).get(f"{kind}_id")
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
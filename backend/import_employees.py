@@ -0,0 +1,50 @@
+"""
+Bulk employee import
+Create employees and their user accounts from a CSV or JSONL file, straight against the database
+
+    python import_employees.py people.csv
+    python import_employees.py people.jsonl --chunk-size 1000 --errors-only
+
+Prints one JSON line per input row followed by a summary.
+"""
+
+import argparse
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+from fastapi import HTTPException
+
+from app.crud.import_crud import import_employees
+from app.schemas.schemas import UserRole
+
+# whoever can run this against the database may grant any role
+OPERATOR = SimpleNamespace(e_id=None, roles=[r.value for r in UserRole])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import employees and users from CSV or JSONL")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--errors-only", action="store_true", help="only print rows that failed")
+    args = parser.parse_args()
+
+    fmt = args.format or os.path.splitext(args.path)[1].lstrip(".").lower().replace("ndjson", "jsonl")
+    try:
+        with open(args.path, "rb") as f:
+            report = import_employees(f, fmt, "Admin", OPERATOR, chunk_size=args.chunk_size)
+    except HTTPException as e:
+        print(f"❌ {e.detail}", file=sys.stderr)
+        sys.exit(1)
+
+    for result in report["results"]:
+        if result["status"] != "created" or not args.errors_only:
+            print(json.dumps(result))
+    print(f"✅ Created {report['created']} employees, {report['failed']} rows failed", file=sys.stderr)
+    sys.exit(1 if report["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,74 @@
 """
-Database initialization script
-Run this script to create all database tables
+Database migration script
+Run this script to create or upgrade the database tables
+
+    python init_db.py                   # same as `upgrade head`
+    python init_db.py upgrade [rev]     # apply pending migrations
+    python init_db.py downgrade <rev>   # roll back to a revision (e.g. -1 or 0001)
+    python init_db.py current           # show the revision the database is at
+    python init_db.py history           # list all revisions
+    python init_db.py stamp <rev>       # mark the database as being at <rev> without running anything
 """
 
-from app.database.mysql_connection import engine, Base
-from app.models.models import EmployeeReqRes, UserReqRes, TaskReqRes
-
-def init_database():
-    """Create all database tables"""
-    print("Creating database tables...")
-    Base.metadata.create_all(bind=engine)
-    print("✅ Database tables created successfully!")
-    print("\nTables created:")
-    print("  - employees")
-    print("  - users")
-    print("  - tasks")
+import argparse
+import os
+
+from alembic import command
+from alembic.config import Config
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def get_alembic_config():
+    cfg = Config(os.path.join(BASE_DIR, "alembic.ini"))
+    cfg.set_main_option("script_location", os.path.join(BASE_DIR, "migrations"))
+    return cfg
+
+
+def init_database(revision: str = "head"):
+    """Bring the database schema up to the given revision"""
+    print(f"Upgrading database to {revision}...")
+    command.upgrade(get_alembic_config(), revision)
+    print("✅ Database schema is up to date!")
     print("\nYou can now start the server with: python -m uvicorn main:app --reload")
 
-if __name__ == "__main__":
-    init_database()
 
+def main():
+    parser = argparse.ArgumentParser(description="Manage the MySQL schema migrations")
+    sub = parser.add_subparsers(dest="cmd")
+
+    up = sub.add_parser("upgrade", help="apply migrations up to a revision")
+    up.add_argument("revision", nargs="?", default="head")
+    up.add_argument("--sql", action="store_true", help="print the SQL instead of running it")
+
+    down = sub.add_parser("downgrade", help="revert migrations down to a revision")
+    down.add_argument("revision")
+    down.add_argument("--sql", action="store_true", help="print the SQL instead of running it")
+
+    sub.add_parser("current", help="show the current revision")
+    sub.add_parser("history", help="list revisions")
+
+    stamp = sub.add_parser("stamp", help="set the revision without running migrations")
+    stamp.add_argument("revision")
+
+    args = parser.parse_args()
+    cfg = get_alembic_config()
+
+    if args.cmd in (None, "upgrade"):
+        revision = getattr(args, "revision", "head")
+        if getattr(args, "sql", False):
+            command.upgrade(cfg, revision, sql=True)
+        else:
+            init_database(revision)
+    elif args.cmd == "downgrade":
+        command.downgrade(cfg, args.revision, sql=args.sql)
+    elif args.cmd == "current":
+        command.current(cfg, verbose=True)
+    elif args.cmd == "history":
+        command.history(cfg)
+    elif args.cmd == "stamp":
+        command.stamp(cfg, args.revision)
+
+
+if __name__ == "__main__":
+    main()
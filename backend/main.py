@@ -1,14 +1,31 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from app.routers.employee_router import employee_router
 from app.routers.user_router import users_router
 from app.routers.task_router import task_router
 from app.routers.remark_router import remark_router
 from app.routers.file_router import file_router
 from app.routers.auth_router import auth_router
+from app.routers.log_router import log_router
+from app.routers.export_router import export_router
+from app.routers.job_router import job_router
+from app.routers.report_router import report_router
 from app.middleware.error_handler import error_handler_middleware
-from app.middleware.logging_middleware import logging_middleware
+from app.middleware.logging_middleware import logging_middleware, run_log_flush_loop
+from app.middleware.rate_limit import rate_limit_middleware
+from app.middleware.read_routing import read_routing_middleware
+from app.core.passwords import shutdown_pool
+from app.utils.report_render import shutdown_pool as shutdown_report_pool
+from app.utils.thumbnails import ensure_thumbnail_indexes, shutdown_pool as shutdown_thumbnail_pool
+from app.database.mysql_connection import create_memory_schema
+from app.crud.remark_summary import ensure_remark_indexes
+from app.crud.task_changes import run_purge_loop, TASK_CHANGE_PURGE_INTERVAL_SECONDS
+from app.utils.log_rollup import ensure_log_indexes, run_rollup_loop, LOG_ROLLUP_INTERVAL_SECONDS
+from app.utils.job_queue import ensure_job_indexes, run_worker, JOB_WORKERS, JOB_INDEX_RETRY_SECONDS
 from dotenv import load_dotenv
+import asyncio
+import logging
 import os
 
 load_dotenv()
@@ -16,7 +33,8 @@ load_dotenv()
 app = FastAPI(
     title="UST Employee Task Management",
     description="JIRA-lite Employee Management System with role-based access control",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
 )
 
 # CORS Configuration for Frontend Integration
@@ -40,7 +58,9 @@ app.add_middleware(
 )
 
 # Add custom middleware
+app.middleware("http")(read_routing_middleware)
 app.middleware("http")(error_handler_middleware)
+app.middleware("http")(rate_limit_middleware)  # inside logging so rejected requests are logged too
 app.middleware("http")(logging_middleware)
 
 
@@ -57,6 +77,55 @@ app.include_router(users_router, prefix="/api")
 app.include_router(task_router, prefix="/api")
 app.include_router(remark_router, prefix="/api")
 app.include_router(file_router, prefix="/api")
+app.include_router(log_router, prefix="/api")
+app.include_router(export_router, prefix="/api")
+app.include_router(job_router, prefix="/api")
+app.include_router(report_router, prefix="/api")
+
+_background_tasks = []
+
+
+@app.on_event("startup")
+async def start_log_maintenance():
+    create_memory_schema()
+    # TTL/rollup indexes and the periodic rollup; a Mongo outage must not stop the API from starting.
+    # Each one on its own, so one failing (e.g. the remark summary backfill) does not skip the rest.
+    for ensure in (ensure_log_indexes, ensure_remark_indexes, ensure_thumbnail_indexes):
+        await _ensure(ensure)
+    if LOG_ROLLUP_INTERVAL_SECONDS > 0:
+        _background_tasks.append(asyncio.create_task(run_rollup_loop()))
+    if TASK_CHANGE_PURGE_INTERVAL_SECONDS > 0:
+        _background_tasks.append(asyncio.create_task(run_purge_loop()))
+    _background_tasks.append(asyncio.create_task(run_log_flush_loop()))
+    if JOB_WORKERS > 0:
+        _background_tasks.append(asyncio.create_task(start_job_workers()))
+
+
+async def _ensure(ensure) -> bool:
+    try:
+        await asyncio.to_thread(ensure)
+        return True
+    except Exception as e:
+        logging.getLogger(__name__).warning(f"{ensure.__name__} failed: {str(e)}")
+        return False
+
+
+async def start_job_workers():
+    # enqueue's dedup relies on the partial unique index: no workers until it exists
+    while not await _ensure(ensure_job_indexes):
+        await asyncio.sleep(JOB_INDEX_RETRY_SECONDS)
+    for i in range(JOB_WORKERS):
+        _background_tasks.append(asyncio.create_task(run_worker(str(i))))
+
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    for task in _background_tasks:
+        task.cancel()
+    await asyncio.gather(*_background_tasks, return_exceptions=True)  # lets the log buffer flush
+    shutdown_pool()
+    shutdown_report_pool()
+    shutdown_thumbnail_pool()
 
 @app.get("/", tags=["Root"])
 async def root():
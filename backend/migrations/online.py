@@ -0,0 +1,34 @@
+"""
+Helpers for schema changes that must not block traffic on a live database
+"""
+
+from alembic import op
+
+
+def _dialect():
+    return op.get_bind().dialect.name
+
+
+def create_index_online(index_name, table_name, columns, unique=False):
+    """Build an index without locking the table for writes.
+
+    MySQL (InnoDB) builds it in place with concurrent DML allowed; if the server cannot honour
+    LOCK=NONE the statement fails instead of silently taking a table lock. Other databases fall
+    back to a regular CREATE INDEX, which is fine for SQLite and small tables.
+    """
+    if _dialect() == "mysql":
+        cols = ", ".join(f"`{c}`" for c in columns)
+        kind = "UNIQUE INDEX" if unique else "INDEX"
+        op.execute(
+            f"CREATE {kind} `{index_name}` ON `{table_name}` ({cols}) ALGORITHM=INPLACE, LOCK=NONE"
+        )
+    else:
+        op.create_index(index_name, table_name, columns, unique=unique)
+
+
+def drop_index_online(index_name, table_name):
+    """Drop an index built with create_index_online"""
+    if _dialect() == "mysql":
+        op.execute(f"DROP INDEX `{index_name}` ON `{table_name}` ALGORITHM=INPLACE, LOCK=NONE")
+    else:
+        op.drop_index(index_name, table_name=table_name)
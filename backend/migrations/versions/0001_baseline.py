@@ -0,0 +1,78 @@
+"""baseline: employees, tasks and users as created by the old create_all
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _existing_tables():
+    if op.get_context().as_sql:
+        # offline (--sql) mode has no live connection to inspect
+        return set()
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade():
+    # Databases bootstrapped by Base.metadata.create_all already have these tables;
+    # skip them so the baseline can be applied to existing deployments as well as empty ones.
+    existing = _existing_tables()
+
+    if "employees" not in existing:
+        op.create_table(
+            "employees",
+            sa.Column("e_id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(50), nullable=False),
+            sa.Column("email", sa.String(100), nullable=False, unique=True),
+            sa.Column("designation", sa.String(50), nullable=False),
+            sa.Column("mgr_id", sa.Integer(), nullable=False),
+        )
+        op.create_index("ix_employees_e_id", "employees", ["e_id"])
+
+    if "tasks" not in existing:
+        op.create_table(
+            "tasks",
+            sa.Column("t_id", sa.Integer(), primary_key=True),
+            sa.Column("title", sa.String(100), nullable=False),
+            sa.Column("description", sa.String(250), nullable=False, unique=True),
+            sa.Column("assigned_to", sa.Integer(), sa.ForeignKey("employees.e_id")),
+            sa.Column("assigned_by", sa.Integer(), sa.ForeignKey("employees.e_id")),
+            sa.Column("assigned_at", sa.DateTime()),
+            sa.Column("updated_by", sa.Integer(), sa.ForeignKey("employees.e_id")),
+            sa.Column("updated_at", sa.DateTime()),
+            sa.Column("priority", sa.Enum("HIGH", "MEDIUM", "LOW", name="taskpriority"), nullable=False),
+            sa.Column(
+                "status",
+                sa.Enum("TO_DO", "IN_PROGRESS", "REVIEW", "DONE", name="taskstatus"),
+                nullable=False,
+            ),
+            sa.Column("reviewer", sa.Integer(), sa.ForeignKey("employees.e_id")),
+            sa.Column("created_by", sa.Integer(), sa.ForeignKey("employees.e_id")),
+            sa.Column("expected_closure", sa.DateTime(), nullable=False),
+            sa.Column("actual_closure", sa.DateTime()),
+        )
+        op.create_index("ix_tasks_t_id", "tasks", ["t_id"])
+
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("e_id", sa.Integer(), primary_key=True),
+            sa.Column("password", sa.String(100), nullable=False),
+            sa.Column("roles", sa.JSON(), nullable=False),
+            sa.Column("status", sa.Enum("ACTIVE", "INACTIVE", name="userstatus"), nullable=False),
+        )
+        op.create_index("ix_users_e_id", "users", ["e_id"])
+
+
+def downgrade():
+    op.drop_table("users")
+    op.drop_table("tasks")
+    op.drop_table("employees")
@@ -0,0 +1,24 @@
+"""tasks.version column for optimistic concurrency
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Adding a column with a constant default is an instant, metadata-only change on MySQL 8
+    op.add_column("tasks", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+
+
+def downgrade():
+    with op.batch_alter_table("tasks") as batch:
+        batch.drop_column("version")
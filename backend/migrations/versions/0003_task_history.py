@@ -0,0 +1,50 @@
+"""task_history, task_flow_stats and workflow timestamps on tasks
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("tasks", sa.Column("created_at", sa.DateTime()))
+    op.add_column("tasks", sa.Column("started_at", sa.DateTime()))
+    op.add_column("tasks", sa.Column("status_changed_at", sa.DateTime()))
+
+    op.create_table(
+        "task_history",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("t_id", sa.Integer(), nullable=False),
+        sa.Column("field", sa.String(30), nullable=False),
+        sa.Column("old_value", sa.String(255)),
+        sa.Column("new_value", sa.String(255)),
+        sa.Column("changed_by", sa.Integer()),
+        sa.Column("changed_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_task_history_t_id_changed_at", "task_history", ["t_id", "changed_at"])
+
+    op.create_table(
+        "task_flow_stats",
+        sa.Column("dimension", sa.String(10), primary_key=True),
+        sa.Column("e_id", sa.Integer(), primary_key=True),
+        sa.Column("metric", sa.String(30), primary_key=True),
+        sa.Column("total_seconds", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("samples", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+
+def downgrade():
+    op.drop_table("task_flow_stats")
+    op.drop_table("task_history")
+    with op.batch_alter_table("tasks") as batch:
+        batch.drop_column("status_changed_at")
+        batch.drop_column("started_at")
+        batch.drop_column("created_at")
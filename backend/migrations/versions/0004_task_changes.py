@@ -0,0 +1,33 @@
+"""task_changes feed for delta sync
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "task_changes",
+        sa.Column("change_id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("t_id", sa.Integer(), nullable=False),
+        sa.Column("op", sa.String(10), nullable=False),
+        sa.Column("assigned_to", sa.Integer()),
+        sa.Column("assigned_by", sa.Integer()),
+        sa.Column("reviewer", sa.Integer()),
+        sa.Column("created_by", sa.Integer()),
+        sa.Column("changed_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_task_changes_changed_at", "task_changes", ["changed_at"])
+
+
+def downgrade():
+    op.drop_table("task_changes")
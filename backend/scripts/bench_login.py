@@ -0,0 +1,83 @@
+"""
+Benchmark: event-loop responsiveness during a login storm
+
+Run from the backend directory:
+
+    python -m scripts.bench_login [logins] [concurrency]
+
+Fires `logins` bcrypt verifications at BCRYPT_ROUNDS cost, `concurrency` at a time, while a
+heartbeat task ticks every 10 ms and records how late each tick fires (the lag any other
+request on the loop would see). "inline" verifies on the event loop, which is what a naive
+async login does; "offloaded" goes through verify_password_async (process pool) as
+/auth/login does now. No database is needed.
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+
+from app.core.passwords import (
+    BCRYPT_ROUNDS,
+    PASSWORD_HASH_WORKERS,
+    hash_password,
+    verify_password,
+    verify_password_async,
+    shutdown_pool,
+)
+
+TICK = 0.01
+
+
+async def heartbeat(lags, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+
+async def storm(verify, stored, logins, concurrency):
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with slots:
+            ok, _ = await verify("correct horse", stored)
+            assert ok
+
+    lags, stop = [], asyncio.Event()
+    beat = asyncio.create_task(heartbeat(lags, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+    return elapsed, lags
+
+
+async def inline_verify(password, stored):
+    return verify_password(password, stored)
+
+
+def report(name, logins, elapsed, lags):
+    lags = sorted(lags) or [0.0]
+    p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))]
+    print(
+        f"{name:10s} {logins / elapsed:8.1f} logins/s   loop lag p50 {statistics.median(lags) * 1000:7.1f} ms"
+        f"   p99 {p99 * 1000:7.1f} ms   max {lags[-1] * 1000:7.1f} ms"
+    )
+
+
+async def main(logins, concurrency):
+    stored = hash_password("correct horse")
+    print(f"bcrypt rounds={BCRYPT_ROUNDS}, workers={PASSWORD_HASH_WORKERS}, {logins} logins, concurrency {concurrency}")
+    await verify_password_async("warm up", stored)  # start the pool outside the measurement
+    for name, verify in (("inline", inline_verify), ("offloaded", verify_password_async)):
+        elapsed, lags = await storm(verify, stored, logins, concurrency)
+        report(name, logins, elapsed, lags)
+    shutdown_pool()
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    c = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    asyncio.run(main(n, c))
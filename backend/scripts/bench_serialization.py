@@ -0,0 +1,100 @@
+"""
+Benchmark: list-endpoint serialization, Pydantic round trip vs. dict + orjson
+
+Run from the backend directory:
+
+    python -m scripts.bench_serialization [rows]
+
+The "pydantic" path mirrors what /Task/getall used to do: model_validate per ORM row, then
+FastAPI dumping and re-validating the list against response_model=List[TaskReqRes],
+jsonable_encoder and stdlib json. The "orjson" path is what the endpoint does now.
+No database is needed; the rows are transient TaskSchema instances.
+"""
+
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.models.models import TaskReqRes, EmployeeReqRes
+from app.schemas.schemas import TaskSchema, EmployeeSchema, TaskStatus, TaskPriority
+from app.utils.orm_serializer import column_names, rows_to_dicts
+
+
+def make_tasks(n):
+    now = datetime.now()
+    statuses = list(TaskStatus)
+    priorities = list(TaskPriority)
+    return [
+        TaskSchema(
+            t_id=i,
+            title=f"Task {i}",
+            description=f"Description for task number {i} " * 3,
+            assigned_to=i % 50,
+            assigned_by=1,
+            assigned_at=now,
+            updated_by=1,
+            updated_at=now,
+            priority=priorities[i % 3],
+            status=statuses[i % 4],
+            reviewer=2,
+            created_by=2,
+            expected_closure=now + timedelta(days=i % 30),
+            actual_closure=None,
+        )
+        for i in range(n)
+    ]
+
+
+def make_employees(n):
+    return [
+        EmployeeSchema(
+            e_id=i,
+            name="Employee Name",
+            email=f"employee{i}@ust.com",
+            designation="Software Engineer",
+            mgr_id=i % 20,
+        )
+        for i in range(n)
+    ]
+
+
+def pydantic_path(rows, model):
+    adapter = TypeAdapter(List[model])
+    models = [model.model_validate(r) for r in rows]
+    revalidated = adapter.validate_python([m.model_dump() for m in models])
+    return json.dumps(jsonable_encoder(revalidated)).encode()
+
+
+def orjson_path(rows, columns):
+    return orjson.dumps(rows_to_dicts(rows, columns))
+
+
+def best_of(fn, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def report(label, rows, model, schema):
+    columns = column_names(schema)
+    # sanity check: both paths produce the same payload
+    assert json.loads(pydantic_path(rows[:100], model)) == json.loads(orjson_path(rows[:100], columns))
+    slow = best_of(lambda: pydantic_path(rows, model))
+    fast = best_of(lambda: orjson_path(rows, columns))
+    print(f"{label:<10} {len(rows):>7} rows   pydantic+json {slow * 1000:8.1f} ms   "
+          f"dict+orjson {fast * 1000:8.1f} ms   speedup x{slow / fast:.1f}")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    report("tasks", make_tasks(n), TaskReqRes, TaskSchema)
+    report("employees", make_employees(n), EmployeeReqRes, EmployeeSchema)
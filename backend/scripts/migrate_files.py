@@ -0,0 +1,107 @@
+"""
+Move GridFS files to the local file storage
+
+Copies every file in GridFS (fs.files / fs.chunks) into UPLOAD_DIR and the `files` collection
+under the same id, with its filename, content type, upload date and metadata, so remarks,
+thumbnails and reports keep pointing at it. Each copy is checked before the GridFS file is
+deleted: the blob is read back from disk and its length and SHA-256 compared with what was
+read from GridFS.
+
+The run can be stopped and started again: files already in `files` are only removed from
+GridFS. Set FILE_STORAGE=local on the API first (it reads GridFS files until they have moved),
+then run from the backend directory:
+
+    python -m scripts.migrate_files --dry-run
+    python -m scripts.migrate_files                 # copy, verify, delete from GridFS
+    python -m scripts.migrate_files --keep-gridfs   # copy and verify only
+"""
+
+import argparse
+import hashlib
+import sys
+
+from app.database.mongodb_connection import fs, mongodb
+from app.utils.file_storage import LocalFileStorage, UPLOAD_DIR, COPY_CHUNK
+
+
+class _Hashing:
+    """File object wrapper that hashes what is read through it"""
+
+    def __init__(self, f):
+        self.f = f
+        self.sha256 = hashlib.sha256()
+
+    def read(self, size=-1):
+        chunk = self.f.read(size)
+        self.sha256.update(chunk)
+        return chunk
+
+
+def _disk_digest(path):
+    """(length, sha256) of the bytes actually on disk"""
+    digest = hashlib.sha256()
+    length = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK), b""):
+            digest.update(chunk)
+            length += len(chunk)
+    return length, digest.hexdigest()
+
+
+def migrate(local: LocalFileStorage, dry_run=False, keep_gridfs=False, limit=None):
+    counts = {"copied": 0, "already_copied": 0, "bytes": 0, "failed": 0}
+    cursor = mongodb["fs.files"].find({}, {"_id": 1}, no_cursor_timeout=True).sort("_id", 1)
+    if limit:
+        cursor = cursor.limit(limit)
+    try:
+        for doc in cursor:
+            file_id = str(doc["_id"])
+            if local.files.find_one({"_id": doc["_id"]}, {"_id": 1}):
+                counts["already_copied"] += 1
+                if not (dry_run or keep_gridfs):
+                    fs.delete(doc["_id"])  # an earlier run stopped between copy and delete
+                continue
+            grid_out = fs.get(doc["_id"])
+            if dry_run:
+                print(f"would copy {file_id} {grid_out.filename!r} ({grid_out.length} bytes)")
+                counts["copied"] += 1
+                counts["bytes"] += grid_out.length
+                continue
+            source = _Hashing(grid_out)
+            local.put(
+                source, filename=grid_out.filename, content_type=grid_out.content_type,
+                metadata=grid_out.metadata, file_id=file_id, upload_date=grid_out.upload_date,
+            )
+            copied = local.get(file_id)
+            if _disk_digest(copied.path) != (grid_out.length, source.sha256.hexdigest()):
+                print(f"{file_id}: copy does not match GridFS, left in GridFS", file=sys.stderr)
+                local.delete(file_id)
+                counts["failed"] += 1
+                continue
+            if not keep_gridfs:
+                fs.delete(doc["_id"])
+            counts["copied"] += 1
+            counts["bytes"] += copied.length
+    finally:
+        cursor.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move GridFS files to the local file storage")
+    parser.add_argument("--dry-run", action="store_true", help="list what would be copied")
+    parser.add_argument("--keep-gridfs", action="store_true", help="copy but do not delete from GridFS")
+    parser.add_argument("--limit", type=int, default=None, help="at most this many files")
+    args = parser.parse_args()
+
+    local = LocalFileStorage(UPLOAD_DIR, mongodb)
+    local.ensure_indexes()
+    counts = migrate(local, dry_run=args.dry_run, keep_gridfs=args.keep_gridfs, limit=args.limit)
+    removed = 0 if args.dry_run else local.clean_tmp()
+    print(f"{UPLOAD_DIR}: copied {counts['copied']} ({counts['bytes'] / 1024 / 1024:.1f} MiB), "
+          f"already there {counts['already_copied']}, failed {counts['failed']}, stale temp files {removed}")
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
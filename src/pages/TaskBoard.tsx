@@ -425,6 +425,11 @@ const TaskBoard: React.FC<{ onTasksUpdated?: () => void }> = ({
     }
   };
 
+  // inline previews use the small server-side thumbnail once it exists, so the
+  // full attachment is only downloaded when it is opened
+  const previewKey = (r: any) =>
+    r.thumbnail_id ? `thumb:${r.file_id}` : String(r.file_id);
+
   // load file previews for any remarks that have file_id
   useEffect(() => {
     let mounted = true;
@@ -433,16 +438,20 @@ const TaskBoard: React.FC<{ onTasksUpdated?: () => void }> = ({
     for (const r of remarks || []) {
       if (r.file_id) {
         const fileId = String(r.file_id);
-        if (!previewUrls[fileId]) {
+        const key = previewKey(r);
+        if (!previewUrls[key]) {
           const load = (async () => {
             try {
-              const resp = await api.get(`/file/${fileId}`, {
+              const path = r.thumbnail_id
+                ? `/file/${fileId}/thumb`
+                : `/file/${fileId}`;
+              const resp = await api.get(path, {
                 responseType: "blob",
               });
               if (!mounted) return;
               const blob = resp.data as Blob;
               const url = URL.createObjectURL(blob);
-              urls[fileId] = url;
+              urls[key] = url;
             } catch (e) {
               // ignore failed preview
               // eslint-disable-next-line no-console
@@ -1458,10 +1467,10 @@ const TaskBoard: React.FC<{ onTasksUpdated?: () => void }> = ({
                           ) : null}
                         </div>
                       </div>
-                      {r.file_id && previewUrls[String(r.file_id)] && (
+                      {r.file_id && previewUrls[previewKey(r)] && (
                         <div className="mt-2">
                           <img
-                            src={previewUrls[String(r.file_id)]}
+                            src={previewUrls[previewKey(r)]}
                             alt={r.file_name || "attachment"}
                             className="max-h-40 object-contain rounded cursor-zoom-in"
                             onClick={async (e) => {
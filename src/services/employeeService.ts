@@ -1,5 +1,8 @@
 import api from "./api";
 
+// Backend limit for /Employee/getmany (MAX_BULK_IDS in employee_crud.py)
+const MAX_IDS_PER_REQUEST = 500;
+
 export interface Employee {
   e_id: number;
   name: string;
@@ -51,17 +54,63 @@ export const employeeService = {
     return response.data;
   },
 
+  // Get several employees: GET /Employee/getmany?ids=1,2,3&role=<role>, one request per
+  // MAX_IDS_PER_REQUEST ids (the backend rejects larger lists)
+  getEmployeesByIds: async (ids: number[], role: string): Promise<Employee[]> => {
+    const chunks: number[][] = [];
+    for (let i = 0; i < ids.length; i += MAX_IDS_PER_REQUEST) {
+      chunks.push(ids.slice(i, i + MAX_IDS_PER_REQUEST));
+    }
+    const responses = await Promise.all(
+      chunks.map((chunk) =>
+        api.get(
+          `/Employee/getmany?ids=${chunk.join(",")}&role=${encodeURIComponent(role)}`
+        )
+      )
+    );
+    return responses.flatMap((response) => response.data?.employees || []);
+  },
+
   // Simple in-memory cache for employee lookups during app session
   _cache: {} as Record<number, Employee>,
+  // Lookups requested in the same tick are sent together; in flight ones keyed by role and id
+  _pending: {} as Record<string, Promise<Employee>>,
+  _batch: null as null | { role: string; ids: number[]; promise: Promise<Employee[]> },
 
   getEmployeeCached: async (e_id: number, role: string): Promise<Employee> => {
     if (!employeeService._cache)
       employeeService._cache = {} as Record<number, Employee>;
     const cached = employeeService._cache[e_id];
     if (cached) return cached;
-    const emp = await employeeService.getEmployeeById(e_id, role);
-    employeeService._cache[e_id] = emp;
-    return emp;
+    const pendingKey = `${role}:${e_id}`;
+    if (employeeService._pending[pendingKey]) return employeeService._pending[pendingKey];
+
+    let batch = employeeService._batch;
+    if (!batch || batch.role !== role) {
+      const ids: number[] = [];
+      batch = {
+        role,
+        ids,
+        promise: Promise.resolve().then(() => {
+          employeeService._batch = null;
+          return employeeService.getEmployeesByIds(ids, role);
+        }),
+      };
+      employeeService._batch = batch;
+    }
+    batch.ids.push(e_id);
+    const pending = batch.promise
+      .then((emps) => {
+        const emp = emps.find((e) => e.e_id === e_id);
+        if (!emp) throw new Error(`Employee ${e_id} not found`);
+        employeeService._cache[e_id] = emp;
+        return emp;
+      })
+      .finally(() => {
+        delete employeeService._pending[pendingKey];
+      });
+    employeeService._pending[pendingKey] = pending;
+    return pending;
   },
 
   // Create new employee
@@ -20,6 +20,31 @@ export interface Task {
   actual_closure?: string;
 }
 
+export interface TaskPerson {
+  e_id: number;
+  name: string;
+  email: string;
+  designation: string;
+  mgr_id?: number;
+}
+
+export interface TaskDetail {
+  task: Task;
+  remarks: any[];
+  people: Record<
+    "assigned_to" | "assigned_by" | "reviewer" | "created_by" | "updated_by",
+    TaskPerson | null
+  >;
+}
+
+export interface BoardColumn {
+  tasks: Task[];
+  total: number;
+  next_cursor: string | null;
+}
+
+export type Board = Record<TaskStatus, BoardColumn>;
+
 export interface TaskCreateRequest {
   title: string;
   description: string;
@@ -90,6 +115,33 @@ export const taskService = {
     return response.data;
   },
 
+  // First `limit` cards of every status column, with per-column totals
+  getBoard: async (role: string, limit: number = 20): Promise<Board> => {
+    const response = await api.get(
+      `/Task/board?role=${encodeURIComponent(role)}&limit=${limit}`
+    );
+    return response.data;
+  },
+
+  // "Load more" for one column, continuing from its next_cursor
+  getBoardColumn: async (
+    role: string,
+    status: TaskStatus,
+    after: string,
+    limit: number = 20
+  ): Promise<{ status: TaskStatus; tasks: Task[]; next_cursor: string | null }> => {
+    const response = await api.get(
+      `/Task/board/column?role=${encodeURIComponent(role)}&status=${status}&after=${encodeURIComponent(after)}&limit=${limit}`
+    );
+    return response.data;
+  },
+
+  // Task with its remarks and the people on it, in one request
+  getTaskFull: async (t_id: number): Promise<TaskDetail> => {
+    const response = await api.get(`/Task/${t_id}/full`);
+    return response.data;
+  },
+
   // Create new task (optionally provide role as backend expects a `role` query param)
   createTask: async (task: TaskCreateRequest, role?: string): Promise<Task> => {
     const url = role